@@ -0,0 +1,147 @@
+"""
+Token email benchmark: a mass invitation through the outbox and the
+dispatch workers, against the local Resend stand-in (benchmarks.fake_email).
+
+Creates a team of `--recipients` users, creates an individual-token
+question for it (tokens plus queued emails, the request-path cost), then
+runs the email dispatcher until the outbox is drained and reports the
+drain time, throughput and outcome counts. `--legacy-sample` single
+`resend.Emails.send` calls time the previous path (one blocking request
+per recipient) for comparison, extrapolated to all recipients.
+
+Usage (from code/WebAPI):
+    python -m benchmarks.fake_email --port 8090 --rate-limit 2 &
+    python -m benchmarks.bench_email_outbox [--recipients 10000] [--legacy-sample 20]
+
+Dispatcher settings come from the usual EMAIL_* variables (e.g.
+EMAIL_RATE_LIMIT, EMAIL_WORKERS). Uses DATABASE_URL if set, otherwise a
+throwaway SQLite file; RESEND_API_URL defaults to the stand-in.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+if not os.getenv("DATABASE_URL"):
+    _tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    os.environ["DATABASE_URL"] = f"sqlite:///{_tmp.name}"
+os.environ.setdefault("RESEND_API_URL", "http://127.0.0.1:8090")
+os.environ.setdefault("RESEND_API_KEY", "re_test")
+os.environ.setdefault("EMAIL_TRANSPORT", "resend")
+
+import httpx
+import resend
+from fastapi import BackgroundTasks
+from sqlalchemy import func, insert, select
+
+from src import schemas
+from src.config import EMAIL_RATE_LIMIT, EMAIL_WORKERS
+from src.crud.question import create_question
+from src.db import session as db_session
+from src.db import models
+from src.jobs.email_outbox import email_dispatcher
+from src.utils.email import render_token_email
+
+
+def _setup(size: int) -> tuple[int, int]:
+    """A lead and a team of `size` users; returns (lead_id, team_id)."""
+    db = db_session.SessionLocal()
+    try:
+        marker = os.urandom(4).hex()
+        lead = models.TeamLead(name="Bench", lastname="Lead", email=f"bench-{marker}@example.com", password="x")
+        db.add(lead)
+        db.flush()
+        team = models.Team(name=f"bench-{marker}", team_lead_id=lead.id)
+        db.add(team)
+        db.flush()
+        db.execute(insert(models.User), [
+            {"name": "U", "lastname": str(i), "email": f"{marker}-{i}@example.com"} for i in range(size)
+        ])
+        user_ids = db.scalars(select(models.User.id).where(models.User.email.like(f"{marker}-%")))
+        db.execute(insert(models.UserTeam), [{"user_id": user_id, "team_id": team.id} for user_id in user_ids])
+        db.commit()
+        return lead.id, team.id
+    finally:
+        db.close()
+
+
+def _outbox_counts(question_id: int) -> dict[str, int]:
+    db = db_session.SessionLocal()
+    try:
+        return dict(
+            db.query(models.EmailOutbox.status, func.count())
+            .filter(models.EmailOutbox.question_id == question_id)
+            .group_by(models.EmailOutbox.status)
+            .all()
+        )
+    finally:
+        db.close()
+
+
+async def _drain(question_id: int, timeout: float) -> tuple[float, dict[str, int]]:
+    """Run the dispatcher until no message of the question is pending or sending."""
+    started = time.perf_counter()
+    await email_dispatcher.start()
+    try:
+        while time.perf_counter() - started < timeout:
+            counts = await asyncio.to_thread(_outbox_counts, question_id)
+            if not counts.get("pending") and not counts.get("sending"):
+                break
+            await asyncio.sleep(0.25)
+    finally:
+        await email_dispatcher.stop()
+    return time.perf_counter() - started, counts
+
+
+def _legacy_sample(count: int) -> float:
+    """Seconds per email of the old path: one blocking single-send request per recipient."""
+    subject, html = render_token_email("sample-token", "Benchmark question")
+    started = time.perf_counter()
+    for i in range(count):
+        try:
+            resend.Emails.send({"from": "bench@example.com", "to": [f"legacy-{i}@example.com"], "subject": subject, "html": html})
+        except Exception as e:
+            print(f"⚠️  Legacy send failed: {e}")
+    return (time.perf_counter() - started) / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipients", type=int, default=10000)
+    parser.add_argument("--legacy-sample", type=int, default=20, help="single sends timed for comparison (0 = skip)")
+    parser.add_argument("--timeout", type=float, default=1800.0, help="seconds to wait for the outbox to drain")
+    args = parser.parse_args()
+
+    print(f"Database: {db_session.engine.url}")
+    print(f"Resend API: {resend.api_url} (rate limit {EMAIL_RATE_LIMIT}/s, {EMAIL_WORKERS} worker(s))")
+    db_session.init_db()
+    lead_id, team_id = _setup(args.recipients)
+
+    db = db_session.SessionLocal()
+    try:
+        data = schemas.QuestionCreate(content="Benchmark question", token_type="individual", teams_ids=[team_id])
+        started = time.perf_counter()
+        question, tokens = create_question(db, data, lead_id, BackgroundTasks())
+        created = time.perf_counter() - started
+        question_id = question.id
+    finally:
+        db.close()
+
+    drained, counts = asyncio.run(_drain(question_id, args.timeout))
+    sent = counts.get("sent", 0)
+    print(f"\n{args.recipients} recipients")
+    print(f"  create_question (tokens + outbox)  {created:8.3f} s")
+    print(f"  outbox drained                     {drained:8.3f} s   {sent / drained:8.1f} emails/s")
+    print(f"  outcome                            {counts}")
+    print(f"  stand-in                           {httpx.get(f'{resend.api_url}/stats').json()}")
+
+    if args.legacy_sample:
+        per_email = _legacy_sample(args.legacy_sample)
+        print(f"  single sends ({args.legacy_sample} timed)           {per_email * 1000:8.1f} ms/email, "
+              f"~{per_email * args.recipients:.0f} s for all recipients")
+
+
+if __name__ == "__main__":
+    main()
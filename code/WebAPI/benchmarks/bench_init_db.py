@@ -0,0 +1,82 @@
+"""
+Startup benchmark: per-request cost of the old `init_db()` call vs the
+one-time, version-marked initialization.
+
+Usage (from code/WebAPI):
+    python -m benchmarks.bench_init_db [--iterations 200]
+
+Uses DATABASE_URL if set, otherwise a throwaway SQLite file.
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+if not os.getenv("DATABASE_URL"):
+    _tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    os.environ["DATABASE_URL"] = f"sqlite:///{_tmp.name}"
+
+import json
+from pathlib import Path
+
+from src.db import session as db_session
+from src.db.base import Base
+from src.db.models import QuestionType
+
+
+def legacy_init_db() -> None:
+    """What every /analyze request used to run: create_all + one SELECT per seed type."""
+    Base.metadata.create_all(db_session.engine)
+    session = db_session.SessionLocal()
+    try:
+        json_path = Path(db_session.__file__).parent / "question_type.json"
+        with open(json_path, "r", encoding="utf-8") as f:
+            question_types = json.load(f)
+        for q in question_types:
+            session.query(QuestionType).filter_by(type=q["type"]).first()
+    finally:
+        session.close()
+
+
+def _time(fn, iterations: int) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _report(label: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<34} mean {statistics.mean(samples):8.3f} ms   p95 {p95:8.3f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"Database: {db_session.engine.url}")
+
+    start = time.perf_counter()
+    db_session.init_db()
+    print(f"{'first init_db() (cold start)':<34} {(time.perf_counter() - start) * 1000:8.3f} ms\n")
+
+    legacy = _time(legacy_init_db, args.iterations)
+    version_check = _time(db_session._current_schema_version, args.iterations)
+    hot_path = _time(db_session.init_db, args.iterations)
+
+    _report("legacy init_db() per request", legacy)
+    _report("schema version check", version_check)
+    _report("init_db() after startup", hot_path)
+
+    saved = statistics.mean(legacy) - statistics.mean(hot_path)
+    print(f"\nPer-request overhead removed: {saved:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
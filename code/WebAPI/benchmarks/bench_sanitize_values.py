@@ -0,0 +1,76 @@
+"""
+Throughput of the sanitizer engine on large JSON bodies.
+
+Compares the legacy per-string `bleach.clean` recursion with
+`sanitize_value` (shared Cleaner, markup pre-check, memoization).
+
+Usage (from code/WebAPI):
+    python -m benchmarks.bench_sanitize_values [--answers 5000]
+"""
+
+import argparse
+import json
+import random
+import time
+
+import bleach
+
+from src.sanitizer import sanitizer
+from src.sanitizer.sanitizer import sanitize_value
+
+
+def legacy_sanitize_value(value):
+    if isinstance(value, str):
+        return bleach.clean(value, strip=True)
+    elif isinstance(value, dict):
+        return {k: legacy_sanitize_value(v) for k, v in value.items()}
+    elif isinstance(value, list):
+        return [legacy_sanitize_value(v) for v in value]
+    return value
+
+
+def _bodies(n: int) -> dict:
+    rnd = random.Random(42)
+    words = "team process meeting client release budget tooling quality weekly remote".split()
+
+    def sentence():
+        return " ".join(rnd.choice(words) for _ in range(rnd.randint(6, 30))).capitalize() + "."
+
+    return {
+        "plain text": {"answers": [{"id": i, "content": sentence()} for i in range(n)]},
+        "repeated short answers": {"answers": [{"id": i, "content": rnd.choice(["Yes", "No", "yes!", "Maybe"])} for i in range(n)]},
+        "30% with markup": {"answers": [
+            {"id": i, "content": sentence() + (" <b>really</b> & <script>x()</script>" if rnd.random() < 0.3 else "")}
+            for i in range(n)
+        ]},
+    }
+
+
+def _run(fn, body) -> float:
+    start = time.perf_counter()
+    fn(body)
+    return time.perf_counter() - start
+
+
+def main(n: int) -> None:
+    print(f"{'body':<24}{'MB':>6}{'legacy str/s':>15}{'cold str/s':>14}{'warm str/s':>14}{'MB/s warm':>11}")
+    for label, body in _bodies(n).items():
+        size_mb = len(json.dumps(body)) / 1e6
+        strings = n
+
+        assert legacy_sanitize_value(body) == sanitize_value(body)
+
+        sanitizer._clean_memoized.cache_clear()
+        t_legacy = _run(legacy_sanitize_value, body)
+        t_cold = _run(sanitize_value, body)
+        t_warm = _run(sanitize_value, body)
+        print(
+            f"{label:<24}{size_mb:>6.2f}{strings / t_legacy:>15,.0f}"
+            f"{strings / t_cold:>14,.0f}{strings / t_warm:>14,.0f}{size_mb / t_warm:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--answers", type=int, default=5000)
+    main(parser.parse_args().answers)
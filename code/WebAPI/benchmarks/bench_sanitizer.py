@@ -0,0 +1,132 @@
+"""
+Microbenchmark: legacy BaseHTTPMiddleware sanitizer vs the pure ASGI one.
+
+Each payload is sent straight through the ASGI stack (no network) to a
+Starlette endpoint that parses the JSON body, like FastAPI does.
+
+Usage (from code/WebAPI):
+    python -m benchmarks.bench_sanitizer [--requests 2000]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from src.sanitizer.sanitizer import SanitizerMiddleware, sanitize_value
+
+PAYLOADS = {
+    "short answer": {"content": "Yes, it would increase productivity."},
+    "long answer": {"content": "I think we should adopt it because " * 60},
+    "answer with markup": {"content": "Great idea <script>alert(1)</script> & more <b>bold</b>"},
+    "question create": {
+        "content": "Should we adopt a 4-day work week?",
+        "token_type": "individual",
+        "teams_ids": [1, 2, 3],
+        "users_ids": list(range(50)),
+        "expires_at": None,
+    },
+}
+
+
+class LegacySanitizerMiddleware(BaseHTTPMiddleware):
+    """The previous implementation, kept here as the baseline."""
+
+    async def dispatch(self, request: Request, call_next):
+        query_params = {k: sanitize_value(v) for k, v in request.query_params.items()}
+        request._query_params = query_params  # type: ignore
+
+        if "path_params" in request.scope:
+            request.scope["path_params"] = {
+                k: sanitize_value(v) for k, v in request.scope["path_params"].items()
+            }
+
+        if request.method in ["POST", "PUT", "PATCH"]:
+            try:
+                body_bytes = await request.body()
+                if body_bytes:
+                    body_data = json.loads(body_bytes)
+                    sanitized_data = sanitize_value(body_data)
+                    request._body = json.dumps(sanitized_data).encode("utf-8")  # type: ignore
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                pass
+
+        return await call_next(request)
+
+
+async def _echo(request: Request):
+    return JSONResponse(await request.json())
+
+
+def _build_app(middleware_cls):
+    app = Starlette(routes=[Route("/answer/{token}", _echo, methods=["POST"])])
+    app.add_middleware(middleware_cls)
+    return app
+
+
+async def _call(app, body: bytes) -> bytes:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/answer/tok123",
+        "raw_path": b"/answer/tok123",
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 1234),
+        "server": ("127.0.0.1", 8000),
+    }
+    sent = False
+    out = []
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            out.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return b"".join(out)
+
+
+async def _bench(app, body: bytes, n: int) -> float:
+    for _ in range(50):
+        await _call(app, body)
+    start = time.perf_counter()
+    for _ in range(n):
+        await _call(app, body)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+async def main(n: int) -> None:
+    legacy = _build_app(LegacySanitizerMiddleware)
+    current = _build_app(SanitizerMiddleware)
+
+    print(f"{'payload':<22}{'legacy µs':>12}{'asgi µs':>12}{'speedup':>10}")
+    for label, payload in PAYLOADS.items():
+        body = json.dumps(payload).encode()
+        t_legacy = await _bench(legacy, body, n)
+        t_current = await _bench(current, body, n)
+        print(f"{label:<22}{t_legacy:>12.1f}{t_current:>12.1f}{t_legacy / t_current:>9.1f}x")
+
+    sample = json.dumps(PAYLOADS["answer with markup"]).encode()
+    print(f"\nsanitized body: {(await _call(current, sample)).decode()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    asyncio.run(main(parser.parse_args().requests))
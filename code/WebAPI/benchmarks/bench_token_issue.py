@@ -0,0 +1,105 @@
+"""
+Token issuance benchmark: one ORM `Token` object per recipient (the old
+`create_question` loop) vs the bulk INSERT in `crud.question.issue_tokens`.
+
+Usage (from code/WebAPI):
+    python -m benchmarks.bench_token_issue [--sizes 10000,100000] [--repeat 3]
+
+Uses DATABASE_URL if set (e.g. postgresql+psycopg2://...), otherwise a
+throwaway SQLite file. Users, a lead and a question are created once; the
+tokens of each run are deleted before the next.
+"""
+
+import argparse
+import os
+import secrets
+import statistics
+import tempfile
+import time
+
+if not os.getenv("DATABASE_URL"):
+    _tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    os.environ["DATABASE_URL"] = f"sqlite:///{_tmp.name}"
+
+from sqlalchemy import delete, insert, select
+
+from src.crud.question import issue_tokens
+from src.db import session as db_session
+from src.db import models
+
+
+def legacy_issue_tokens(db, question_id: int, user_ids: list[int]) -> list[str]:
+    """The previous per-object path: one ORM instance and unit-of-work entry per token."""
+    tokens = []
+    for user_id in user_ids:
+        token_value = secrets.token_urlsafe(16)
+        db.add(models.Token(token_value=token_value, question_id=question_id, user_id=user_id, used=False))
+        tokens.append(token_value)
+    return tokens
+
+
+def _setup(size: int) -> tuple[int, list[int]]:
+    """A lead, a question and `size` users; returns (question_id, user_ids)."""
+    db = db_session.SessionLocal()
+    try:
+        lead = models.TeamLead(name="Bench", lastname="Lead", email=f"bench-{secrets.token_hex(4)}@example.com", password="x")
+        db.add(lead)
+        db.flush()
+        question = models.Question(content="Benchmark question", team_lead_id=lead.id, question_type_id=1)
+        db.add(question)
+        db.flush()
+        marker = secrets.token_hex(4)
+        db.execute(insert(models.User), [
+            {"name": "U", "lastname": str(i), "email": f"{marker}-{i}@example.com"} for i in range(size)
+        ])
+        user_ids = list(db.scalars(
+            select(models.User.id).where(models.User.email.like(f"{marker}-%")).order_by(models.User.id)
+        ))
+        db.commit()
+        return question.id, user_ids
+    finally:
+        db.close()
+
+
+def _run(fn, question_id: int, user_ids: list[int]) -> float:
+    db = db_session.SessionLocal()
+    try:
+        start = time.perf_counter()
+        tokens = fn(db, question_id, user_ids)
+        db.commit()
+        elapsed = time.perf_counter() - start
+        assert len(tokens) == len(user_ids)
+        stored = dict(db.execute(
+            select(models.Token.token_value, models.Token.user_id).where(models.Token.question_id == question_id)
+        ).all())
+        assert [stored[t] for t in tokens] == user_ids, "tokens not returned in recipient order"
+        db.execute(delete(models.Token).where(models.Token.question_id == question_id))
+        db.commit()
+        return elapsed
+    finally:
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated recipient counts")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Database: {db_session.engine.url}")
+    db_session.init_db()
+
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        question_id, user_ids = _setup(size)
+        legacy = [_run(legacy_issue_tokens, question_id, user_ids) for _ in range(args.repeat)]
+        bulk = [_run(lambda db, q, u: issue_tokens(db, q, u), question_id, user_ids) for _ in range(args.repeat)]
+
+        legacy_s, bulk_s = statistics.median(legacy), statistics.median(bulk)
+        print(f"\n{size} recipients (median of {args.repeat})")
+        print(f"  {'ORM object per token':<24} {legacy_s:8.3f} s   {size / legacy_s:10.0f} tokens/s")
+        print(f"  {'bulk INSERT':<24} {bulk_s:8.3f} s   {size / bulk_s:10.0f} tokens/s")
+        print(f"  speedup {legacy_s / bulk_s:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
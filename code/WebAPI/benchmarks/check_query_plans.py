@@ -0,0 +1,139 @@
+"""
+Query-plan check: every hot CRUD lookup must be served by an index.
+
+Builds the same ORM queries the CRUD layer issues, asks the database for
+its plan and fails (exit code 1) if any of them scans the filtered table.
+
+Usage (from code/WebAPI):
+    python -m benchmarks.check_query_plans
+    DATABASE_URL=postgresql://user:pw@host/db python -m benchmarks.check_query_plans
+
+Supports SQLite (EXPLAIN QUERY PLAN) and PostgreSQL (EXPLAIN with
+sequential scans disabled, so tiny test tables still report index use).
+Without DATABASE_URL a throwaway SQLite file is used.
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+if not os.getenv("DATABASE_URL"):
+    _tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    os.environ["DATABASE_URL"] = f"sqlite:///{_tmp.name}"
+
+from sqlalchemy import text
+
+from src.db import models
+from src.db.session import engine, SessionLocal, init_db
+
+
+def _queries(db):
+    """(label, table that must be index-accessed, query) for each hot lookup."""
+    queries = [
+        ("answers by question", "answer",
+         db.query(models.Answer).filter(models.Answer.question_id == 1)),
+        ("answers by question, newest first", "answer",
+         db.query(models.Answer).filter(models.Answer.question_id == 1).order_by(models.Answer.created_at.desc())),
+        ("tokens by question", "token",
+         db.query(models.Token).filter(models.Token.question_id == 1)),
+        ("token by value", "token",
+         db.query(models.Token).filter(models.Token.token_value == "abc")),
+        ("questions by lead", "question",
+         db.query(models.Question).filter(models.Question.team_lead_id == 1)),
+        ("teams by lead", "team",
+         db.query(models.Team).filter(models.Team.team_lead_id == 1)),
+        ("users by team", "user_team",
+         db.query(models.User.id)
+         .join(models.UserTeam, models.User.id == models.UserTeam.user_id)
+         .filter(models.UserTeam.team_id == 1)),
+        ("team lead by email", "team_lead",
+         db.query(models.TeamLead).filter(models.TeamLead.email == "lead@example.com")),
+        ("latest analysis job", "analysis_job",
+         db.query(models.AnalysisJob)
+         .filter(models.AnalysisJob.question_id == 1)
+         .order_by(models.AnalysisJob.id.desc())),
+    ]
+    for model in (
+        models.StanceAnalysis,
+        models.OptionComparison,
+        models.IdeaGeneration,
+        models.PriorityRanking,
+        models.FeedbackAnalysis,
+    ):
+        queries.append((
+            f"{model.__tablename__} by question", model.__tablename__,
+            db.query(model).filter(model.question_id == 1),
+        ))
+    return queries
+
+
+def _compile(query) -> str:
+    return str(query.statement.compile(engine, compile_kwargs={"literal_binds": True}))
+
+
+# ---------------------------------------------------------------------
+# Dialect-specific plan inspection
+# ---------------------------------------------------------------------
+def _sqlite_scans_table(conn, sql: str, table: str) -> tuple[bool, str]:
+    rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+    details = [row[-1] for row in rows]
+    full_scan = any(
+        d.startswith(f"SCAN {table}") and "INDEX" not in d
+        for d in details
+    )
+    return full_scan, " | ".join(details)
+
+
+def _walk_pg_plan(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk_pg_plan(child)
+
+
+def _postgres_scans_table(conn, sql: str, table: str) -> tuple[bool, str]:
+    raw = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    plan = (raw if isinstance(raw, list) else json.loads(raw))[0]["Plan"]
+    nodes = list(_walk_pg_plan(plan))
+    full_scan = any(
+        n.get("Node Type") == "Seq Scan" and n.get("Relation Name") == table
+        for n in nodes
+    )
+    summary = " | ".join(
+        f"{n['Node Type']} on {n['Relation Name']}" + (f" using {n['Index Name']}" if "Index Name" in n else "")
+        for n in nodes if "Relation Name" in n
+    )
+    return full_scan, summary
+
+
+def main() -> int:
+    init_db()
+    dialect = engine.dialect.name
+    if dialect == "sqlite":
+        scans_table = _sqlite_scans_table
+    elif dialect == "postgresql":
+        scans_table = _postgres_scans_table
+    else:
+        print(f"Unsupported dialect '{dialect}' (expected sqlite or postgresql).")
+        return 2
+
+    print(f"Database: {engine.url} ({dialect})\n")
+    failures = 0
+    db = SessionLocal()
+    try:
+        with engine.connect() as conn:
+            if dialect == "postgresql":
+                conn.execute(text("SET enable_seqscan = off"))
+            for label, table, query in _queries(db):
+                full_scan, plan = scans_table(conn, _compile(query), table)
+                failures += full_scan
+                print(f"[{'FAIL' if full_scan else ' ok '}] {label:<36} {plan}")
+    finally:
+        db.close()
+
+    print(f"\n{failures} quer{'y' if failures == 1 else 'ies'} without an index.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+Local stand-in for the Resend email API, for exercising the email outbox
+without sending real mail.
+
+Serves POST /emails and POST /emails/batch (up to 100 messages, strict or
+permissive validation via the x-batch-validation header) with Resend's
+response and error shapes. Recipients containing "invalid" are rejected as
+validation errors. Optionally enforces a server-side request rate limit
+(Resend's default is 2 requests per second) and injects 500/429 errors.
+
+Usage (from code/WebAPI):
+    python -m benchmarks.fake_email [--port 8090] [--latency 0.2]
+        [--rate-limit 2] [--error-rate 0.01] [--rate-limit-rate 0]
+
+then point the API (or benchmarks.bench_email_outbox) at it:
+    RESEND_API_URL=http://127.0.0.1:8090 RESEND_API_KEY=re_test uvicorn src.main:app
+
+GET /stats returns request, email and injected-error counters, including
+recipients that received more than one email; POST /config changes the
+settings of a running server (same names as the options, as JSON).
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from collections import Counter
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+BATCH_LIMIT = 100
+
+settings = {
+    "latency": 0.2,
+    "rate_limit": 0.0,
+    "error_rate": 0.0,
+    "rate_limit_rate": 0.0,
+}
+counters: Counter = Counter()
+recipients: Counter = Counter()
+_window: list[float] = []
+
+app = FastAPI(title="fake-resend")
+
+
+def _error(status: int, name: str, message: str, headers: dict | None = None) -> JSONResponse:
+    return JSONResponse({"statusCode": status, "name": name, "message": message}, status_code=status, headers=headers)
+
+
+def _rejected() -> JSONResponse | None:
+    """Server-side rate limit (sliding one-second window), then injected errors."""
+    now = time.monotonic()
+    while _window and now - _window[0] >= 1.0:
+        _window.pop(0)
+    if settings["rate_limit"] > 0 and len(_window) >= settings["rate_limit"]:
+        counters["429"] += 1
+        return _error(429, "rate_limit_exceeded", "Too many requests.", {"retry-after": "1"})
+    _window.append(now)
+
+    roll = random.random()
+    if roll < settings["rate_limit_rate"]:
+        counters["429"] += 1
+        return _error(429, "rate_limit_exceeded", "Too many requests.", {"retry-after": "1"})
+    if roll < settings["rate_limit_rate"] + settings["error_rate"]:
+        counters["500"] += 1
+        return _error(500, "application_error", "Internal server error.")
+    return None
+
+
+def _invalid(email: dict) -> str | None:
+    to = email.get("to") or []
+    to = [to] if isinstance(to, str) else to
+    if not to or not email.get("from") or not email.get("subject"):
+        return "Missing `to`, `from` or `subject` field."
+    bad = next((address for address in to if "invalid" in address or "@" not in address), None)
+    return f"Invalid `to` field: {bad}." if bad else None
+
+
+def _deliver(email: dict) -> dict:
+    to = email["to"]
+    for address in [to] if isinstance(to, str) else to:
+        recipients[address] += 1
+    counters["emails"] += 1
+    return {"id": str(uuid.uuid4())}
+
+
+# ---------------------------------------------------------------------
+# Endpoints
+# ---------------------------------------------------------------------
+@app.post("/emails")
+async def send_email(request: Request):
+    email = await request.json()
+    counters["requests"] += 1
+    await asyncio.sleep(settings["latency"])
+    rejected = _rejected()
+    if rejected is not None:
+        return rejected
+    problem = _invalid(email)
+    if problem:
+        counters["rejected"] += 1
+        return _error(422, "validation_error", problem)
+    return _deliver(email)
+
+
+@app.post("/emails/batch")
+async def send_batch(request: Request):
+    emails = await request.json()
+    counters["requests"] += 1
+    counters["batches"] += 1
+    await asyncio.sleep(settings["latency"])
+    rejected = _rejected()
+    if rejected is not None:
+        return rejected
+    if not isinstance(emails, list) or not 1 <= len(emails) <= BATCH_LIMIT:
+        return _error(422, "validation_error", f"A batch holds 1 to {BATCH_LIMIT} emails.")
+
+    problems = {i: p for i, p in enumerate(_invalid(e) for e in emails) if p}
+    if problems and request.headers.get("x-batch-validation", "strict") != "permissive":
+        counters["rejected"] += len(emails)
+        index, problem = next(iter(problems.items()))
+        return _error(422, "validation_error", f"emails[{index}]: {problem}")
+
+    counters["rejected"] += len(problems)
+    response = {"data": [_deliver(e) for i, e in enumerate(emails) if i not in problems]}
+    if problems:
+        response["errors"] = [{"index": i, "message": p} for i, p in problems.items()]
+    return response
+
+
+@app.get("/stats")
+def stats():
+    return {
+        **counters,
+        "recipients": len(recipients),
+        "duplicate_recipients": sum(1 for count in recipients.values() if count > 1),
+    }
+
+
+@app.post("/config")
+def update_config(changes: dict):
+    for key, value in changes.items():
+        if key in settings:
+            settings[key] = type(settings[key])(value)
+    return settings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per request")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="requests per second before 429 (0 = off)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 500 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of random 429 responses")
+    args = parser.parse_args()
+    for key in settings:
+        settings[key] = getattr(args, key)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
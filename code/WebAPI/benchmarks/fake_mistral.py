@@ -0,0 +1,323 @@
+"""
+Local stand-in for the Mistral chat completions API, for load tests and
+resilience checks without spending API credits.
+
+Serves POST /v1/chat/completions (plain and streamed) with canned JSON
+shaped for each pipeline prompt of this project: question type
+classification, per-opinion classification / option mapping / ranking
+parsing, reasons, themes, cluster labels, feedback sentiment and the
+single-call compact mode. Opinions are read back from the prompt, so
+per-opinion answers line up with what the pipelines sent.
+
+Usage (from code/WebAPI):
+    python -m benchmarks.fake_mistral [--port 8089] [--latency lognormal]
+        [--latency-mean 0.8] [--latency-sigma 0.5] [--token-delay 0.005]
+        [--error-rate 0.01] [--rate-limit-rate 0.01] [--timeout-rate 0]
+
+then start the API against it:
+    MISTRAL_SERVER_URL=http://127.0.0.1:8089 uvicorn src.main:app
+
+GET /stats returns request and injected-error counters; POST /config
+changes the latency and error settings of a running server (same names as
+the command-line options, as JSON).
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+from collections import Counter
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+QUESTION_TYPES = {
+    "option_comparison": ("which", " or ", " vs", "compare", "prefer", "better"),
+    "priority_ranking": ("rank", "priorit", "order", "most important"),
+    "idea_generation": ("idea", "suggest", "how could", "how can", "propose"),
+    "feedback_analysis": ("feedback", "experience", "how was", "how did", "review"),
+}
+OPTIONS = ["Option A", "Option B", "Option C"]
+STANCES = ["pro", "contra", "neutral"]
+SENTENCE = (
+    "Respondents weigh practical benefits against implementation costs, and most "
+    "answers point to a measured rollout with clear follow-up."
+)
+
+settings = {
+    "latency": "lognormal",
+    "latency_mean": 0.8,
+    "latency_sigma": 0.5,
+    "token_delay": 0.005,
+    "error_rate": 0.0,
+    "rate_limit_rate": 0.0,
+    "timeout_rate": 0.0,
+}
+counters: Counter = Counter()
+
+app = FastAPI(title="Fake Mistral")
+
+
+# ---------------------------------------------------------------------
+# Prompt parsing
+# ---------------------------------------------------------------------
+def _pick(text: str, choices: list):
+    """Deterministic choice per text, so repeated runs give the same answers."""
+    digest = hashlib.md5(text.encode("utf-8")).digest()
+    return choices[digest[0] % len(choices)]
+
+
+def _last_json(prompt: str, kind: type):
+    """The last top-level JSON value of type `kind` embedded in the prompt, or None."""
+    decoder = json.JSONDecoder()
+    opener = "[" if kind is list else "{"
+    found, pos = None, prompt.find(opener)
+    while pos != -1:
+        try:
+            value, end = decoder.raw_decode(prompt, pos)
+        except json.JSONDecodeError:
+            end = pos + 1
+        else:
+            if isinstance(value, kind):
+                found = value
+        pos = prompt.find(opener, end)
+    return found
+
+
+def _opinions(prompt: str) -> list[str]:
+    items = _last_json(prompt, list) or []
+    return [item if isinstance(item, str) else str(item.get("opinion", "")) for item in items
+            if isinstance(item, (str, dict))]
+
+
+def _clusters(prompt: str) -> int:
+    tail = prompt[prompt.rfind("Clusters:"):]
+    clusters = _last_json(tail, list) or []
+    return max(len(clusters), 1)
+
+
+# ---------------------------------------------------------------------
+# Canned payloads per pipeline prompt
+# ---------------------------------------------------------------------
+def _guess_type(question: str) -> str:
+    question = question.lower()
+    for question_type, keywords in QUESTION_TYPES.items():
+        if any(k in question for k in keywords):
+            return question_type
+    return "stance_analysis"
+
+
+def _question_types(prompt: str) -> dict:
+    numbered = re.findall(r'^\s*(\d+)\. (".*")\s*$', prompt, re.MULTILINE)
+    if numbered:
+        return {"types": [{"index": int(i), "type": _guess_type(json.loads(q))} for i, q in numbered]}
+    return {"type": _guess_type(prompt[prompt.find("Question:"):].split("\n")[0])}
+
+
+def _classifications(opinions: list[str]) -> list[dict]:
+    return [{"opinion": o, "classification": _pick(o, STANCES), "reason": "Stated preference."} for o in opinions]
+
+
+def _mapping(opinions: list[str]) -> dict:
+    return {"options": OPTIONS, "mapping": [{"opinion": o, "preferred_option": _pick(o, OPTIONS)} for o in opinions]}
+
+
+def _rankings(opinions: list[str]) -> dict:
+    orders = [OPTIONS, OPTIONS[1:] + OPTIONS[:1], OPTIONS[::-1]]
+    return {"options": OPTIONS, "parsed_opinions": [{"opinion": o, "ranking": _pick(o, orders)} for o in opinions]}
+
+
+def _reasons() -> dict:
+    return {option: [f"{option} is simpler to adopt", f"{option} fits current tools"] for option in OPTIONS}
+
+
+def _idea_themes(opinions: list[str]) -> dict:
+    themes = [{"name": f"Theme {i + 1}", "ideas": opinions[i::3][:5], "summary": SENTENCE} for i in range(3)]
+    return {"themes": [t for t in themes if t["ideas"]] or themes[:1]}
+
+
+def _feedback_themes(opinions: list[str]) -> dict:
+    return {
+        "positive_themes": [{"name": "Helpful people", "examples": opinions[0::2][:5]}],
+        "negative_themes": [{"name": "Tooling issues", "examples": opinions[1::2][:5]}],
+        "sentiment_score": 0.62,
+    }
+
+
+def _compact(prompt: str, opinions: list[str]) -> dict:
+    shape = prompt[prompt.find("Return JSON exactly in this shape:"):]
+    if '"classifications"' in shape:
+        data = {"classifications": _classifications(opinions)}
+    elif '"preferred_option"' in shape:
+        data = {**_mapping(opinions), "reasons": _reasons()}
+    elif '"parsed_opinions"' in shape:
+        data = {**_rankings(opinions), "top_reasons": _reasons()}
+    elif '"positive_themes"' in shape:
+        data = _feedback_themes(opinions)
+    else:
+        data = _idea_themes(opinions)
+    return {**data, "summary": SENTENCE, "recommendation": SENTENCE, "ai_thought": SENTENCE}
+
+
+def canned_json(prompt: str):
+    opinions = _opinions(prompt)
+    if "classifies questions into analytical categories" in prompt:
+        return _question_types(prompt)
+    if "In a single JSON object" in prompt:
+        return _compact(prompt, opinions)
+    if "Classify each opinion" in prompt:
+        return _classifications(opinions)
+    if "Identify all distinct options" in prompt:
+        return _mapping(opinions)
+    if "main reasons for each option" in prompt:
+        return {"reasons": _reasons()}
+    if "users rank options" in prompt:
+        return _rankings(opinions)
+    if "ranked higher or lower" in prompt:
+        return {"top_reasons": _reasons()}
+    if "already grouped into clusters" in prompt:
+        n = _clusters(prompt)
+        if '"polarity"' in prompt:
+            return {"clusters": [
+                {"cluster": i, "name": f"Theme {i}", "polarity": "positive" if i % 2 else "negative",
+                 "sentiment_score": 0.7 if i % 2 else 0.3}
+                for i in range(1, n + 1)
+            ]}
+        return {"themes": [{"cluster": i, "name": f"Theme {i}", "summary": SENTENCE} for i in range(1, n + 1)]}
+    if "high-level themes" in prompt:
+        return _idea_themes(opinions)
+    if '"positive_themes"' in prompt:
+        return _feedback_themes(opinions)
+    return {}
+
+
+# ---------------------------------------------------------------------
+# Latency and error injection
+# ---------------------------------------------------------------------
+def _latency() -> float:
+    mean, sigma = settings["latency_mean"], settings["latency_sigma"]
+    kind = settings["latency"]
+    if kind == "fixed":
+        return mean
+    if kind == "uniform":
+        return random.uniform(max(mean - sigma, 0.0), mean + sigma)
+    if kind == "normal":
+        return max(random.gauss(mean, sigma), 0.0)
+    # lognormal with the requested mean
+    if mean <= 0:
+        return 0.0
+    s = max(sigma, 1e-6)
+    return random.lognormvariate(math.log(mean) - s * s / 2, s)
+
+
+def _injected_error() -> JSONResponse | None:
+    roll = random.random()
+    if roll < settings["rate_limit_rate"]:
+        counters["429"] += 1
+        return JSONResponse({"message": "Requests rate limit exceeded"}, status_code=429, headers={"retry-after": "1"})
+    if roll < settings["rate_limit_rate"] + settings["error_rate"]:
+        counters["500"] += 1
+        return JSONResponse({"message": "Internal server error"}, status_code=500)
+    return None
+
+
+def _usage(messages: list[dict], text: str) -> dict:
+    prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4 + 1
+    completion_tokens = len(text) // 4 + 1
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+# ---------------------------------------------------------------------
+# Endpoints
+# ---------------------------------------------------------------------
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    counters["requests"] += 1
+    messages = body.get("messages") or []
+    prompt = messages[-1].get("content", "") if messages else ""
+    wants_json = (body.get("response_format") or {}).get("type") == "json_object"
+    text = json.dumps(canned_json(prompt), ensure_ascii=False) if wants_json else SENTENCE
+    model = body.get("model", "fake-mistral")
+    created = int(time.time())
+
+    if random.random() < settings["timeout_rate"]:
+        counters["timeouts"] += 1
+        await asyncio.sleep(3600)
+    await asyncio.sleep(_latency())
+    error = _injected_error()
+    if error is not None:
+        return error
+
+    if not body.get("stream"):
+        return {
+            "id": f"fake-{counters['requests']}",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": _usage(messages, text),
+        }
+
+    async def events():
+        pieces = re.findall(r"\S+\s*", text) or [text]
+        for i, piece in enumerate(pieces):
+            last = i == len(pieces) - 1
+            chunk = {
+                "id": f"fake-{counters['requests']}",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"role": "assistant", "content": piece},
+                    "finish_reason": "stop" if last else None,
+                }],
+            }
+            if last:
+                chunk["usage"] = _usage(messages, text)
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(settings["token_delay"])
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+def stats():
+    return dict(counters)
+
+
+@app.post("/config")
+def update_config(changes: dict):
+    for key, value in changes.items():
+        if key in settings:
+            settings[key] = type(settings[key])(value)
+    return settings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", choices=["fixed", "uniform", "normal", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-mean", type=float, default=0.8, help="seconds before the first byte")
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--token-delay", type=float, default=0.005, help="seconds between streamed fragments")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 500 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of 429 responses")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="share of requests that never answer")
+    args = parser.parse_args()
+    for key in settings:
+        settings[key] = getattr(args, key)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
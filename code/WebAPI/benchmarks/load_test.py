@@ -0,0 +1,237 @@
+"""
+Load test for the question → answers → analysis path of a running API.
+
+For each concurrency level the driver runs three phases against fresh data:
+1. question creation   POST /question/ (universal token; classification call)
+2. answer submission   POST /answer/{token}, `--answers` per question
+3. analysis            POST /analyze/{id}, then polls /analyze/report/{id}
+                       until the report is ready (latency = time to report)
+and prints p50/p95/p99 latency, throughput and error counts per phase.
+
+Run it against the local fake Mistral (benchmarks.fake_mistral) so results
+measure this service, not the upstream model:
+
+Usage (from code/WebAPI):
+    python -m benchmarks.fake_mistral --port 8089 &
+    MISTRAL_SERVER_URL=http://127.0.0.1:8089 uvicorn src.main:app --port 8000 &
+    python -m benchmarks.load_test [--base-url http://127.0.0.1:8000]
+        [--concurrency 1,8,32] [--questions 16] [--answers 40] [--json results.json]
+
+A team lead is registered for the run (a new random email each time).
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+import httpx
+
+ANSWERS = [
+    "Yes, absolutely, it would save us a lot of time.",
+    "No, I think the current setup works well enough.",
+    "Maybe, but only if the rollout is gradual.",
+    "I prefer option A because it is cheaper.",
+    "Option B, the team already knows the tooling.",
+    "Not sure, we need more data before deciding.",
+    "Definitely not, it adds maintenance overhead.",
+    "Yes, as long as we keep the old process as a fallback.",
+]
+EXTRA = ["honestly", "in my view", "for our team", "long term", "right now", "overall"]
+
+
+def _answer_text() -> str:
+    text = random.choice(ANSWERS)
+    return f"{text} {random.choice(EXTRA).capitalize()}." if random.random() < 0.5 else text
+
+
+def _percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, max(0, round(q / 100 * len(values) + 0.5) - 1))]
+
+
+class PhaseResult:
+    def __init__(self, phase: str, concurrency: int):
+        self.phase = phase
+        self.concurrency = concurrency
+        self.latencies: list[float] = []
+        self.errors: dict[str, int] = {}
+        self.wall = 0.0
+
+    def error(self, kind: str) -> None:
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def summary(self) -> dict:
+        values = sorted(self.latencies)
+        return {
+            "phase": self.phase,
+            "concurrency": self.concurrency,
+            "ok": len(values),
+            "errors": sum(self.errors.values()),
+            "error_kinds": self.errors,
+            "p50_ms": round(_percentile(values, 50) * 1000, 1),
+            "p95_ms": round(_percentile(values, 95) * 1000, 1),
+            "p99_ms": round(_percentile(values, 99) * 1000, 1),
+            "rps": round(len(values) / self.wall, 2) if self.wall else 0.0,
+            "wall_s": round(self.wall, 2),
+        }
+
+
+async def run_phase(phase: str, concurrency: int, jobs: list, timed) -> tuple[PhaseResult, list]:
+    """
+    Run `timed(job)` for every job with at most `concurrency` in flight.
+    `timed` returns the value to keep (or raises); its duration is the latency.
+    """
+    result = PhaseResult(phase, concurrency)
+    outputs: list = [None] * len(jobs)
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in enumerate(jobs):
+        queue.put_nowait(item)
+
+    async def worker():
+        while not queue.empty():
+            i, job = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                outputs[i] = await timed(job)
+            except httpx.HTTPStatusError as exc:
+                result.error(str(exc.response.status_code))
+            except Exception as exc:
+                result.error(type(exc).__name__)
+            else:
+                result.latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.wall = time.perf_counter() - started
+    return result, outputs
+
+
+# ---------------------------------------------------------------------
+# API calls
+# ---------------------------------------------------------------------
+async def login(client: httpx.AsyncClient) -> dict:
+    email = f"load-{uuid.uuid4().hex[:10]}@example.com"
+    password = "load-test-password"
+    r = await client.post("/auth/register", json={"name": "Load", "lastname": "Test", "email": email, "password": password})
+    r.raise_for_status()
+    r = await client.post("/auth/token", data={"username": email, "password": password})
+    r.raise_for_status()
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def create_question(client: httpx.AsyncClient, headers: dict, content: str) -> tuple[int, str]:
+    r = await client.post("/question/", headers=headers, json={
+        "content": content,
+        "token_type": "universal",
+        "teams_ids": [],
+    })
+    r.raise_for_status()
+    data = r.json()
+    return data["question"]["id"], data["tokens"][0]
+
+
+async def submit_answer(client: httpx.AsyncClient, token: str) -> None:
+    r = await client.post(f"/answer/{token}", json={"content": _answer_text()})
+    r.raise_for_status()
+
+
+async def analyze(client: httpx.AsyncClient, headers: dict, question_id: int, poll: float, timeout: float) -> None:
+    r = await client.post(f"/analyze/{question_id}", headers=headers)
+    r.raise_for_status()
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(poll)
+        r = await client.get(f"/analyze/report/{question_id}", headers=headers)
+        r.raise_for_status()
+        status = r.json().get("status")
+        if status == "ready":
+            return
+        if status == "failed":
+            raise RuntimeError("analysis failed")
+    raise TimeoutError("analysis did not finish in time")
+
+
+# ---------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------
+QUESTIONS = [
+    "Should we move the weekly meeting to Friday?",
+    "Which tool do you prefer for code review, option A or option B?",
+    "Rank these priorities for next quarter: hiring, tooling, documentation.",
+    "What ideas do you have to improve onboarding?",
+    "How was your experience with the new deployment process?",
+]
+
+
+async def run_level(client: httpx.AsyncClient, headers: dict, concurrency: int, args) -> list[PhaseResult]:
+    contents = [f"{QUESTIONS[i % len(QUESTIONS)]} ({uuid.uuid4().hex[:6]})" for i in range(args.questions)]
+    created, questions = await run_phase(
+        "create_question", concurrency, contents, lambda c: create_question(client, headers, c)
+    )
+    questions = [q for q in questions if q is not None]
+
+    tokens = [token for _, token in questions for _ in range(args.answers)]
+    random.shuffle(tokens)
+    answered, _ = await run_phase("submit_answer", concurrency, tokens, lambda t: submit_answer(client, t))
+
+    ids = [question_id for question_id, _ in questions]
+    analyzed, _ = await run_phase(
+        "analyze", concurrency, ids, lambda q: analyze(client, headers, q, args.poll, args.analysis_timeout)
+    )
+    return [created, answered, analyzed]
+
+
+def print_table(rows: list[dict]) -> None:
+    header = f"{'phase':<16} {'conc':>5} {'ok':>6} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rps':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        print(
+            f"{r['phase']:<16} {r['concurrency']:>5} {r['ok']:>6} {r['errors']:>5} "
+            f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} {r['rps']:>8}"
+        )
+        if r["error_kinds"]:
+            print(f"{'':<16} errors: {r['error_kinds']}")
+
+
+async def main_async(args) -> list[dict]:
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    limits = httpx.Limits(max_connections=max(levels) * 2)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.request_timeout, limits=limits) as client:
+        headers = await login(client)
+        rows = []
+        for concurrency in levels:
+            print(f"ℹ️  Concurrency {concurrency}...")
+            rows.extend(r.summary() for r in await run_level(client, headers, concurrency, args))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated levels")
+    parser.add_argument("--questions", type=int, default=16, help="questions created (and analyzed) per level")
+    parser.add_argument("--answers", type=int, default=40, help="answers submitted per question")
+    parser.add_argument("--poll", type=float, default=0.25, help="seconds between report polls")
+    parser.add_argument("--analysis-timeout", type=float, default=600.0)
+    parser.add_argument("--request-timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    rows = asyncio.run(main_async(args))
+    print()
+    print_table(rows)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -85,3 +85,11 @@ CREATE TABLE team_question (
     FOREIGN KEY (team_id) REFERENCES team(id) ON DELETE CASCADE,
     FOREIGN KEY (question_id) REFERENCES question(id) ON DELETE CASCADE
 );
+
+#-------------------------------------------------------------------------------------
+# Indexes on hot lookup columns (migration 2 in src/db/migrations.py)
+CREATE INDEX ix_answer_question_id_created_at ON answer (question_id, created_at);
+CREATE INDEX ix_token_question_id ON token (question_id);
+CREATE INDEX ix_question_team_lead_id ON question (team_lead_id);
+CREATE INDEX ix_team_team_lead_id ON team (team_lead_id);
+CREATE INDEX ix_user_team_team_id ON user_team (team_id);
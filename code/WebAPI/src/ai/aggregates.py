@@ -0,0 +1,133 @@
+"""
+Deterministic aggregates computed locally from per-opinion LLM output.
+
+The model only parses each opinion (its stance, preferred option or
+ranking); counting and averaging happen here with vectorized NumPy code,
+so the numbers are exact and cost no output tokens.
+
+Option names are matched case- and whitespace-insensitively; results are
+keyed by the spelling in the options list so the frontend can look them up.
+Entries may carry a "weight" (collapsed duplicate answers); it defaults to 1.
+"""
+
+from typing import Any
+
+import numpy as np
+
+STANCES = ("pro", "contra", "neutral")
+
+
+def _norm(name: Any) -> str:
+    return " ".join(str(name).split()).casefold()
+
+
+def _weight(entry: dict) -> float:
+    try:
+        return max(float(entry.get("weight", 1)), 0.0)
+    except (TypeError, ValueError):
+        return 1.0
+
+
+def _count(value: float) -> int | float:
+    return int(value) if float(value).is_integer() else round(float(value), 2)
+
+
+def _option_index(options: list, extra: list) -> tuple[list, dict[str, int]]:
+    """Canonical option list (declared options, then unseen names from `extra`) and its lookup."""
+    canonical: list = []
+    index: dict[str, int] = {}
+    for name in list(options or []) + list(extra):
+        if name is None or not str(name).strip():
+            continue
+        key = _norm(name)
+        if key not in index:
+            index[key] = len(canonical)
+            canonical.append(name)
+    return canonical, index
+
+
+# ---------------------------------------------------------------------
+# Stance analysis
+# ---------------------------------------------------------------------
+def stance_distribution(classifications: list) -> dict[str, int]:
+    """Count pro / contra / neutral labels, weighted."""
+    entries = [c for c in classifications if isinstance(c, dict)]
+    labels = np.array([str(c.get("classification", "")).strip().lower() for c in entries], dtype=object)
+    weights = np.array([_weight(c) for c in entries], dtype=np.float64)
+    return {stance: _count(weights[labels == stance].sum()) for stance in STANCES}
+
+
+# ---------------------------------------------------------------------
+# Option comparison
+# ---------------------------------------------------------------------
+def vote_counts(options: list, mapping: list) -> tuple[list, dict]:
+    """
+    Count the preferred option of every mapped opinion, weighted.
+    Returns (options, votes); options named only in the mapping are appended.
+    """
+    entries = [
+        m for m in mapping
+        if isinstance(m, dict) and m.get("preferred_option") not in (None, "")
+    ]
+    canonical, index = _option_index(options, [m["preferred_option"] for m in entries])
+    picks = np.array([index[_norm(m["preferred_option"])] for m in entries], dtype=np.int64)
+    weights = np.array([_weight(m) for m in entries], dtype=np.float64)
+    counts = np.bincount(picks, weights=weights, minlength=len(canonical))
+    return canonical, {name: _count(count) for name, count in zip(canonical, counts)}
+
+
+# ---------------------------------------------------------------------
+# Priority ranking
+# ---------------------------------------------------------------------
+def ranking_stats(options: list, parsed_opinions: list) -> dict:
+    """
+    Aggregate per-opinion rankings (most important first), weighted.
+
+    Returns
+    -------
+    dict
+        options          — canonical option list
+        average_ranking  — mean position per option (1 = highest priority)
+        rank_variance    — population variance of that position
+        borda_counts     — Borda score (m - position points, m = number of options)
+        responses        — how many opinions ranked each option
+
+    Options nobody ranked are left out of the per-option mappings.
+    """
+    entries = [p for p in parsed_opinions if isinstance(p, dict) and isinstance(p.get("ranking"), list)]
+    rankings = [p["ranking"] for p in entries]
+    w = np.array([_weight(p) for p in entries], dtype=np.float64)[:, None]
+    canonical, index = _option_index(options, [name for ranking in rankings for name in ranking])
+    m = len(canonical)
+
+    rows, cols, positions = [], [], []
+    for row, ranking in enumerate(rankings):
+        seen = set()
+        for position, name in enumerate(ranking):
+            col = index.get(_norm(name)) if name is not None else None
+            if col is None or col in seen:
+                continue
+            seen.add(col)
+            rows.append(row)
+            cols.append(col)
+            positions.append(position + 1)
+
+    # opinions × options matrix of 1-based positions, NaN where unranked
+    ranks = np.full((len(rankings), m), np.nan)
+    ranks[np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)] = positions
+    ranked = ~np.isnan(ranks)
+    n = (ranked * w).sum(axis=0)
+    filled = np.where(ranked, ranks, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = (w * filled).sum(axis=0) / n
+        variance = (w * filled ** 2).sum(axis=0) / n - mean ** 2
+    borda = (w * np.where(ranked, m - ranks, 0.0)).sum(axis=0)
+
+    present = [i for i in range(m) if n[i]]
+    return {
+        "options": canonical,
+        "average_ranking": {canonical[i]: round(float(mean[i]), 2) for i in present},
+        "rank_variance": {canonical[i]: round(max(float(variance[i]), 0.0), 2) for i in present},
+        "borda_counts": {canonical[i]: _count(borda[i]) for i in range(m)},
+        "responses": {canonical[i]: _count(n[i]) for i in range(m)},
+    }
@@ -0,0 +1,165 @@
+"""
+Local pre-clustering of free-text answers.
+
+Large idea / feedback questions are grouped on the CPU before anything is
+sent to Mistral: answers become TF-IDF vectors, spherical k-means (NumPy,
+k-means++ seeding, fixed seed) groups them, and only a few representative
+answers per cluster are sent to the model for naming and summarizing.
+Prompt size is therefore bounded by k × samples instead of answer count.
+"""
+
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+import numpy as np
+
+_TOKEN = re.compile(r"[^\W\d_]{2,}")
+
+
+@dataclass(frozen=True)
+class Cluster:
+    """
+    Indices of the texts in one cluster, most central first, its representative
+    texts and how many answers it covers (texts may stand for several answers).
+    """
+    indices: list[int]
+    representatives: list[str]
+    size: int
+
+
+def _tokens(text: str) -> list[str]:
+    return _TOKEN.findall(text.casefold())
+
+
+def tfidf_matrix(texts: list[str], max_features: int = 1024) -> np.ndarray:
+    """
+    L2-normalized TF-IDF vectors (float32, texts × terms).
+
+    Terms present in a single text carry no grouping signal and are dropped,
+    as are terms in more than half of the texts; the `max_features` most
+    frequent of the rest form the vocabulary.
+    """
+    docs = [Counter(_tokens(t)) for t in texts]
+    n = len(docs)
+    df = Counter(term for doc in docs for term in doc)
+    max_df = max(2, n // 2) if n >= 10 else n
+    candidates = [(count, term) for term, count in df.items() if 2 <= count <= max_df or n < 4]
+    vocab = {term: i for i, (_, term) in enumerate(sorted(candidates, key=lambda c: (-c[0], c[1]))[:max_features])}
+
+    X = np.zeros((n, len(vocab)), dtype=np.float32)
+    for row, doc in enumerate(docs):
+        for term, count in doc.items():
+            col = vocab.get(term)
+            if col is not None:
+                X[row, col] = 1.0 + np.log(count)
+    idf = np.log((1 + n) / (1 + np.array([df[t] for t in vocab], dtype=np.float32))) + 1.0
+    X *= idf
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    np.divide(X, norms, out=X, where=norms > 0)
+    return X
+
+
+def kmeans(X: np.ndarray, k: int, weights: np.ndarray | None = None, iters: int = 50, seed: int = 0) -> np.ndarray:
+    """Weighted spherical k-means with k-means++ seeding; returns a label per row."""
+    n = X.shape[0]
+    w = np.ones(n, dtype=np.float32) if weights is None else np.asarray(weights, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+
+    # --- k-means++ seeding ---
+    centers = [X[rng.choice(n, p=w / w.sum())]]
+    closest = ((X - centers[0]) ** 2).sum(axis=1) * w
+    while len(centers) < k:
+        total = closest.sum()
+        if total <= 1e-12:
+            break  # fewer distinct points than clusters
+        centers.append(X[rng.choice(n, p=closest / total)])
+        closest = np.minimum(closest, ((X - centers[-1]) ** 2).sum(axis=1) * w)
+    C = np.stack(centers)
+
+    # --- Lloyd iterations on the unit sphere ---
+    labels = np.full(n, -1)
+    for _ in range(iters):
+        new_labels = np.argmax(X @ C.T, axis=1)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for j in range(C.shape[0]):
+            mask = labels == j
+            if mask.any():
+                center = w[mask] @ X[mask]
+                norm = np.linalg.norm(center)
+                C[j] = center / norm if norm > 0 else center
+    return labels
+
+
+def choose_k(n: int, k_min: int, k_max: int) -> int:
+    """Rule-of-thumb sqrt(n/2) clusters, clamped to [k_min, k_max] and to n."""
+    return max(1, min(n, max(k_min, min(k_max, int(round(np.sqrt(n / 2)))))))
+
+
+def cluster_texts(
+    texts: list[str],
+    k_min: int = 3,
+    k_max: int = 6,
+    samples: int = 5,
+    weights: list[int] | None = None,
+) -> list[Cluster]:
+    """
+    Group texts into k clusters, largest first.
+
+    Each cluster lists its members ordered by closeness to the centroid and
+    up to `samples` representative texts with distinct wording. `weights`
+    (answers per text) pull centroids towards common answers and add up to
+    the cluster size.
+    """
+    if not texts:
+        return []
+    w = np.ones(len(texts)) if weights is None else np.asarray(weights, dtype=np.float64)
+    X = tfidf_matrix(texts)
+    labels = kmeans(X, choose_k(len(texts), k_min, k_max), weights=w)
+
+    clusters = []
+    for label in np.unique(labels):
+        members = np.flatnonzero(labels == label)
+        centroid = X[members].mean(axis=0)
+        order = members[np.argsort(-(X[members] @ centroid), kind="stable")]
+        representatives: list[str] = []
+        seen: set[tuple] = set()
+        for i in order:
+            # Distinct by wording, so "Yes!" and "yes" do not both take a slot
+            signature = tuple(_tokens(texts[i])) or (texts[i],)
+            if signature not in seen:
+                seen.add(signature)
+                representatives.append(texts[i])
+            if len(representatives) == samples:
+                break
+        clusters.append(Cluster([int(i) for i in order], representatives, int(w[members].sum())))
+    return sorted(clusters, key=lambda c: (-c.size, c.indices[0]))
+
+
+def cluster_payload(clusters: list[Cluster]) -> list[dict]:
+    """Prompt-ready description of the clusters (1-based number, size, samples)."""
+    return [
+        {"cluster": i, "size": c.size, "samples": c.representatives}
+        for i, c in enumerate(clusters, start=1)
+    ]
+
+
+def align_cluster_output(result, clusters: list[Cluster], key: str) -> list[dict]:
+    """
+    Match the model's per-cluster objects (under `key`) to the clusters by their
+    1-based `cluster` number, falling back to list position; missing ones are {}.
+    """
+    items = result.get(key) if isinstance(result, dict) else result
+    items = [item for item in items if isinstance(item, dict)] if isinstance(items, list) else []
+    by_number = {}
+    for item in items:
+        try:
+            by_number.setdefault(int(item.get("cluster")), item)
+        except (TypeError, ValueError):
+            continue
+    return [
+        by_number.get(i) or (items[i - 1] if i - 1 < len(items) and not by_number else {})
+        for i in range(1, len(clusters) + 1)
+    ]
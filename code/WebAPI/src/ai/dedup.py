@@ -0,0 +1,147 @@
+"""
+Near-duplicate answer collapsing.
+
+With universal tokens many respondents send the same answer ("Yes",
+"yes!", copy-pasted text). Before analysis, answers are normalized and
+grouped: identical normalized texts are merged directly, longer texts whose
+character-shingle Jaccard similarity reaches the threshold are merged via
+MinHash + LSH candidate search (verified with the exact Jaccard). Each group
+is sent to Mistral once and carries its multiplicity as a weight, which the
+local aggregates honour.
+"""
+
+import re
+import unicodedata
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.config import ANALYSIS_DEDUP_THRESHOLD
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+_SHINGLE = 5
+_BANDS, _ROWS = 16, 4                    # 64 hash functions; candidate pairs from ~0.5 similarity
+_MAX_COMPARE = 32                        # representatives checked per bucket member
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240601)  # fixed, so grouping is reproducible
+_A = _rng.integers(1, _PRIME, size=_BANDS * _ROWS, dtype=np.int64)
+_B = _rng.integers(0, _PRIME, size=_BANDS * _ROWS, dtype=np.int64)
+
+
+@dataclass(frozen=True)
+class AnswerGroup:
+    """A distinct answer (its first occurrence), how many answers it stands for and their positions."""
+    text: str
+    weight: int
+    indices: list[int]
+
+
+def normalize(text: str) -> str:
+    """Unicode-normalized, case-folded text with punctuation and extra whitespace removed."""
+    folded = unicodedata.normalize("NFKC", text).casefold()
+    return " ".join(_NON_WORD.sub(" ", folded).split())
+
+
+def _shingles(norm: str) -> set[str]:
+    return {norm[i:i + _SHINGLE] for i in range(len(norm) - _SHINGLE + 1)}
+
+
+def _signature(shingles: set[str]) -> np.ndarray:
+    hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.int64, count=len(shingles))
+    return ((np.outer(hashes, _A) + _B) % _PRIME).min(axis=0)
+
+
+def _find(parent: list[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def collapse_duplicates(texts: list[str], threshold: float | None = None) -> list[AnswerGroup]:
+    """
+    Group identical and near-identical answers, in order of first occurrence.
+
+    Texts too short to shingle (or empty after normalization) only merge
+    with exact normalized matches.
+    """
+    threshold = ANALYSIS_DEDUP_THRESHOLD if threshold is None else threshold
+
+    # --- Exact matches on normalized text ---
+    keys: dict[str, int] = {}
+    members: list[list[int]] = []
+    norms: list[str] = []
+    for i, text in enumerate(texts):
+        norm = normalize(text) or text.strip()
+        slot = keys.get(norm)
+        if slot is None:
+            keys[norm] = slot = len(members)
+            members.append([])
+            norms.append(norm)
+        members[slot].append(i)
+
+    # --- Near duplicates: MinHash LSH candidates, verified by exact Jaccard ---
+    parent = list(range(len(members)))
+    if threshold < 1.0:
+        shingles = {j: _shingles(norm) for j, norm in enumerate(norms) if len(norm) >= _SHINGLE * 2}
+        buckets: dict[tuple, list[int]] = {}
+        for j, grams in shingles.items():
+            signature = _signature(grams)
+            for band in range(_BANDS):
+                key = (band, signature[band * _ROWS:(band + 1) * _ROWS].tobytes())
+                buckets.setdefault(key, []).append(j)
+        for bucket in buckets.values():
+            # Compare each member with one representative per group already in
+            # the bucket (the most recent few), so thousands of copies of one
+            # answer, or of a template answer with small edits, stay linear.
+            representatives: list[int] = []
+            for a in bucket:
+                ra = _find(parent, a)
+                for b in reversed(representatives[-_MAX_COMPARE:]):
+                    rb = _find(parent, b)
+                    if ra == rb:
+                        break
+                    sa, sb = shingles[a], shingles[b]
+                    if len(sa & sb) / len(sa | sb) >= threshold:
+                        parent[max(ra, rb)] = min(ra, rb)
+                        break
+                else:
+                    representatives.append(a)
+
+    grouped: dict[int, list[int]] = {}
+    for j in range(len(members)):
+        grouped.setdefault(_find(parent, j), []).extend(members[j])
+    groups = [sorted(indices) for indices in grouped.values()]
+    groups.sort(key=lambda indices: indices[0])
+    return [AnswerGroup(texts[indices[0]], len(indices), indices) for indices in groups]
+
+
+def attach_weights(entries: list, texts: list[str], weights: list[int]) -> list:
+    """
+    Copy per-opinion LLM entries with the weight of the answer they describe.
+
+    Entries are matched on their echoed "opinion" text, falling back to
+    position; entries that already carry a weight keep it.
+    """
+    by_text: dict[str, int] = {}
+    for text, weight in zip(texts, weights):
+        by_text.setdefault(normalize(text), weight)
+    out = []
+    for i, entry in enumerate(entries):
+        if not isinstance(entry, dict) or "weight" in entry:
+            out.append(entry)
+            continue
+        weight = by_text.get(normalize(str(entry.get("opinion", ""))))
+        if weight is None:
+            weight = weights[i] if i < len(weights) else 1
+        out.append({**entry, "weight": weight})
+    return out
+
+
+def weighted_listing(texts: list[str], weights: list[int] | None) -> list[str]:
+    """Texts for prompts that summarize rather than classify, with "(×n)" on repeated answers."""
+    if not weights:
+        return texts
+    return [f"{text} (×{weight})" if weight > 1 else text for text, weight in zip(texts, weights)]
@@ -0,0 +1,230 @@
+"""
+Content-addressed cache for Mistral responses.
+
+Entries are keyed on (model, temperature, response_format, messages) and
+store the raw response text, so callers always parse a fresh object.
+
+Tiers:
+- an in-process LRU with TTL and a max entry count;
+- an optional persistent tier (the `llm_cache` table in the app database),
+  enabled with LLM_CACHE_PERSIST and pruned to LLM_CACHE_PERSIST_MAX_ENTRIES.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from src.config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_PERSIST,
+    LLM_CACHE_PERSIST_MAX_ENTRIES,
+)
+
+# Prune the persistent tier once every N writes rather than on each one
+_PRUNE_EVERY = 100
+
+
+def make_key(model: str, temperature: float, response_format: dict | None, messages: list[dict]) -> str:
+    """Return a stable SHA-256 hex digest for a chat request."""
+    payload = json.dumps(
+        {
+            "model": model,
+            "temperature": temperature,
+            "response_format": response_format,
+            "messages": messages,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Two-tier (memory LRU + optional DB) response cache with hit/miss counters."""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_entries: int = 1024,
+        ttl_seconds: int = 86400,
+        persist: bool = False,
+        persist_max_entries: int = 20000,
+    ):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist = persist
+        self.persist_max_entries = persist_max_entries
+
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._counters = {
+            "memory_hits": 0,
+            "persistent_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    # -----------------------------------------------------------------
+    # Public API
+    # -----------------------------------------------------------------
+    def get(self, key: str) -> str | None:
+        """Return the cached response text for `key`, or None."""
+        if not self.enabled:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, text = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return text
+                del self._entries[key]
+                self._counters["expirations"] += 1
+
+        if self.persist:
+            text = self._db_get(key)
+            if text is not None:
+                with self._lock:
+                    self._counters["persistent_hits"] += 1
+                    self._memory_put(key, text, now)
+                return text
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def put(self, key: str, model: str, text: str) -> None:
+        """Store a response text in every enabled tier."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._memory_put(key, text, time.monotonic())
+            self._counters["stores"] += 1
+
+        if self.persist:
+            self._db_put(key, model, text)
+
+    def clear(self) -> None:
+        """Drop all in-process entries (the persistent tier is left untouched)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Snapshot of counters and sizes, for monitoring."""
+        with self._lock:
+            lookups = self._counters["memory_hits"] + self._counters["persistent_hits"] + self._counters["misses"]
+            hits = lookups - self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "persistent": self.persist,
+            }
+
+    # -----------------------------------------------------------------
+    # Memory tier (caller holds the lock)
+    # -----------------------------------------------------------------
+    def _memory_put(self, key: str, text: str, now: float) -> None:
+        self._entries[key] = (now + self.ttl_seconds, text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    # -----------------------------------------------------------------
+    # Persistent tier
+    # -----------------------------------------------------------------
+    def _db_get(self, key: str) -> str | None:
+        from src.db.session import SessionLocal
+        from src.db.models import LLMCacheEntry
+
+        session = SessionLocal()
+        try:
+            entry = session.get(LLMCacheEntry, key)
+            if entry is None:
+                return None
+            if entry.expires_at <= datetime.utcnow():
+                session.delete(entry)
+                session.commit()
+                with self._lock:
+                    self._counters["expirations"] += 1
+                return None
+            return entry.response
+        except Exception as e:
+            session.rollback()
+            print(f"⚠️  LLM cache read failed: {e}")
+            return None
+        finally:
+            session.close()
+
+    def _db_put(self, key: str, model: str, text: str) -> None:
+        from src.db.session import SessionLocal
+        from src.db.models import LLMCacheEntry
+
+        session = SessionLocal()
+        try:
+            session.merge(
+                LLMCacheEntry(
+                    key=key,
+                    model=model,
+                    response=text,
+                    expires_at=datetime.utcnow() + timedelta(seconds=self.ttl_seconds),
+                )
+            )
+            session.commit()
+
+            with self._lock:
+                self._writes += 1
+                prune = self._writes % _PRUNE_EVERY == 0
+            if prune:
+                self._db_prune(session)
+        except Exception as e:
+            session.rollback()
+            print(f"⚠️  LLM cache write failed: {e}")
+        finally:
+            session.close()
+
+    def _db_prune(self, session) -> None:
+        """Delete expired rows, then the oldest rows beyond the size limit."""
+        from src.db.models import LLMCacheEntry
+
+        session.query(LLMCacheEntry).filter(LLMCacheEntry.expires_at <= datetime.utcnow()).delete(
+            synchronize_session=False
+        )
+        overflow = session.query(LLMCacheEntry).count() - self.persist_max_entries
+        if overflow > 0:
+            oldest = [
+                k for (k,) in session.query(LLMCacheEntry.key)
+                .order_by(LLMCacheEntry.created_at.asc())
+                .limit(overflow)
+            ]
+            session.query(LLMCacheEntry).filter(LLMCacheEntry.key.in_(oldest)).delete(
+                synchronize_session=False
+            )
+            with self._lock:
+                self._counters["evictions"] += overflow
+        session.commit()
+
+
+llm_cache = LLMCache(
+    enabled=LLM_CACHE_ENABLED,
+    max_entries=LLM_CACHE_MAX_ENTRIES,
+    ttl_seconds=LLM_CACHE_TTL_SECONDS,
+    persist=LLM_CACHE_PERSIST,
+    persist_max_entries=LLM_CACHE_PERSIST_MAX_ENTRIES,
+)
@@ -0,0 +1,157 @@
+"""
+Map-reduce engine for questions with many answers.
+
+Pipelines used to put every opinion into a single prompt, which overflows
+the context window on large questions. Here the opinions are split into
+token-budgeted chunks, each chunk is analyzed concurrently (the Mistral
+client semaphore bounds the fan-out) and the partial results are merged
+with deterministic, order-preserving reducers. Latency therefore follows
+chunk parallelism instead of answer count.
+
+Questions that fit in one chunk are analyzed exactly as before. A step can
+also resume from a previous run: the earlier (items, result) pair is reduced
+together with the chunks of new items only, so re-analysis costs scale with
+the number of answers added since.
+"""
+
+import asyncio
+import json
+from typing import Any, Awaitable, Callable
+
+from src.ai.mistral_client import ask_mistral_async
+from src.ai.prompt_graph import PromptStep
+from src.ai.tokens import estimate_tokens
+from src.config import ANALYSIS_CHUNK_TOKENS
+
+
+def chunk_opinions(opinions: list, budget: int | None = None) -> list[list]:
+    """
+    Split opinions (or any JSON-serializable items), in order, into chunks whose
+    JSON-encoded size stays within `budget` tokens. An item larger than the
+    budget gets a chunk of its own.
+    """
+    budget = budget or ANALYSIS_CHUNK_TOKENS
+    chunks: list[list] = []
+    current: list = []
+    used = 0
+    for opinion in opinions:
+        cost = estimate_tokens(json.dumps(opinion, indent=2)) + 2  # indentation and separator
+        if current and used + cost > budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(opinion)
+        used += cost
+    if current or not chunks:
+        chunks.append(current)
+    return chunks
+
+
+async def map_reduce(
+    opinions: list,
+    map_chunk: Callable[[list], Awaitable[Any]],
+    reduce: Callable[[list[tuple[list, Any]]], Any],
+    budget: int | None = None,
+    previous: tuple[list, Any] | None = None,
+) -> Any:
+    """
+    Run `map_chunk` on every chunk concurrently and merge with `reduce`.
+
+    `reduce` receives (chunk, result) pairs in chunk order, preceded by
+    `previous` when resuming an earlier run. With a single chunk and nothing
+    to resume the mapped result is returned unchanged.
+    """
+    if previous is None:
+        chunks = chunk_opinions(opinions, budget)
+        if len(chunks) == 1:
+            return await map_chunk(chunks[0])
+        parts = []
+    else:
+        chunks = chunk_opinions(opinions, budget) if opinions else []
+        parts = [previous]
+
+    if len(chunks) > 1:
+        print(f"ℹ️  Analyzing {len(opinions)} items in {len(chunks)} chunks.")
+    results = await asyncio.gather(*(map_chunk(chunk) for chunk in chunks))
+    return reduce(parts + list(zip(chunks, results)))
+
+
+def map_reduce_step(
+    name: str,
+    items: Callable[[dict[str, Any]], list],
+    build: Callable[[dict[str, Any], list], str],
+    reduce: Callable[[list[tuple[list, Any]]], Any],
+    depends_on: tuple[str, ...] = (),
+    previous: tuple[list, Any] | None = None,
+    finalize: Callable[[Any], Any] | None = None,
+) -> PromptStep:
+    """
+    Prompt-graph step that sends `build(deps, chunk)` for every chunk of
+    `items(deps)` and merges the JSON results with `reduce`, on top of the
+    `previous` (items, result) pair when resuming. `finalize` post-processes
+    the merged result (e.g. local aggregates) before dependents see it.
+    """
+    async def run(deps: dict[str, Any]):
+        async def ask(chunk: list):
+            return await ask_mistral_async(build(deps, chunk))
+
+        result = await map_reduce(items(deps), ask, reduce, previous=previous)
+        return finalize(result) if finalize else result
+
+    return PromptStep(name, None, depends_on=depends_on, run=run)
+
+
+# ---------------------------------------------------------------------
+# Deterministic reducers
+# ---------------------------------------------------------------------
+def _norm(name: Any) -> str:
+    return " ".join(str(name).split()).casefold()
+
+
+def merge_names(lists: list[list]) -> list:
+    """Union of names, case/whitespace-insensitive, keeping first spelling and order."""
+    seen: dict[str, Any] = {}
+    for names in lists:
+        for name in names or []:
+            seen.setdefault(_norm(name), name)
+    return list(seen.values())
+
+
+def merge_lists(lists: list[list]) -> list:
+    """Concatenate lists in order."""
+    return [item for items in lists for item in (items or [])]
+
+
+def merge_text_lists(mappings: list[dict]) -> dict:
+    """Merge {name: [text, ...]} mappings, dropping duplicate texts."""
+    canonical: dict[str, Any] = {}
+    merged: dict[str, list] = {}
+    for mapping in mappings:
+        for name, texts in (mapping or {}).items():
+            key = _norm(name)
+            canonical.setdefault(key, name)
+            bucket = merged.setdefault(key, [])
+            for text in texts if isinstance(texts, list) else [texts]:
+                if text not in bucket:
+                    bucket.append(text)
+    return {canonical[key]: merged[key] for key in canonical}
+
+
+def merge_themes(themes: list[list[dict]], list_key: str) -> list[dict]:
+    """
+    Merge theme objects with the same name, concatenating their `list_key`
+    entries. Themes are ordered by size, ties keeping first-seen order.
+    """
+    merged: dict[str, dict] = {}
+    for chunk_themes in themes:
+        for theme in chunk_themes or []:
+            if not isinstance(theme, dict):
+                continue
+            key = _norm(theme.get("name", ""))
+            if key not in merged:
+                merged[key] = {**theme, list_key: list(theme.get(list_key) or [])}
+                continue
+            bucket = merged[key][list_key]
+            for item in theme.get(list_key) or []:
+                if item not in bucket:
+                    bucket.append(item)
+    return sorted(merged.values(), key=lambda t: -len(t[list_key]))
@@ -1,25 +1,251 @@
+import asyncio
 import json
+from typing import Callable
+
+import httpx
 from mistralai import Mistral
-from src.config import MISTRAL_API_KEY, MISTRAL_MODEL
+from src.config import (
+    MISTRAL_API_KEY,
+    MISTRAL_MODEL,
+    MISTRAL_MAX_CONNECTIONS,
+    MISTRAL_MAX_KEEPALIVE,
+    MISTRAL_KEEPALIVE_EXPIRY,
+    MISTRAL_MAX_CONCURRENCY,
+    MISTRAL_TIMEOUT,
+    MISTRAL_SERVER_URL,
+)
+from src.ai.llm_cache import llm_cache, make_key
+from src.ai.resilience import mistral_resilience
+from src.ai.tokens import current_step, token_usage
+from src import telemetry
+
+# ---------------------------------------------------------------------
+# Shared, pooled HTTP clients (one per process)
+# ---------------------------------------------------------------------
+_limits = httpx.Limits(
+    max_connections=MISTRAL_MAX_CONNECTIONS,
+    max_keepalive_connections=MISTRAL_MAX_KEEPALIVE,
+    keepalive_expiry=MISTRAL_KEEPALIVE_EXPIRY,
+)
+_http_client = httpx.Client(limits=_limits, timeout=MISTRAL_TIMEOUT)
+_async_http_client = httpx.AsyncClient(limits=_limits, timeout=MISTRAL_TIMEOUT)
+
+client = Mistral(
+    api_key=MISTRAL_API_KEY,
+    server_url=MISTRAL_SERVER_URL,
+    client=_http_client,
+    async_client=_async_http_client,
+)
 
-client = Mistral(api_key=MISTRAL_API_KEY)
+# Caps in-flight async calls; created lazily so it binds to the serving loop
+_semaphore: asyncio.Semaphore | None = None
 
 
-def ask_mistral(prompt: str, format_json: bool = True, temperature: float = 0.3):
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(MISTRAL_MAX_CONCURRENCY)
+    return _semaphore
+
+
+# ---------------------------------------------------------------------
+# Multi-turn sessions
+# ---------------------------------------------------------------------
+class ChatSession:
     """
-    Send a prompt to the Mistral API and optionally parse a JSON response.
-    Returns either a dictionary or a plain string.
+    Conversation shared by several prompts.
+
+    Context (e.g. the opinions) is sent once as a system message; each
+    `ask_mistral(..., session=...)` call sends the accumulated messages plus
+    its prompt and, on success, appends the exchange, so follow-up prompts
+    can be short instructions ("explain your recommendation") instead of
+    re-serializing earlier payloads. Use `fork()` for concurrent branches.
     """
-    response = client.chat.complete(
-        model=MISTRAL_MODEL,
-        temperature=temperature,
-        response_format={"type": "json_object"} if format_json else None,
-        messages=[{"role": "user", "content": prompt}],
-    )
-    text = response.choices[0].message.content
+
+    def __init__(self, context: str | None = None, messages: list[dict] | None = None):
+        self.messages: list[dict] = list(messages or [])
+        if context:
+            self.messages.insert(0, {"role": "system", "content": context})
+
+    def fork(self) -> "ChatSession":
+        return ChatSession(messages=self.messages)
+
+    def extend(self, other: "ChatSession") -> "ChatSession":
+        """Append the exchanges of `other` that this session does not have yet."""
+        own = {(m["role"], m["content"]) for m in self.messages}
+        for message in other.messages:
+            if (message["role"], message["content"]) not in own:
+                self.messages.append(message)
+        return self
+
+    def append(self, prompt: str, reply: str) -> None:
+        self.messages += [
+            {"role": "user", "content": prompt},
+            {"role": "assistant", "content": reply},
+        ]
+
+
+def _request_kwargs(
+    prompt: str, format_json: bool, temperature: float, session: ChatSession | None = None
+) -> dict:
+    history = session.messages if session is not None else []
+    return {
+        "model": MISTRAL_MODEL,
+        "temperature": temperature,
+        "response_format": {"type": "json_object"} if format_json else None,
+        "messages": [*history, {"role": "user", "content": prompt}],
+    }
+
+
+def _sent_text(kwargs: dict) -> str:
+    """All message contents of a request, for token accounting."""
+    return "\n".join(m["content"] for m in kwargs["messages"])
+
+
+def _parse_text(text: str, format_json: bool):
     if format_json:
         try:
             return json.loads(text)
         except json.JSONDecodeError:
             return {"raw": text}
     return text.strip()
+
+
+def _is_cacheable(text: str, format_json: bool) -> bool:
+    """Only cache responses that parse; a malformed reply should be retried."""
+    if not format_json:
+        return True
+    try:
+        json.loads(text)
+        return True
+    except json.JSONDecodeError:
+        return False
+
+
+def _usage_attributes(usage) -> dict:
+    """Span attributes for a call answered by Mistral."""
+    return {
+        "cached": False,
+        "prompt_tokens": getattr(usage, "prompt_tokens", None),
+        "completion_tokens": getattr(usage, "completion_tokens", None),
+    }
+
+
+def _cache_key(kwargs: dict) -> str:
+    return make_key(kwargs["model"], kwargs["temperature"], kwargs["response_format"], kwargs["messages"])
+
+
+def ask_mistral(
+    prompt: str, format_json: bool = True, temperature: float = 0.3, session: ChatSession | None = None
+):
+    """
+    Send a prompt to the Mistral API and optionally parse a JSON response.
+    Returns either a dictionary or a plain string.
+    Identical requests are served from `llm_cache` when possible; every call
+    is recorded in `token_usage` and as an `llm` span under the current
+    pipeline step. Requests go
+    through `mistral_resilience` (deadline, retries, rate limit, circuit
+    breaker) and raise `MistralUnavailableError` when Mistral cannot answer.
+    With a `session`, the prompt continues that conversation and the
+    exchange is appended to it.
+    """
+    kwargs = _request_kwargs(prompt, format_json, temperature, session)
+    key = _cache_key(kwargs)
+
+    with telemetry.span("llm", current_step.get()) as call:
+        text = llm_cache.get(key)
+        if text is None:
+            response = mistral_resilience.run(
+                lambda timeout: client.chat.complete(**kwargs, timeout_ms=int(timeout * 1000))
+            )
+            token_usage.record(_sent_text(kwargs), response.usage)
+            call.update(_usage_attributes(response.usage))
+            text = response.choices[0].message.content
+            if _is_cacheable(text, format_json):
+                llm_cache.put(key, MISTRAL_MODEL, text)
+        else:
+            token_usage.record(_sent_text(kwargs), cached=True)
+            call["cached"] = True
+    if session is not None:
+        session.append(prompt, text)
+    return _parse_text(text, format_json)
+
+
+async def _stream_completion(kwargs: dict, on_delta: Callable[[str], None]):
+    """Stream a chat completion, passing text deltas to `on_delta`; returns (text, usage)."""
+    parts: list[str] = []
+    usage = None
+    stream = await client.chat.stream_async(**kwargs)
+    async for event in stream:
+        chunk = event.data
+        usage = chunk.usage or usage
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if isinstance(delta, str) and delta:
+            parts.append(delta)
+            on_delta(delta)
+    return "".join(parts), usage
+
+
+async def ask_mistral_async(
+    prompt: str,
+    format_json: bool = True,
+    temperature: float = 0.3,
+    session: ChatSession | None = None,
+    on_delta: Callable[[str], None] | None = None,
+):
+    """
+    Async variant of `ask_mistral` backed by the shared pooled HTTP client.
+    At most MISTRAL_MAX_CONCURRENCY calls are in flight per process.
+    With `on_delta`, the response is streamed and each text fragment is
+    passed to it as it arrives (a cached response arrives as one fragment).
+    """
+    kwargs = _request_kwargs(prompt, format_json, temperature, session)
+    key = _cache_key(kwargs)
+
+    with telemetry.span("llm", current_step.get()) as call:
+        # The persistent tier does blocking DB I/O, keep it off the event loop
+        if llm_cache.persist:
+            text = await asyncio.to_thread(llm_cache.get, key)
+        else:
+            text = llm_cache.get(key)
+
+        if text is None:
+            if on_delta is not None:
+                # A stream can only be retried before any of it reached the listener
+                streamed = []
+
+                def forward(delta: str) -> None:
+                    streamed.append(delta)
+                    on_delta(delta)
+
+                text, usage = await mistral_resilience.run_async(
+                    lambda: _stream_completion(kwargs, forward),
+                    can_retry=lambda: not streamed,
+                    slots=_get_semaphore(),
+                )
+            else:
+                response = await mistral_resilience.run_async(
+                    lambda: client.chat.complete_async(**kwargs), slots=_get_semaphore()
+                )
+                text, usage = response.choices[0].message.content, response.usage
+            token_usage.record(_sent_text(kwargs), usage)
+            call.update(_usage_attributes(usage))
+            if _is_cacheable(text, format_json):
+                if llm_cache.persist:
+                    await asyncio.to_thread(llm_cache.put, key, MISTRAL_MODEL, text)
+                else:
+                    llm_cache.put(key, MISTRAL_MODEL, text)
+        else:
+            token_usage.record(_sent_text(kwargs), cached=True)
+            call["cached"] = True
+            if on_delta is not None:
+                on_delta(text)
+    if session is not None:
+        session.append(prompt, text)
+    return _parse_text(text, format_json)
+
+
+async def aclose_mistral() -> None:
+    """Release pooled connections (call on application shutdown)."""
+    await _async_http_client.aclose()
+    _http_client.close()
@@ -0,0 +1,155 @@
+import json
+from src.ai.mistral_client import ask_mistral_async
+from src.ai.map_reduce import chunk_opinions
+from src.ai.aggregates import ranking_stats, stance_distribution, vote_counts
+from src.ai.dedup import attach_weights, weighted_listing
+
+
+class CompactAnalysisError(Exception):
+    """The single-call response did not match the expected schema."""
+
+
+# ---------------------------------------------------------------------
+# Per-type output specification
+# ---------------------------------------------------------------------
+_NARRATIVE = """
+  "summary": "short neutral summary (2–3 sentences)",
+  "recommendation": "concise, practical recommendation (2–3 sentences)",
+  "ai_thought": "one sentence on the key reasoning, flagging inconsistent or contradictory opinions if any\""""
+
+_SPECS = {
+    "stance_analysis": {
+        "task": 'Classify each opinion as "pro", "contra", or "neutral", then summarize the debate.',
+        "shape": """{
+  "classifications": [{"opinion": "...", "classification": "pro|contra|neutral", "reason": "..."}],""",
+        "required": {"classifications": list},
+    },
+    "option_comparison": {
+        "task": "Identify the distinct options, the option each opinion prefers (null if none) "
+                "and the main reasons for each option.",
+        "shape": """{
+  "options": ["..."],
+  "mapping": [{"opinion": "...", "preferred_option": "..."}],
+  "reasons": {"option": ["short reason"]},""",
+        "required": {"options": list, "mapping": list, "reasons": dict},
+    },
+    "idea_generation": {
+        "task": "Group similar ideas into 3–6 high-level themes, each with representative ideas and a brief summary.",
+        "shape": """{
+  "themes": [{"name": "...", "ideas": ["..."], "summary": "..."}],""",
+        "required": {"themes": list},
+    },
+    "priority_ranking": {
+        "task": "Identify the options, infer each opinion's ranking (highest priority first) "
+                "and the main reasons each option ranks higher or lower.",
+        "shape": """{
+  "options": ["..."],
+  "parsed_opinions": [{"opinion": "...", "ranking": ["...", "..."]}],
+  "top_reasons": {"option": ["short reason"]},""",
+        "required": {"options": list, "parsed_opinions": list, "top_reasons": dict},
+    },
+    "feedback_analysis": {
+        "task": "Separate the feedback into positive and negative themes with representative examples, "
+                "and compute an overall sentiment score between 0 and 1 (1 = fully positive).",
+        "shape": """{
+  "positive_themes": [{"name": "...", "examples": ["..."]}],
+  "negative_themes": [{"name": "...", "examples": ["..."]}],
+  "sentiment_score": number,""",
+        "required": {"positive_themes": list, "negative_themes": list, "sentiment_score": (int, float)},
+    },
+}
+
+COMPACT_TYPES = frozenset(_SPECS)
+
+# Types whose output has one entry per opinion (weights are attached locally);
+# the others see repeated answers marked with their count
+_PER_OPINION = frozenset({"stance_analysis", "option_comparison", "priority_ranking"})
+
+
+def _build_prompt(question_type: str, topic: str, opinions: list[str]) -> str:
+    spec = _SPECS[question_type]
+    return f"""
+You are analyzing survey answers about a topic. In a single JSON object:
+{spec["task"]}
+Then write the summary, recommendation and ai_thought based on that analysis.
+
+Return JSON exactly in this shape:
+{spec["shape"]}{_NARRATIVE}
+}}
+
+Topic: {topic}
+Opinions:
+{json.dumps(opinions, indent=2)}
+"""
+
+
+def _validate(question_type: str, data, n_opinions: int) -> dict:
+    """Check required keys and types; raise CompactAnalysisError on mismatch."""
+    if not isinstance(data, dict) or "raw" in data:
+        raise CompactAnalysisError("response is not a JSON object")
+
+    required = dict(_SPECS[question_type]["required"])
+    required.update({"summary": str, "recommendation": str, "ai_thought": str})
+    for key, expected in required.items():
+        value = data.get(key)
+        if isinstance(value, bool) or not isinstance(value, expected):
+            raise CompactAnalysisError(f"'{key}' is missing or has the wrong type")
+        if expected is str and not value.strip():
+            raise CompactAnalysisError(f"'{key}' is empty")
+
+    # Stance counts come straight from the classifications: every opinion must be covered
+    if question_type == "stance_analysis" and len(data["classifications"]) != n_opinions:
+        raise CompactAnalysisError(
+            f"{len(data['classifications'])} classifications for {n_opinions} opinions"
+        )
+    return data
+
+
+# ---------------------------------------------------------------------
+# Single-call pipeline
+# ---------------------------------------------------------------------
+async def compact_pipeline(
+    question_type: str, topic: str, opinions: list[str], weights: list[int] | None = None
+):
+    """
+    Run the whole analysis for a question type in one Mistral call.
+    `weights` gives how many answers each (deduplicated) opinion stands for.
+
+    Returns the same tuple as the multi-step pipeline for that type, or raises
+    CompactAnalysisError so the caller can fall back to the multi-step path.
+    """
+    if question_type not in _SPECS:
+        raise CompactAnalysisError(f"no compact mode for '{question_type}'")
+    if len(chunk_opinions(opinions)) > 1:
+        raise CompactAnalysisError("too many opinions for a single call")
+
+    weights = weights or [1] * len(opinions)
+    shown = opinions if question_type in _PER_OPINION else weighted_listing(opinions, weights)
+    response = await ask_mistral_async(_build_prompt(question_type, topic, shown))
+    data = _validate(question_type, response, len(opinions))
+    narrative = (data["summary"].strip(), data["recommendation"].strip(), data["ai_thought"].strip())
+
+    if question_type == "stance_analysis":
+        classifications = attach_weights(data["classifications"], opinions, weights)
+        return (stance_distribution(classifications), sum(weights), *narrative, classifications)
+
+    if question_type == "option_comparison":
+        mapping = attach_weights(data["mapping"], opinions, weights)
+        options, votes = vote_counts(data["options"], mapping)
+        return ({"options": options, "votes": votes}, data["reasons"], *narrative, mapping)
+
+    if question_type == "idea_generation":
+        return ({"themes": data["themes"]}, *narrative)
+
+    if question_type == "priority_ranking":
+        parsed = attach_weights(data["parsed_opinions"], opinions, weights)
+        return (ranking_stats(data["options"], parsed), data["top_reasons"], *narrative, parsed)
+
+    score = float(data["sentiment_score"])
+    sentiment_int = max(0, min(100, int(round(score * 100))))
+    return (
+        sentiment_int,
+        {"themes": data["positive_themes"]},
+        {"themes": data["negative_themes"]},
+        *narrative,
+    )
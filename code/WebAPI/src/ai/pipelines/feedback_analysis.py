@@ -1,20 +1,84 @@
+import asyncio
 import json
-from src.ai.mistral_client import ask_mistral
+import numpy as np
+from src.ai.mistral_client import ask_mistral_async
+from src.ai.prompt_graph import PromptStep, run_prompt_graph
+from src.ai.map_reduce import chunk_opinions, map_reduce_step, merge_themes
+from src.ai.clustering import align_cluster_output, cluster_payload, cluster_texts
+from src.ai.dedup import weighted_listing
+from src.ai.tokens import compact_json
+from src.config import ANALYSIS_CLUSTER_MIN_ITEMS, ANALYSIS_CLUSTER_SAMPLES, ANALYSIS_EMBED_TOKENS
 
-def feedback_analysis_pipeline(topic: str, feedback: list[str]):
+
+def _themes_and_score(step1: dict):
+    """Extract positive/negative themes and the 0–100 sentiment from step 1."""
+    pos = step1.get("positive_themes", [])
+    neg = step1.get("negative_themes", [])
+    score = float(step1.get("sentiment_score", 0.0))
+    sentiment_int = max(0, min(100, int(round(score * 100))))
+    return pos, neg, score, sentiment_int
+
+
+def _prompt_themes(step1: dict):
+    """Themes as embedded in follow-up prompts, examples trimmed to the token budget."""
+    pos, neg, _, _ = _themes_and_score(step1)
+    return compact_json(pos, ANALYSIS_EMBED_TOKENS // 2), compact_json(neg, ANALYSIS_EMBED_TOKENS // 2)
+
+
+def _merge_sentiment(parts, chunk_size=len):
+    """Merge same-named themes across chunks and average the score weighted by chunk size."""
+    sentiments = [result if isinstance(result, dict) else {} for _, result in parts]
+    weights = [chunk_size(chunk) for chunk, _ in parts]
+    scores = []
+    for s, w in zip(sentiments, weights):
+        try:
+            scores.append((float(s.get("sentiment_score", 0.0)), w))
+        except (TypeError, ValueError):
+            continue
+    total = sum(w for _, w in scores)
+    return {
+        "positive_themes": merge_themes([s.get("positive_themes") for s in sentiments], "examples"),
+        "negative_themes": merge_themes([s.get("negative_themes") for s in sentiments], "examples"),
+        "sentiment_score": sum(v * w for v, w in scores) / total if total else 0.0,
+    }
+
+
+def _cluster_score(label: dict) -> float | None:
+    try:
+        return min(1.0, max(0.0, float(label.get("sentiment_score"))))
+    except (TypeError, ValueError):
+        return None
+
+
+async def feedback_analysis_pipeline(topic: str, feedback: list[str], weights: list[int] | None = None):
     """
     Analyze qualitative feedback to extract sentiment and themes.
 
+    Graph: sentiment → (summary, recommendation) → thought.
+
+    Sentiment and themes come from Mistral (map-reduced over feedback chunks)
+    or, from ANALYSIS_CLUSTER_MIN_ITEMS answers on, from local TF-IDF +
+    k-means clusters that Mistral only names and scores from a few samples;
+    the overall score is then the cluster-size-weighted mean.
+
+    `weights` gives how many answers each (deduplicated) feedback stands for.
+
     Returns
     -------
     tuple
         (sentiment: int, positive_themes: dict, negative_themes: dict,
          summary: str, recommendation: str, ai_thought: str)
     """
+    listing = weighted_listing(feedback, weights)
+    answers_in = dict(zip(listing, weights or [1] * len(feedback)))
+    repeated = bool(weights) and max(weights) > 1
+    repeat_note = "Feedback ending in (×n) was given n times; quote it without the count.\n" if repeated else ""
+
     # Step 1: identify sentiment and themes
-    sentiment_prompt = f"""
+    def sentiment_prompt(_, chunk):
+        return f"""
 You are analyzing employee feedback.
-1. Separate into positive and negative themes.
+{repeat_note}1. Separate into positive and negative themes.
 2. Include representative examples for each.
 3. Compute an overall sentiment score between 0 and 1 (1 = fully positive).
 
@@ -27,16 +91,63 @@ Return JSON:
 
 Topic: {topic}
 Feedback:
-{json.dumps(feedback, indent=2)}
+{json.dumps(chunk, indent=2)}
 """
-    step1 = ask_mistral(sentiment_prompt)
-    pos = step1.get("positive_themes", [])
-    neg = step1.get("negative_themes", [])
-    score = float(step1.get("sentiment_score", 0.0))
-    sentiment_int = max(0, min(100, int(round(score * 100))))
+
+    # Step 1 (large inputs): cluster locally, let Mistral name and score the clusters
+    async def local_clusters(_):
+        # CPU-bound (TF-IDF + k-means): off the event loop, so sibling steps keep running
+        clusters = await asyncio.to_thread(
+            cluster_texts, feedback, k_min=4, k_max=8, samples=ANALYSIS_CLUSTER_SAMPLES, weights=weights
+        )
+        labelled = await ask_mistral_async(f"""
+You are analyzing employee feedback that was already grouped into clusters.
+For each cluster, based on its sample feedback:
+1. Give a short theme name.
+2. Say whether it is "positive" or "negative".
+3. Give a sentiment score between 0 and 1 (1 = fully positive).
+
+Return JSON:
+{{
+  "clusters": [{{"cluster": 1, "name": "...", "polarity": "positive|negative", "sentiment_score": number}}]
+}}
+
+Topic: {topic}
+Clusters:
+{json.dumps(cluster_payload(clusters), indent=2)}
+""")
+        positive, negative, scores, sizes = [], [], [], []
+        for i, (cluster, label) in enumerate(zip(clusters, align_cluster_output(labelled, clusters, "clusters")), 1):
+            score = _cluster_score(label)
+            polarity = str(label.get("polarity", "")).lower()
+            if polarity not in ("positive", "negative"):
+                polarity = "positive" if (score if score is not None else 0.5) >= 0.5 else "negative"
+            theme = {"name": label.get("name") or f"Theme {i}", "examples": cluster.representatives}
+            (positive if polarity == "positive" else negative).append(theme)
+            if score is not None:
+                scores.append(score)
+                sizes.append(cluster.size)
+        return {
+            "positive_themes": positive,
+            "negative_themes": negative,
+            "sentiment_score": float(np.average(scores, weights=sizes)) if scores else 0.0,
+        }
+
+    if len(feedback) >= ANALYSIS_CLUSTER_MIN_ITEMS:
+        sentiment_step = PromptStep("sentiment", None, run=local_clusters)
+    else:
+        sentiment_step = map_reduce_step(
+            "sentiment",
+            lambda _: listing,
+            sentiment_prompt,
+            lambda parts: _merge_sentiment(parts, lambda chunk: sum(answers_in[item] for item in chunk)),
+        )
 
     # Step 2: summary
-    summary_prompt = f"""
+    def summary_prompt(deps):
+        _, _, score, _ = _themes_and_score(deps["sentiment"])
+        pos, neg = _prompt_themes(deps["sentiment"])
+        return f"""
 Write a short neutral summary (2–3 sentences) describing the key positive and negative aspects
 identified from the following feedback.
 
@@ -44,33 +155,66 @@ Positive themes: {json.dumps(pos, indent=2)}
 Negative themes: {json.dumps(neg, indent=2)}
 Sentiment score: {score}
 """
-    summary = ask_mistral(summary_prompt, format_json=False)
 
     # Step 3: recommendation
-    recommendation_prompt = f"""
-Based on the analysis above, write a concise recommendation (2–3 sentences)
+    def recommendation_prompt(deps):
+        pos, neg = _prompt_themes(deps["sentiment"])
+        return f"""
+Based on the analysis below, write a concise recommendation (2–3 sentences)
 suggesting practical improvements for '{topic}'.
+
+Positive themes: {json.dumps(pos, indent=2)}
+Negative themes: {json.dumps(neg, indent=2)}
 """
-    recommendation = ask_mistral(recommendation_prompt, format_json=False)
 
-# Step 4: AI Thought — flagging inconsistent opinions
-    thought_prompt = f"""
+    # Step 4: AI Thought — flagging inconsistent opinions
+    # Large questions only send the first chunk of feedback for this review
+    sample = chunk_opinions(listing)[0]
+    sample_label = "Feedback list" if len(sample) == len(listing) else (
+        f"Feedback sample ({len(sample)} of {len(listing)})"
+    )
+
+    # It continues the recommendation conversation, which already holds the themes
+    def thought_prompt(deps):
+        _, _, _, sentiment_int = _themes_and_score(deps["sentiment"])
+        return f"""
 Review all provided feedback opinions and evaluate whether any appear inconsistent,
-irrelevant, contradictory or out of alignment with the main themes, summary or sentiment score.
+irrelevant, contradictory or out of alignment with the themes above, the summary or sentiment score.
 Return a short commentary (2-4 sentences) that:
 - Lists any specific opinions by index (or content) that you believe may not make sense or are contradictory.
 - Explains why they may be problematic.
 - Concludes with whether they meaningfully impact the overall result.
 
 Topic: {topic}
-Feedback list:
-{json.dumps(feedback, indent=2)}
-Identified themes (positive): {json.dumps(pos, indent=2)}
-Identified themes (negative): {json.dumps(neg, indent=2)}
+{sample_label}:
+{json.dumps(sample, indent=2)}
 Sentiment score: {sentiment_int}
-Summary: {summary}
-Recommendation: {recommendation}
+Summary: {deps["summary"]}
 """
-    ai_thought = ask_mistral(thought_prompt, format_json=False, temperature=0.4)
 
-    return sentiment_int, {"themes": pos}, {"themes": neg}, summary, recommendation, ai_thought
\ No newline at end of file
+    results = await run_prompt_graph([
+        sentiment_step,
+        PromptStep("summary", summary_prompt, depends_on=("sentiment",), format_json=False),
+        PromptStep(
+            "recommendation", recommendation_prompt, depends_on=("sentiment",), format_json=False, conversational=True
+        ),
+        PromptStep(
+            "thought",
+            thought_prompt,
+            depends_on=("sentiment", "summary", "recommendation"),
+            format_json=False,
+            temperature=0.4,
+            conversational=True,
+        ),
+    ])
+
+    pos, neg, _, sentiment_int = _themes_and_score(results["sentiment"])
+
+    return (
+        sentiment_int,
+        {"themes": pos},
+        {"themes": neg},
+        results["summary"],
+        results["recommendation"],
+        results["thought"],
+    )
@@ -1,20 +1,50 @@
+import asyncio
 import json
-from src.ai.mistral_client import ask_mistral
+from src.ai.mistral_client import ask_mistral_async
+from src.ai.prompt_graph import PromptStep, run_prompt_graph
+from src.ai.map_reduce import map_reduce_step, merge_themes
+from src.ai.clustering import align_cluster_output, cluster_payload, cluster_texts
+from src.ai.dedup import weighted_listing
+from src.ai.tokens import compact_json
+from src.config import ANALYSIS_CLUSTER_MIN_ITEMS, ANALYSIS_CLUSTER_SAMPLES, ANALYSIS_EMBED_TOKENS
 
-def idea_generation_pipeline(topic: str, ideas: list[str]):
+
+def _merge_themes(parts):
+    """Merge same-named themes across chunks, keeping the first summary."""
+    return {
+        "themes": merge_themes([
+            result.get("themes") for _, result in parts if isinstance(result, dict)
+        ], "ideas")
+    }
+
+
+async def idea_generation_pipeline(topic: str, ideas: list[str], weights: list[int] | None = None):
     """
     Analyze open-ended proposals or creative ideas.
 
+    Graph: clustering → (summary, recommendation) → thought.
+
+    Clustering is done by Mistral (map-reduced over chunks of ideas) or, from
+    ANALYSIS_CLUSTER_MIN_ITEMS ideas on, locally with TF-IDF + k-means, in
+    which case Mistral only names and summarizes each cluster from a few
+    representative ideas.
+
+    `weights` gives how many answers each (deduplicated) idea stands for.
+
     Returns
     -------
     tuple
         (themes: dict, summary: str, recommendation: str, ai_thought: str)
     """
+    repeated = bool(weights) and max(weights) > 1
+    repeat_note = "An idea ending in (×n) was submitted n times; quote it without the count.\n" if repeated else ""
+
     # Step 1: cluster ideas into themes
-    cluster_prompt = f"""
+    def cluster_prompt(_, chunk):
+        return f"""
 You analyze employee ideas and group similar ones into 3–6 high-level themes.
 For each theme, include representative ideas and a brief summary.
-
+{repeat_note}
 Return JSON:
 {{
   "themes": [
@@ -23,29 +53,76 @@ Return JSON:
 }}
 
 Ideas:
-{json.dumps(ideas, indent=2)}
+{json.dumps(chunk, indent=2)}
 """
-    themes = ask_mistral(cluster_prompt)
+
+    # Step 1 (large inputs): cluster locally, let Mistral name the clusters
+    async def local_clusters(_):
+        # CPU-bound (TF-IDF + k-means): off the event loop, so sibling steps keep running
+        clusters = await asyncio.to_thread(
+            cluster_texts, ideas, k_min=3, k_max=6, samples=ANALYSIS_CLUSTER_SAMPLES, weights=weights
+        )
+        named = await ask_mistral_async(f"""
+You analyze employee ideas that were already grouped into clusters.
+For each cluster, give a short theme name and a brief summary based on its sample ideas.
+
+Return JSON:
+{{
+  "themes": [
+    {{"cluster": 1, "name": "...", "summary": "..."}}
+  ]
+}}
+
+Clusters:
+{json.dumps(cluster_payload(clusters), indent=2)}
+""")
+        labels = align_cluster_output(named, clusters, "themes")
+        return {
+            "themes": [
+                {
+                    "name": label.get("name") or f"Theme {i}",
+                    "ideas": cluster.representatives,
+                    "summary": label.get("summary", ""),
+                }
+                for i, (cluster, label) in enumerate(zip(clusters, labels), start=1)
+            ]
+        }
+
+    if len(ideas) >= ANALYSIS_CLUSTER_MIN_ITEMS:
+        themes_step = PromptStep("themes", None, run=local_clusters)
+    else:
+        themes_step = map_reduce_step(
+            "themes", lambda _: weighted_listing(ideas, weights), cluster_prompt, _merge_themes
+        )
 
     # Step 2: write a summary
-    summary_prompt = f"""
+    def summary_prompt(deps):
+        return f"""
 Write a short neutral summary (2–3 sentences) describing the main directions and motivations behind the following themes:
-{json.dumps(themes, indent=2)}
+{json.dumps(compact_json(deps["themes"], ANALYSIS_EMBED_TOKENS), indent=2)}
 """
-    summary = ask_mistral(summary_prompt, format_json=False)
 
     # Step 3: recommendation
-    recommendation_prompt = f"""
+    def recommendation_prompt(deps):
+        return f"""
 Topic: {topic}
-Themes: {json.dumps(themes, indent=2)}
-Summary: {summary}
+Themes: {json.dumps(compact_json(deps["themes"], ANALYSIS_EMBED_TOKENS), indent=2)}
 
 Write a practical recommendation (2–3 sentences) suggesting clear next steps.
 """
-    recommendation = ask_mistral(recommendation_prompt, format_json=False)
 
     # Step 4: AI thought
-    thought_prompt = "In one sentence, describe the main opportunity reflected in this recommendation."
-    thought = ask_mistral(thought_prompt, format_json=False)
+    thought_prompt = "In one sentence, describe the main opportunity reflected in your recommendation."
+
+    results = await run_prompt_graph([
+        themes_step,
+        PromptStep("summary", summary_prompt, depends_on=("themes",), format_json=False),
+        PromptStep(
+            "recommendation", recommendation_prompt, depends_on=("themes",), format_json=False, conversational=True
+        ),
+        PromptStep(
+            "thought", lambda _: thought_prompt, depends_on=("recommendation",), format_json=False, conversational=True
+        ),
+    ])
 
-    return themes, summary, recommendation, thought
+    return results["themes"], results["summary"], results["recommendation"], results["thought"]
@@ -1,63 +1,149 @@
 import json
-from src.ai.mistral_client import ask_mistral
+from src.ai.prompt_graph import PromptStep, run_prompt_graph
+from src.ai.map_reduce import map_reduce_step, merge_lists, merge_names, merge_text_lists
+from src.ai.aggregates import vote_counts
+from src.ai.dedup import attach_weights
+from src.ai.tokens import compact_json
+from src.config import ANALYSIS_EMBED_TOKENS
 
-def option_comparison_pipeline(topic: str, opinions: list[str]):
+
+def _merge_detection(parts):
+    """Union the options and concatenate the mappings of every chunk."""
+    detections = [result if isinstance(result, dict) else {} for _, result in parts]
+    return {
+        "options": merge_names([d.get("options") for d in detections]),
+        "mapping": merge_lists([d.get("mapping") for d in detections]),
+    }
+
+
+def _with_votes(detection):
+    """Count the votes locally from the per-opinion mapping."""
+    detection = detection if isinstance(detection, dict) else {}
+    mapping = detection.get("mapping") if isinstance(detection.get("mapping"), list) else []
+    options, votes = vote_counts(detection.get("options") or [], mapping)
+    return {"options": options, "votes": votes, "mapping": mapping}
+
+
+def _merge_reasons(parts):
+    return {
+        "reasons": merge_text_lists([
+            result.get("reasons") for _, result in parts if isinstance(result, dict)
+        ])
+    }
+
+
+async def option_comparison_pipeline(
+    topic: str,
+    opinions: list[str],
+    previous: dict | None = None,
+    weights: list[int] | None = None,
+):
     """
     Analyze comparative opinions about multiple options.
 
+    Graph: detection → (reasons, recommendation) → (summary, thought).
+    Detection and reasons are map-reduced over chunks of opinions.
+
+    `weights` gives how many answers each (deduplicated) opinion stands for.
+    `previous` ({"opinions", "detection", "reasons"} of an earlier run) resumes
+    it: `opinions` are then only the answers added since.
+
     Returns
     -------
     tuple
         (distribution_and_options: dict, reasons: dict, summary: str,
-         recommendation: str, ai_thought: str)
+         recommendation: str, ai_thought: str, mapping: list)
     """
-    # Step 1: detect options and votes
-    detection_prompt = f"""
+    weights = weights or [1] * len(opinions)
+    prior_mapping = previous["detection"].get("mapping", []) if previous else []
+
+    def with_votes(detection):
+        detection = detection if isinstance(detection, dict) else {}
+        mapping = detection.get("mapping") if isinstance(detection.get("mapping"), list) else []
+        mapping = mapping[:len(prior_mapping)] + attach_weights(mapping[len(prior_mapping):], opinions, weights)
+        return _with_votes({**detection, "mapping": mapping})
+
+    # Step 1: detect options and each opinion's preference (votes are counted locally)
+    def detection_prompt(_, chunk):
+        return f"""
 You are analyzing comparative opinions.
 1. Identify all distinct options mentioned (e.g., React, Vue).
-2. Determine which option each opinion prefers.
-3. Count how many opinions favor each option.
+2. Determine which option each opinion prefers (null if none).
 
 Return JSON:
 {{
   "options": [list of options],
-  "votes": {{option: count}},
   "mapping": [{{"opinion": "...", "preferred_option": "..."}}]
 }}
 
 Topic: {topic}
 Opinions:
-{json.dumps(opinions, indent=2)}
+{json.dumps(chunk, indent=2)}
 """
-    step1 = ask_mistral(detection_prompt)
-    options = step1.get("options", [])
-    votes = step1.get("votes", {})
-    mapping = step1.get("mapping", [])
 
     # Step 2: extract reasons
-    reasons_prompt = f"""
+    def reasons_prompt(deps, chunk):
+        return f"""
 Analyze the opinions and group the main reasons for each option.
 Return JSON: {{"reasons": {{option: [short reasons]}}}}
 
-Options: {json.dumps(options)}
+Options: {json.dumps(deps["detection"].get("options", []))}
 Opinions with preferences:
-{json.dumps(mapping, indent=2)}
+{json.dumps(chunk, indent=2)}
 """
-    step2 = ask_mistral(reasons_prompt)
-    reasons = step2.get("reasons", {})
 
     # Step 3: generate summary and recommendation
-    summary_prompt = f"""
+    def summary_prompt(deps):
+        return f"""
 Write a short neutral summary (2–3 sentences) highlighting the trade-offs among the options below:
-Votes: {json.dumps(votes)}
-Reasons: {json.dumps(reasons, indent=2)}
+Votes: {json.dumps(deps["detection"].get("votes", {}))}
+Reasons: {json.dumps(compact_json(deps["reasons"].get("reasons", {}), ANALYSIS_EMBED_TOKENS), indent=2)}
 """
-    summary = ask_mistral(summary_prompt, format_json=False)
 
-    recommendation_prompt = f"Provide a concise recommendation based on this comparison for '{topic}'."
-    recommendation = ask_mistral(recommendation_prompt, format_json=False)
+    def recommendation_prompt(deps):
+        return (
+            f"Provide a concise recommendation based on this comparison for '{topic}'.\n"
+            f"Votes: {json.dumps(deps['detection'].get('votes', {}))}"
+        )
 
-    thought_prompt = "In one sentence, summarize the decisive factor in this recommendation."
-    thought = ask_mistral(thought_prompt, format_json=False)
+    thought_prompt = "In one sentence, summarize the decisive factor in your recommendation."
+
+    results = await run_prompt_graph([
+        map_reduce_step(
+            "detection",
+            lambda _: opinions,
+            detection_prompt,
+            _merge_detection,
+            previous=(previous["opinions"], previous["detection"]) if previous else None,
+            finalize=with_votes,
+        ),
+        map_reduce_step(
+            "reasons",
+            lambda deps: deps["detection"].get("mapping", [])[len(prior_mapping):],
+            reasons_prompt,
+            _merge_reasons,
+            depends_on=("detection",),
+            previous=(prior_mapping, previous["reasons"]) if previous else None,
+        ),
+        PromptStep(
+            "recommendation", recommendation_prompt, depends_on=("detection",), format_json=False, conversational=True
+        ),
+        PromptStep("summary", summary_prompt, depends_on=("detection", "reasons"), format_json=False),
+        PromptStep(
+            "thought", lambda _: thought_prompt, depends_on=("recommendation",), format_json=False, conversational=True
+        ),
+    ])
+
+    step1 = results["detection"]
+    options = step1.get("options", [])
+    votes = step1.get("votes", {})
+    reasons = results["reasons"].get("reasons", {})
 
-    return {"options": options, "votes": votes}, reasons, summary, recommendation, thought
+    return (
+        {"options": options, "votes": votes},
+        reasons,
+        results["summary"],
+        results["recommendation"],
+        results["thought"],
+        step1.get("mapping", []),
+    )
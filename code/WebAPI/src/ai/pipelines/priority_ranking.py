@@ -1,66 +1,151 @@
 import json
-from src.ai.mistral_client import ask_mistral
+from src.ai.prompt_graph import PromptStep, run_prompt_graph
+from src.ai.map_reduce import map_reduce_step, merge_lists, merge_names, merge_text_lists
+from src.ai.aggregates import ranking_stats
+from src.ai.dedup import attach_weights
+from src.ai.tokens import compact_json
+from src.config import ANALYSIS_EMBED_TOKENS
 
-def priority_ranking_pipeline(topic: str, opinions: list[str]):
+
+def _merge_ranking(parts):
+    """Union the options and concatenate the parsed opinions of every chunk."""
+    rankings = [result if isinstance(result, dict) else {} for _, result in parts]
+    return {
+        "options": merge_names([r.get("options") for r in rankings]),
+        "parsed_opinions": merge_lists([r.get("parsed_opinions") for r in rankings]),
+    }
+
+
+def _with_stats(ranking):
+    """Compute average rank, variance and Borda counts locally from the parsed opinions."""
+    ranking = ranking if isinstance(ranking, dict) else {}
+    parsed = ranking.get("parsed_opinions") if isinstance(ranking.get("parsed_opinions"), list) else []
+    return {**ranking_stats(ranking.get("options") or [], parsed), "parsed_opinions": parsed}
+
+
+def _merge_reasons(parts):
+    return {
+        "top_reasons": merge_text_lists([
+            result.get("top_reasons") for _, result in parts if isinstance(result, dict)
+        ])
+    }
+
+
+async def priority_ranking_pipeline(
+    topic: str,
+    opinions: list[str],
+    previous: dict | None = None,
+    weights: list[int] | None = None,
+):
     """
     Analyze ranked preferences or prioritization of options.
 
+    Graph: ranking → (reasons, recommendation) → (summary, thought).
+    Ranking and reasons are map-reduced over chunks of opinions.
+
+    `weights` gives how many answers each (deduplicated) opinion stands for.
+    `previous` ({"opinions", "ranking", "reasons"} of an earlier run) resumes
+    it: `opinions` are then only the answers added since.
+
     Returns
     -------
     tuple
         (options_and_means: dict, top_reasons: dict,
-         summary: str, recommendation: str, ai_thought: str)
+         summary: str, recommendation: str, ai_thought: str, parsed_opinions: list)
     """
-    # Step 1: extract and compute average rankings
-    ranking_prompt = f"""
+    weights = weights or [1] * len(opinions)
+    prior_parsed = previous["ranking"].get("parsed_opinions", []) if previous else []
+
+    def with_stats(ranking):
+        ranking = ranking if isinstance(ranking, dict) else {}
+        parsed = ranking.get("parsed_opinions") if isinstance(ranking.get("parsed_opinions"), list) else []
+        parsed = parsed[:len(prior_parsed)] + attach_weights(parsed[len(prior_parsed):], opinions, weights)
+        return _with_stats({**ranking, "parsed_opinions": parsed})
+
+    # Step 1: parse each opinion's ranking (aggregates are computed locally)
+    def ranking_prompt(_, chunk):
+        return f"""
 You are analyzing survey responses where users rank options.
 Tasks:
 1. Identify all unique options mentioned.
-2. Infer the rank or order of preference from each opinion.
-3. Compute an average ranking score (1 = highest priority).
+2. Infer the rank or order of preference from each opinion, highest priority first.
 
 Return JSON:
 {{
   "options": [list of option names],
-  "average_ranking": {{option: average_rank_number}},
   "parsed_opinions": [{{"opinion": "...", "ranking": ["...","...","..."]}}]
 }}
 
 Topic: {topic}
 Opinions:
-{json.dumps(opinions, indent=2)}
+{json.dumps(chunk, indent=2)}
 """
-    step1 = ask_mistral(ranking_prompt)
-    options = step1.get("options", [])
-    avg_ranking = step1.get("average_ranking", {})
-    parsed = step1.get("parsed_opinions", [])
 
     # Step 2: reasons per option
-    reasons_prompt = f"""
+    def reasons_prompt(deps, chunk):
+        return f"""
 Analyze the following opinions and identify main reasons why each option
 is ranked higher or lower.
 
 Return JSON: {{"top_reasons": {{option: [short reasons]}}}}
-Options: {json.dumps(options)}
+Options: {json.dumps(deps["ranking"].get("options", []))}
 Opinions with ranking info:
-{json.dumps(parsed, indent=2)}
+{json.dumps(chunk, indent=2)}
 """
-    step2 = ask_mistral(reasons_prompt)
-    top_reasons = step2.get("top_reasons", {})
 
     # Step 3: summary and recommendation
-    summary_prompt = f"""
+    def summary_prompt(deps):
+        return f"""
 Based on the average ranking and reasons, write a neutral summary (2–3 sentences)
 explaining the main patterns and priorities.
-Average ranking: {json.dumps(avg_ranking)}
-Top reasons: {json.dumps(top_reasons, indent=2)}
+Average ranking: {json.dumps(deps["ranking"].get("average_ranking", {}))}
+Borda counts: {json.dumps(deps["ranking"].get("borda_counts", {}))}
+Top reasons: {json.dumps(compact_json(deps["reasons"].get("top_reasons", {}), ANALYSIS_EMBED_TOKENS), indent=2)}
 """
-    summary = ask_mistral(summary_prompt, format_json=False)
 
-    recommendation_prompt = f"Provide a concise recommendation on which option(s) to prioritize first for '{topic}'."
-    recommendation = ask_mistral(recommendation_prompt, format_json=False)
+    def recommendation_prompt(deps):
+        return (
+            f"Provide a concise recommendation on which option(s) to prioritize first for '{topic}'.\n"
+            f"Average ranking: {json.dumps(deps['ranking'].get('average_ranking', {}))}"
+        )
+
+    thought_prompt = "In one sentence, summarize the key criterion that drives your prioritization."
+
+    results = await run_prompt_graph([
+        map_reduce_step(
+            "ranking",
+            lambda _: opinions,
+            ranking_prompt,
+            _merge_ranking,
+            previous=(previous["opinions"], previous["ranking"]) if previous else None,
+            finalize=with_stats,
+        ),
+        map_reduce_step(
+            "reasons",
+            lambda deps: deps["ranking"].get("parsed_opinions", [])[len(prior_parsed):],
+            reasons_prompt,
+            _merge_reasons,
+            depends_on=("ranking",),
+            previous=(prior_parsed, previous["reasons"]) if previous else None,
+        ),
+        PromptStep(
+            "recommendation", recommendation_prompt, depends_on=("ranking",), format_json=False, conversational=True
+        ),
+        PromptStep("summary", summary_prompt, depends_on=("ranking", "reasons"), format_json=False),
+        PromptStep(
+            "thought", lambda _: thought_prompt, depends_on=("recommendation",), format_json=False, conversational=True
+        ),
+    ])
 
-    thought_prompt = "In one sentence, summarize the key criterion that drives the prioritization."
-    thought = ask_mistral(thought_prompt, format_json=False)
+    step1 = results["ranking"]
+    options_and_means = {k: v for k, v in step1.items() if k != "parsed_opinions"}
+    top_reasons = results["reasons"].get("top_reasons", {})
 
-    return {"options": options, "average_ranking": avg_ranking}, top_reasons, summary, recommendation, thought
+    return (
+        options_and_means,
+        top_reasons,
+        results["summary"],
+        results["recommendation"],
+        results["thought"],
+        step1.get("parsed_opinions", []),
+    )
@@ -1,32 +1,100 @@
 import json
-from src.ai.mistral_client import ask_mistral
+from src.ai.prompt_graph import PromptStep, run_prompt_graph
+from src.ai.map_reduce import chunk_opinions, map_reduce_step, merge_lists
+from src.ai.aggregates import stance_distribution
+from src.ai.dedup import attach_weights, weighted_listing
 
-def stance_pipeline(topic: str, opinions: list[str]):
+
+def _classifications(result) -> list:
+    """The classification list, whether returned bare or wrapped in an object."""
+    if isinstance(result, list):
+        return result
+    if isinstance(result, dict):
+        return next((v for v in result.values() if isinstance(v, list)), [])
+    return []
+
+
+async def stance_pipeline(
+    topic: str,
+    opinions: list[str],
+    previous: dict | None = None,
+    weights: list[int] | None = None,
+):
     """
     Analyze pro, contra, and neutral stances for a given topic.
-    Returns a distribution dictionary, total count, summary, recommendation, and AI rationale.
+    Returns a distribution dictionary, total count, summary, recommendation, AI rationale
+    and the per-opinion classifications.
+
+    Graph: classification (map-reduced over opinion chunks), summary and
+    recommendation run concurrently; thought waits for the recommendation.
+    Summary, recommendation and thought share one conversation whose context
+    holds the opinions (the first chunk of them on large questions); thought
+    continues the recommendation exchange.
+
+    `weights` gives how many answers each (deduplicated) opinion stands for.
+    `previous` ({"opinions": [...], "classification": [...]}) resumes an earlier
+    run: `opinions` are then only the answers added since.
     """
+    weights = weights or [1] * len(opinions)
+    prior_count = len(_classifications(previous["classification"])) if previous else 0
+
     # Step 1: classification
-    classification_prompt = f"""
+    def classification_prompt(_, chunk):
+        return f"""
 Classify each opinion about "{topic}" as "pro", "contra", or "neutral".
 Return JSON array with: opinion, classification, reason.
 Opinions:
-{json.dumps(opinions, indent=2)}
+{json.dumps(chunk, indent=2)}
 """
-    classified = ask_mistral(classification_prompt)
-    dist = {"pro": 0, "contra": 0, "neutral": 0}
-    for c in classified:
-        if c.get("classification") in dist:
-            dist[c["classification"]] += 1
 
-    # Step 2: summary and recommendation
-    summary_prompt = f"Write a short neutral summary (2–3 sentences) describing the main arguments about '{topic}'."
-    summary = ask_mistral(summary_prompt, format_json=False)
+    def merge_classifications(parts):
+        return merge_lists([_classifications(result) for _, result in parts])
+
+    def with_weights(result):
+        entries = _classifications(result)
+        return entries[:prior_count] + attach_weights(entries[prior_count:], opinions, weights)
+
+    # Step 2: summary and recommendation, in a conversation about the opinions
+    listing = (previous["opinions"] if previous else []) + weighted_listing(opinions, weights)
+    sample = chunk_opinions(listing)[0]
+    label = "Opinions" if len(sample) == len(listing) else f"Opinions (sample of {len(sample)} of {len(listing)})"
+    repeat_note = "\nAn opinion ending in (×n) was given n times." if max(weights, default=1) > 1 else ""
+    context = f"""You are analyzing opinions about "{topic}".{repeat_note}
+{label}:
+{json.dumps(sample, indent=2)}"""
 
+    summary_prompt = f"Write a short neutral summary (2–3 sentences) describing the main arguments about '{topic}'."
     rec_prompt = f"Provide a concise recommendation (2–3 sentences) based on the opinions above for '{topic}'."
-    recommendation = ask_mistral(rec_prompt, format_json=False)
+    thought_prompt = "In one sentence, summarize the key reasoning behind your recommendation."
+
+    results = await run_prompt_graph([
+        map_reduce_step(
+            "classification",
+            lambda _: opinions,
+            classification_prompt,
+            merge_classifications,
+            previous=(previous["opinions"], previous["classification"]) if previous else None,
+            finalize=with_weights,
+        ),
+        PromptStep("summary", lambda _: summary_prompt, format_json=False, conversational=True),
+        PromptStep("recommendation", lambda _: rec_prompt, format_json=False, conversational=True),
+        PromptStep(
+            "thought",
+            lambda _: thought_prompt,
+            depends_on=("recommendation",),
+            format_json=False,
+            conversational=True,
+        ),
+    ], context=context)
 
-    thought_prompt = "In one sentence, summarize the key reasoning behind this recommendation."
-    thought = ask_mistral(thought_prompt, format_json=False)
+    classifications = results["classification"]
+    total = (len(previous["opinions"]) if previous else 0) + sum(weights)
 
-    return dist, len(opinions), summary, recommendation, thought
+    return (
+        stance_distribution(classifications),
+        total,
+        results["summary"],
+        results["recommendation"],
+        results["thought"],
+        classifications,
+    )
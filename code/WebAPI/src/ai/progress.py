@@ -0,0 +1,120 @@
+"""
+Live progress of running analyses (GET /analyze/stream/{question_id}).
+
+While a job runs, prompt-graph steps publish their results as stages
+(distribution, themes, reasons, summary, recommendation, ai_thought) and
+narrative steps stream their text deltas as Mistral generates them. Events
+go to an in-process bus keyed by question id; the events of the current run
+are kept so a client that connects mid-run first catches up.
+
+The bus lives in the API process running the job. Clients attached to
+another process only see the final outcome, which the stream endpoint reads
+from the database.
+"""
+
+import asyncio
+import contextvars
+from typing import Any, Callable
+
+from src.ai.aggregates import stance_distribution
+
+# Prompt-graph step name → stage name sent to clients
+STAGES = {
+    "classification": "distribution",
+    "detection": "distribution",
+    "ranking": "distribution",
+    "sentiment": "themes",
+    "themes": "themes",
+    "reasons": "reasons",
+    "summary": "summary",
+    "recommendation": "recommendation",
+    "thought": "ai_thought",
+}
+
+# Per-opinion intermediates are not sent to clients
+_INTERNAL_KEYS = ("mapping", "parsed_opinions")
+
+# Question whose analysis is running in the current task
+_question: contextvars.ContextVar[int | None] = contextvars.ContextVar("progress_question", default=None)
+
+
+def _stage_data(step: str, result: Any) -> Any:
+    if step == "classification":
+        return stance_distribution(result if isinstance(result, list) else [])
+    if isinstance(result, dict):
+        return {k: v for k, v in result.items() if k not in _INTERNAL_KEYS}
+    return result
+
+
+class ProgressBus:
+    """Per-question fan-out of progress events to asyncio queues (event-loop only)."""
+
+    def __init__(self, history_limit: int = 5000):
+        self.history_limit = history_limit
+        self._subscribers: dict[int, set[asyncio.Queue]] = {}
+        self._history: dict[int, list[dict]] = {}
+
+    def start(self, question_id: int) -> None:
+        self._history[question_id] = []
+
+    def publish(self, question_id: int, event: str, data: Any) -> None:
+        message = {"event": event, "data": data}
+        history = self._history.get(question_id)
+        if history is not None and len(history) < self.history_limit:
+            history.append(message)
+        for queue in self._subscribers.get(question_id, ()):
+            queue.put_nowait(message)
+
+    def finish(self, question_id: int) -> None:
+        """Signal that the run ended (its outcome is in the database)."""
+        self._history.pop(question_id, None)
+        for queue in self._subscribers.get(question_id, ()):
+            queue.put_nowait({"event": "finished", "data": None})
+
+    def subscribe(self, question_id: int) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        for message in self._history.get(question_id, ()):
+            queue.put_nowait(message)
+        self._subscribers.setdefault(question_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, question_id: int, queue: asyncio.Queue) -> None:
+        subscribers = self._subscribers.get(question_id)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[question_id]
+
+
+progress_bus = ProgressBus()
+
+
+# ---------------------------------------------------------------------
+# Job-side API
+# ---------------------------------------------------------------------
+def begin(question_id: int, job_id: int) -> contextvars.Token:
+    """Report the progress of the calling task under `question_id`; pass the token to `end`."""
+    progress_bus.start(question_id)
+    progress_bus.publish(question_id, "status", {"status": "running", "job_id": job_id})
+    return _question.set(question_id)
+
+
+def end(question_id: int, token: contextvars.Token) -> None:
+    _question.reset(token)
+    progress_bus.finish(question_id)
+
+
+def publish_step(step: str, result: Any) -> None:
+    """Publish a finished prompt-graph step, if it is a client-facing stage of a reported run."""
+    question_id = _question.get()
+    if question_id is not None and step in STAGES:
+        progress_bus.publish(question_id, "stage", {"stage": STAGES[step], "data": _stage_data(step, result)})
+
+
+def delta_sink(step: str) -> Callable[[str], None] | None:
+    """Callback publishing streamed text of a narrative step, or None when nothing is reported."""
+    question_id = _question.get()
+    if question_id is None or step not in STAGES:
+        return None
+    stage = STAGES[step]
+    return lambda text: progress_bus.publish(question_id, "delta", {"stage": stage, "text": text})
@@ -0,0 +1,95 @@
+"""
+Tiny dependency-graph runner for multi-step LLM pipelines.
+
+Each pipeline declares its prompts as `PromptStep`s. A step lists the steps
+whose output it needs; steps with no pending dependencies are sent to
+Mistral concurrently, so the wall-clock cost of a pipeline is the depth of
+its graph rather than the number of prompts. A step may also run a custom
+coroutine instead of a single prompt, e.g. a map-reduce fan-out.
+
+Conversational steps share one multi-turn session: they see the graph's
+`context` (sent once, as a system message) and the exchanges of their
+conversational dependencies, so their prompts only add instructions.
+
+Finished steps, and the text of narrative steps as it streams in, are
+published to `src.ai.progress` for live analysis streams.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from src.ai.mistral_client import ChatSession, ask_mistral_async
+from src.ai.progress import delta_sink, publish_step
+from src.ai.tokens import current_step, step_label
+from src import telemetry
+
+
+@dataclass(frozen=True)
+class PromptStep:
+    """A single prompt in a pipeline graph."""
+    name: str
+    build: Callable[[dict[str, Any]], str] | None  # receives {dependency_name: result}
+    depends_on: tuple[str, ...] = ()
+    format_json: bool = True
+    temperature: float = 0.3
+    # Custom coroutine run instead of a single prompt (e.g. a map-reduce fan-out)
+    run: Callable[[dict[str, Any]], Awaitable[Any]] | None = None
+    # Continue the graph context and the conversation of conversational dependencies
+    conversational: bool = False
+
+
+async def run_prompt_graph(steps: list[PromptStep], context: str | None = None) -> dict[str, Any]:
+    """
+    Execute the steps, starting each one as soon as its dependencies resolve.
+
+    Steps must be listed in dependency order (a step may only depend on steps
+    declared before it). Returns a mapping of step name to Mistral result.
+    `context` is shared by the conversational steps.
+    """
+    tasks: dict[str, asyncio.Task] = {}
+    sessions: dict[str, ChatSession] = {}
+
+    async def _run(step: PromptStep):
+        deps = {name: await tasks[name] for name in step.depends_on}
+        session = None
+        if step.conversational:
+            # Dependencies have finished, so their sessions hold their exchanges
+            session = ChatSession(context)
+            for name in step.depends_on:
+                if name in sessions:
+                    session.extend(sessions[name])
+            sessions[step.name] = session
+        with step_label(step.name), telemetry.span("step", current_step.get()):
+            if step.run is not None:
+                result = await step.run(deps)
+            else:
+                # Narrative (non-JSON) steps stream their text to progress listeners
+                result = await ask_mistral_async(
+                    step.build(deps),
+                    format_json=step.format_json,
+                    temperature=step.temperature,
+                    session=session,
+                    on_delta=None if step.format_json else delta_sink(step.name),
+                )
+        publish_step(step.name, result)
+        return result
+
+    declared: set[str] = set()
+    for step in steps:
+        missing = [d for d in step.depends_on if d not in declared]
+        if missing:
+            raise ValueError(f"Step '{step.name}' depends on undeclared step(s): {missing}")
+        declared.add(step.name)
+
+    for step in steps:
+        tasks[step.name] = asyncio.ensure_future(_run(step))
+
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        raise
+
+    return {name: task.result() for name, task in tasks.items()}
@@ -0,0 +1,287 @@
+"""
+Resilience layer around Mistral calls.
+
+Every call goes through `Resilience.run_async` (or `run` for the blocking
+client), which applies, per attempt:
+- a circuit breaker: after MISTRAL_CIRCUIT_FAILURES consecutive upstream
+  failures calls fail fast with `CircuitOpenError` for
+  MISTRAL_CIRCUIT_RESET_SECONDS, then a single trial call decides whether
+  the circuit closes again;
+- a token-bucket rate limiter shared by all requests of the process
+  (MISTRAL_RATE_LIMIT requests per second, bursts up to MISTRAL_RATE_BURST);
+- a timeout bounded by what is left of the per-call deadline (MISTRAL_DEADLINE).
+Retryable failures — timeouts, connection errors, 429 and 5xx responses —
+are retried up to MISTRAL_MAX_RETRIES times with full-jitter exponential
+backoff (or the server's Retry-After, when longer). Other errors, e.g. 400
+or 401, are raised immediately and do not count against the breaker.
+
+All limits come from src.config, so the layer can be exercised against a
+local fake server (MISTRAL_SERVER_URL).
+"""
+
+import asyncio
+import contextlib
+import random
+import threading
+import time
+from typing import Awaitable, Callable, TypeVar
+
+import httpx
+from mistralai.models import MistralError
+
+from src.config import (
+    MISTRAL_DEADLINE,
+    MISTRAL_TIMEOUT,
+    MISTRAL_MAX_RETRIES,
+    MISTRAL_BACKOFF_BASE,
+    MISTRAL_BACKOFF_MAX,
+    MISTRAL_RATE_LIMIT,
+    MISTRAL_RATE_BURST,
+    MISTRAL_CIRCUIT_FAILURES,
+    MISTRAL_CIRCUIT_RESET_SECONDS,
+)
+
+T = TypeVar("T")
+
+_RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class MistralUnavailableError(RuntimeError):
+    """Mistral could not be reached in time (retries exhausted or deadline exceeded)."""
+
+
+class CircuitOpenError(MistralUnavailableError):
+    """The circuit breaker is open: Mistral is considered unhealthy, the call was not sent."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Transient upstream failures worth another attempt."""
+    if isinstance(exc, MistralError):
+        return exc.status_code in _RETRYABLE_STATUS
+    return isinstance(exc, (httpx.TimeoutException, httpx.TransportError, asyncio.TimeoutError, TimeoutError))
+
+
+def _retry_after(exc: BaseException) -> float | None:
+    """Seconds from a Retry-After header (delta-seconds form only)."""
+    headers = getattr(exc, "headers", None)
+    value = headers.get("retry-after") if headers is not None else None
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except ValueError:
+        return None
+
+
+# ---------------------------------------------------------------------
+# Token bucket
+# ---------------------------------------------------------------------
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, at most `burst` banked.
+    A rate of 0 disables limiting.
+    """
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._clock = clock
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token; returns how long the caller must wait before using it."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    async def acquire_async(self) -> None:
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def acquire(self) -> None:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+# ---------------------------------------------------------------------
+# Circuit breaker
+# ---------------------------------------------------------------------
+class CircuitBreaker:
+    """Closed → open after `failure_threshold` consecutive failures → half-open after `reset_timeout`."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half_open" if self._clock() - self._opened_at >= self.reset_timeout else "open"
+
+    def before_call(self) -> None:
+        """Raise `CircuitOpenError` unless a call may be sent now."""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True  # one trial call at a time
+                return
+        raise CircuitOpenError("Mistral circuit breaker is open; failing fast.")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._trial_running:
+                    print(f"⚠️  Mistral circuit opened after {self._failures} consecutive failure(s).")
+                self._opened_at = self._clock()
+            self._trial_running = False
+
+    def release(self) -> None:
+        """End a call that neither succeeded nor failed upstream (e.g. a 400)."""
+        with self._lock:
+            self._trial_running = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"state": self._state(), "consecutive_failures": self._failures}
+
+
+# ---------------------------------------------------------------------
+# Retry loop
+# ---------------------------------------------------------------------
+class Resilience:
+    """Deadline, retries with jittered backoff, rate limiting and circuit breaking for one upstream."""
+
+    def __init__(
+        self,
+        limiter: TokenBucket,
+        breaker: CircuitBreaker,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 20.0,
+        deadline: float = 300.0,
+        attempt_timeout: float = 120.0,
+    ):
+        self.limiter = limiter
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self._retries = 0
+        self._failures = 0
+
+    def _backoff(self, attempt: int, exc: BaseException) -> float:
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        retry_after = _retry_after(exc)
+        return max(delay, min(retry_after, self.backoff_max)) if retry_after is not None else delay
+
+    def _after_failure(self, exc: BaseException, attempt: int, started: float, can_retry: bool) -> float:
+        """Record a failed attempt; returns the backoff delay or raises when giving up."""
+        if not is_retryable(exc):
+            self.breaker.release()
+            raise exc
+        self.breaker.record_failure()
+        remaining = self.deadline - (time.monotonic() - started)
+        delay = self._backoff(attempt, exc)
+        if not can_retry or attempt >= self.max_retries or delay >= remaining:
+            self._failures += 1
+            raise MistralUnavailableError(
+                f"Mistral call failed after {attempt + 1} attempt(s): {type(exc).__name__}: {exc}"
+            ) from exc
+        self._retries += 1
+        return delay
+
+    async def run_async(
+        self,
+        attempt: Callable[[], Awaitable[T]],
+        can_retry: Callable[[], bool] = lambda: True,
+        slots: asyncio.Semaphore | None = None,
+    ) -> T:
+        """
+        Await `attempt()` until it succeeds, retrying transient failures.
+
+        `can_retry` is checked after a failure (e.g. False once a stream was
+        partly consumed). Each attempt holds one of `slots`, if given; waiting
+        for a slot does not count against the attempt timeout, and no slot is
+        held while backing off.
+        """
+        started = time.monotonic()
+        for n in range(self.max_retries + 1):
+            self.breaker.before_call()
+            await self.limiter.acquire_async()
+            try:
+                async with slots or contextlib.nullcontext():
+                    remaining = self.deadline - (time.monotonic() - started)
+                    timeout = max(min(self.attempt_timeout, remaining), 0.001)
+                    result = await asyncio.wait_for(attempt(), timeout=timeout)
+            except Exception as exc:
+                await asyncio.sleep(self._after_failure(exc, n, started, can_retry()))
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return result
+        raise AssertionError("unreachable")
+
+    def run(self, attempt: Callable[[float], T]) -> T:
+        """
+        Blocking variant of `run_async`. A blocking call cannot be cancelled
+        from outside, so `attempt(timeout)` receives the seconds it may take
+        (bounded by what is left of the deadline) and must enforce them itself,
+        e.g. as the HTTP request timeout.
+        """
+        started = time.monotonic()
+        for n in range(self.max_retries + 1):
+            self.breaker.before_call()
+            self.limiter.acquire()
+            try:
+                remaining = self.deadline - (time.monotonic() - started)
+                result = attempt(max(min(self.attempt_timeout, remaining), 0.001))
+            except Exception as exc:
+                time.sleep(self._after_failure(exc, n, started, True))
+                continue
+            self.breaker.record_success()
+            return result
+        raise AssertionError("unreachable")
+
+    def stats(self) -> dict:
+        return {**self.breaker.stats(), "retries": self._retries, "failed_calls": self._failures}
+
+
+mistral_resilience = Resilience(
+    TokenBucket(MISTRAL_RATE_LIMIT, MISTRAL_RATE_BURST),
+    CircuitBreaker(MISTRAL_CIRCUIT_FAILURES, MISTRAL_CIRCUIT_RESET_SECONDS),
+    max_retries=MISTRAL_MAX_RETRIES,
+    backoff_base=MISTRAL_BACKOFF_BASE,
+    backoff_max=MISTRAL_BACKOFF_MAX,
+    deadline=MISTRAL_DEADLINE,
+    attempt_timeout=MISTRAL_TIMEOUT,
+)
@@ -0,0 +1,191 @@
+"""
+Token budgeting for analysis prompts.
+
+Prompt sizes are estimated locally (no tokenizer dependency): a
+characters-per-token heuristic calibrated against the `usage` Mistral
+returns, so estimates converge on the real tokenizer as calls complete.
+
+Pipelines use the estimator to
+- split opinions into budgeted chunks (`map_reduce.chunk_opinions`),
+- compact JSON embedded in follow-up prompts (`compact_json`) — theme
+  examples, reasons lists — once it exceeds its budget,
+and every Mistral call records estimated vs actual tokens per pipeline step
+in `token_usage` for capacity planning (GET /analyze/tokens/stats).
+"""
+
+import contextvars
+import json
+import math
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from src.config import ANALYSIS_PROMPT_TOKENS
+
+_CHARS_PER_TOKEN = 4.0        # uncalibrated guess for Mistral tokenizers
+_MIN_CALIBRATION_CALLS = 5
+_CALIBRATION_BOUNDS = (0.5, 3.0)
+
+# Label of the pipeline step issuing the current Mistral call
+_UNLABELLED = "unlabelled"
+current_step: contextvars.ContextVar[str] = contextvars.ContextVar("current_step", default=_UNLABELLED)
+
+
+def raw_estimate(text: str) -> int:
+    """Uncalibrated token count (~4 characters per token)."""
+    return int(len(text) / _CHARS_PER_TOKEN) + 1
+
+
+def estimate_tokens(text: str) -> int:
+    """Token count, calibrated against the usage reported by Mistral so far."""
+    return math.ceil(raw_estimate(text) * token_usage.calibration())
+
+
+@contextmanager
+def step_label(label: str) -> Iterator[None]:
+    """Attribute Mistral calls made inside the block to `label` (nested labels join with '/')."""
+    parent = current_step.get()
+    token = current_step.set(label if parent == _UNLABELLED else f"{parent}/{label}")
+    try:
+        yield
+    finally:
+        current_step.reset(token)
+
+
+# ---------------------------------------------------------------------
+# Prompt compaction
+# ---------------------------------------------------------------------
+def truncate_text(text: str, max_tokens: int) -> str:
+    """Cut `text` to roughly `max_tokens` tokens, marking the cut with an ellipsis."""
+    max_chars = int(max_tokens * _CHARS_PER_TOKEN / token_usage.calibration())
+    return text if len(text) <= max_chars else text[:max(max_chars - 1, 0)].rstrip() + "…"
+
+
+def _string_lists(value: Any, found: list[list]) -> list[list]:
+    if isinstance(value, list):
+        if value and all(isinstance(v, str) for v in value):
+            found.append(value)
+        else:
+            for v in value:
+                _string_lists(v, found)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _string_lists(v, found)
+    return found
+
+
+def _truncate_strings(value: Any, max_tokens: int) -> Any:
+    if isinstance(value, str):
+        return truncate_text(value, max_tokens)
+    if isinstance(value, list):
+        return [_truncate_strings(v, max_tokens) for v in value]
+    if isinstance(value, dict):
+        return {k: _truncate_strings(v, max_tokens) for k, v in value.items()}
+    return value
+
+
+def compact_json(value: Any, budget: int, max_item_tokens: int = 80) -> Any:
+    """
+    Shrink a JSON-serializable value (e.g. themes with `examples` arrays) so
+    that `json.dumps(value, indent=2)` fits in `budget` tokens.
+
+    Values within budget are returned unchanged. Otherwise long strings are
+    truncated to `max_item_tokens`, then the longest lists of strings drop
+    their trailing items (each keeps at least one) until the value fits or
+    nothing more can go. The input is not modified.
+    """
+    if estimate_tokens(json.dumps(value, indent=2)) <= budget:
+        return value
+    value = _truncate_strings(value, max_item_tokens)
+    cost = estimate_tokens(json.dumps(value, indent=2))
+    lists = _string_lists(value, [])
+    while cost > budget:
+        longest = max(lists, key=len, default=None)
+        if longest is None or len(longest) <= 1:
+            break
+        cost -= estimate_tokens(json.dumps(longest.pop())) + 1
+    return value
+
+
+# ---------------------------------------------------------------------
+# Estimated vs actual usage
+# ---------------------------------------------------------------------
+class TokenUsage:
+    """Per-step counters of estimated and reported tokens; also drives calibration."""
+
+    def __init__(self, prompt_budget: int = 32000):
+        self.prompt_budget = prompt_budget
+        self._lock = threading.Lock()
+        self._steps: dict[str, dict[str, int]] = {}
+        self._raw_total = 0       # raw estimates of calls with reported usage
+        self._actual_total = 0    # their reported prompt tokens
+        self._measured_calls = 0
+
+    def calibration(self) -> float:
+        """Actual / raw-estimated prompt tokens, once enough calls reported usage."""
+        with self._lock:
+            if self._measured_calls < _MIN_CALIBRATION_CALLS or not self._raw_total:
+                return 1.0
+            low, high = _CALIBRATION_BOUNDS
+            return min(high, max(low, self._actual_total / self._raw_total))
+
+    def record(self, prompt: str, usage: Any = None, cached: bool = False) -> None:
+        """
+        Record one Mistral call for the current step. `usage` is the response's
+        usage object (None for cache hits or when the API omits it).
+        """
+        step = current_step.get()
+        raw = raw_estimate(prompt)
+        estimated = estimate_tokens(prompt)
+        if estimated > self.prompt_budget:
+            print(f"⚠️  Prompt for step '{step}' is ~{estimated} tokens (budget {self.prompt_budget}).")
+
+        prompt_tokens = getattr(usage, "prompt_tokens", None) if usage is not None else None
+        completion_tokens = getattr(usage, "completion_tokens", None) if usage is not None else None
+        with self._lock:
+            entry = self._steps.setdefault(step, {
+                "calls": 0,
+                "cached_calls": 0,
+                "estimated_prompt_tokens": 0,
+                "measured_calls": 0,
+                "measured_estimate_tokens": 0,
+                "actual_prompt_tokens": 0,
+                "actual_completion_tokens": 0,
+            })
+            entry["calls"] += 1
+            entry["cached_calls"] += int(cached)
+            entry["estimated_prompt_tokens"] += estimated
+            if isinstance(prompt_tokens, int):
+                entry["measured_calls"] += 1
+                entry["measured_estimate_tokens"] += estimated
+                entry["actual_prompt_tokens"] += prompt_tokens
+                entry["actual_completion_tokens"] += completion_tokens or 0
+                self._measured_calls += 1
+                self._raw_total += raw
+                self._actual_total += prompt_tokens
+
+    def reset(self) -> None:
+        with self._lock:
+            self._steps.clear()
+            self._raw_total = self._actual_total = self._measured_calls = 0
+
+    def stats(self) -> dict:
+        """Per-step counters plus `estimate_ratio` (actual / estimated prompt tokens)."""
+        calibration = self.calibration()
+        with self._lock:
+            steps = {}
+            for step, entry in sorted(self._steps.items()):
+                measured = entry["measured_estimate_tokens"]
+                steps[step] = {
+                    **entry,
+                    "estimate_ratio": round(entry["actual_prompt_tokens"] / measured, 3) if measured else None,
+                }
+            return {
+                "prompt_budget": self.prompt_budget,
+                "calibration": round(calibration, 3),
+                "measured_calls": self._measured_calls,
+                "steps": steps,
+            }
+
+
+token_usage = TokenUsage(prompt_budget=ANALYSIS_PROMPT_TOKENS)
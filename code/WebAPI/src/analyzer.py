@@ -12,6 +12,8 @@ Supported types:
 - feedback_analysis
 """
 
+import asyncio
+
 from sqlalchemy.orm import Session
 from src.db.session import init_db, SessionLocal
 from src.db import models
@@ -22,25 +24,273 @@ from src.ai.pipelines.option_comparison import option_comparison_pipeline
 from src.ai.pipelines.idea_generation import idea_generation_pipeline
 from src.ai.pipelines.priority_ranking import priority_ranking_pipeline
 from src.ai.pipelines.feedback_analysis import feedback_analysis_pipeline
+from src.ai.pipelines.compact import compact_pipeline, CompactAnalysisError
+from src.ai.dedup import collapse_duplicates
+from src.ai.tokens import step_label
+from src.config import ANALYSIS_COMPACT_TYPES, ANALYSIS_DEDUP_ENABLED
+
+
+# Report model per question type
+MODEL_MAP = {
+    "stance_analysis": models.StanceAnalysis,
+    "option_comparison": models.OptionComparison,
+    "idea_generation": models.IdeaGeneration,
+    "priority_ranking": models.PriorityRanking,
+    "feedback_analysis": models.FeedbackAnalysis,
+}
+
+
+# Multi-step pipeline per question type
+PIPELINES = {
+    "stance_analysis": stance_pipeline,
+    "option_comparison": option_comparison_pipeline,
+    "idea_generation": idea_generation_pipeline,
+    "priority_ranking": priority_ranking_pipeline,
+    "feedback_analysis": feedback_analysis_pipeline,
+}
 
 
 # ---------------------------------------------------------------------
-# Utility function
+# Utility functions
 # ---------------------------------------------------------------------
 def _unwrap(value, key: str):
     """If a dict wraps the real value under a single key, extract it."""
     return value[key] if isinstance(value, dict) and key in value else value
 
 
+def _uses_compact_mode(question_type: str) -> bool:
+    return "all" in ANALYSIS_COMPACT_TYPES or question_type in ANALYSIS_COMPACT_TYPES
+
+
+def _previous_state(question_type: str, record, opinions: list[str]) -> dict | None:
+    """
+    Step results of an earlier report that can be resumed, or None when a full run is needed.
+
+    Resuming requires the report to be of the same type, to carry its
+    per-opinion intermediates, and its opinions to be a prefix of `opinions`
+    (answers only appended since, none edited or removed).
+    """
+    if record is None or not isinstance(record, MODEL_MAP.get(question_type, ())):
+        return None
+    prior = (record.raw_inputs or {}).get("opinions")
+    if not prior or opinions[:len(prior)] != prior:
+        return None
+
+    if isinstance(record, models.StanceAnalysis) and record.classifications is not None:
+        return {"opinions": prior, "classification": record.classifications}
+
+    if isinstance(record, models.OptionComparison) and record.mapping is not None:
+        return {
+            "opinions": prior,
+            "detection": {**(record.distribution_and_options or {}), "mapping": record.mapping},
+            "reasons": {"reasons": record.reasons or {}},
+        }
+
+    if isinstance(record, models.PriorityRanking) and record.parsed_opinions is not None:
+        return {
+            "opinions": prior,
+            "ranking": {**(record.options_and_means or {}), "parsed_opinions": record.parsed_opinions},
+            "reasons": {"top_reasons": record.top_reasons or {}},
+        }
+
+    return None
+
+
+def _collapse(opinions: list[str]) -> tuple[list[str], list[int]]:
+    """Distinct answers and how many answers each stands for (dedup stage)."""
+    if not ANALYSIS_DEDUP_ENABLED:
+        return opinions, [1] * len(opinions)
+    groups = collapse_duplicates(opinions)
+    if len(groups) < len(opinions):
+        print(f"ℹ️  Collapsed {len(opinions)} answers into {len(groups)} distinct ones.")
+    return [g.text for g in groups], [g.weight for g in groups]
+
+
+async def _run_pipeline(question_type: str, topic: str, opinions: list[str], previous: dict | None = None):
+    """
+    Collapse duplicate answers, then resume the previous run when possible;
+    otherwise run the single-call pipeline when enabled, else (or on invalid
+    output) the multi-step one.
+    """
+    pending = opinions[len(previous["opinions"]):] if previous else opinions
+    # CPU-bound (MinHash/LSH): off the event loop shared with requests and other jobs
+    texts, weights = await asyncio.to_thread(_collapse, pending)
+
+    with step_label(question_type):  # token usage is reported per question type and step
+        if previous is not None:
+            print(f"ℹ️  Incremental {question_type} re-analysis: {len(pending)} new opinion(s).")
+            return await PIPELINES[question_type](topic, texts, previous=previous, weights=weights)
+        if _uses_compact_mode(question_type):
+            try:
+                with step_label("compact"):
+                    return await compact_pipeline(question_type, topic, texts, weights)
+            except CompactAnalysisError as e:
+                print(f"⚠️  Compact {question_type} response rejected ({e}), falling back to multi-step pipeline.")
+        return await PIPELINES[question_type](topic, texts, weights=weights)
+
+
 # ---------------------------------------------------------------------
 # Main dispatcher
 # ---------------------------------------------------------------------
-def analyze_topic(
+async def build_report(
+    question_type: str,
+    topic: str,
+    opinions: list[str],
+    question_id: int,
+    previous_record=None,
+):
+    """
+    Run the analysis pipeline and return the (unsaved) report record.
+    Only awaits Mistral; no database I/O, so the caller decides how and
+    where the record is persisted.
+    """
+    previous = _previous_state(question_type, previous_record, opinions)
+
+    if question_type == "stance_analysis":
+        distribution, total, summary, recommendation, thought, classifications = await _run_pipeline(
+            question_type, topic, opinions, previous
+        )
+        record = models.StanceAnalysis(
+            question_id=question_id,
+            topic=topic,
+            raw_inputs={"opinions": opinions},
+            distribution=distribution,
+            total_responses=total,
+            classifications=classifications,
+            summary=summary,
+            recommendation=recommendation,
+            ai_thought=thought,
+        )
+
+    elif question_type == "option_comparison":
+        dist_opts, reasons, summary, recommendation, thought, mapping = await _run_pipeline(
+            question_type, topic, opinions, previous
+        )
+        record = models.OptionComparison(
+            question_id=question_id,
+            topic=topic,
+            raw_inputs={"opinions": opinions},
+            distribution_and_options=dist_opts,
+            reasons=reasons,
+            mapping=mapping,
+            summary=summary,
+            recommendation=recommendation,
+            ai_thought=thought,
+        )
+
+    elif question_type == "idea_generation":
+        themes, summary, recommendation, thought = await _run_pipeline(question_type, topic, opinions)
+        themes = _unwrap(themes, "themes")
+
+        record = models.IdeaGeneration(
+            question_id=question_id,
+            topic=topic,
+            raw_inputs={"ideas": opinions},
+            themes=themes,
+            summary=summary,
+            recommendation=recommendation,
+            ai_thought=thought,
+        )
+
+    elif question_type == "priority_ranking":
+        opts_means, top_reasons, summary, recommendation, thought, parsed_opinions = await _run_pipeline(
+            question_type, topic, opinions, previous
+        )
+        record = models.PriorityRanking(
+            question_id=question_id,
+            topic=topic,
+            raw_inputs={"opinions": opinions},
+            options_and_means=opts_means,
+            top_reasons=top_reasons,
+            parsed_opinions=parsed_opinions,
+            summary=summary,
+            recommendation=recommendation,
+            ai_thought=thought,
+        )
+
+    elif question_type == "feedback_analysis":
+        sentiment, pos_themes, neg_themes, summary, recommendation, thought = await _run_pipeline(
+            question_type, topic, opinions
+        )
+
+        pos_themes = _unwrap(pos_themes, "themes")
+        neg_themes = _unwrap(neg_themes, "themes")
+
+        record = models.FeedbackAnalysis(
+            question_id=question_id,
+            topic=topic,
+            raw_inputs={"feedback": opinions},
+            sentiment=sentiment,
+            positive_themes=pos_themes,
+            negative_themes=neg_themes,
+            summary=summary,
+            recommendation=recommendation,
+            ai_thought=thought,
+        )
+
+    else:
+        raise ValueError(f"Unsupported question_type: {question_type}")
+
+    return record
+
+
+def report_result(record, question_type: str) -> dict:
+    """Structured summary of a stored report record, for API or CLI use."""
+    result = {
+        "id": record.id,
+        "question_type": question_type,
+        "topic": record.topic,
+        "created_at": record.created_at.isoformat() if record.created_at else None,
+        "updated_at": record.updated_at.isoformat() if record.updated_at else None,
+        "summary": getattr(record, "summary", None),
+        "recommendation": getattr(record, "recommendation", None),
+        "ai_thought": getattr(record, "ai_thought", None),
+    }
+
+    # Attach additional fields based on record type
+    if isinstance(record, models.StanceAnalysis):
+        result.update(
+            {
+                "distribution": record.distribution,
+                "total_responses": record.total_responses,
+                "themes": record.themes,
+            }
+        )
+    elif isinstance(record, models.OptionComparison):
+        result.update(
+            {
+                "distribution_and_options": record.distribution_and_options,
+                "reasons": record.reasons,
+            }
+        )
+    elif isinstance(record, models.IdeaGeneration):
+        result.update({"themes": record.themes})
+    elif isinstance(record, models.PriorityRanking):
+        result.update(
+            {
+                "options_and_means": record.options_and_means,
+                "top_reasons": record.top_reasons,
+            }
+        )
+    elif isinstance(record, models.FeedbackAnalysis):
+        result.update(
+            {
+                "sentiment": record.sentiment,
+                "positive_themes": record.positive_themes,
+                "negative_themes": record.negative_themes,
+            }
+        )
+
+    return result
+
+
+async def analyze_topic(
     question_type: str,
     topic: str,
     opinions: list[str],
     session: Session | None = None,
     question_id: int | None = None,
+    previous_record=None,
 ) -> dict:
     """
     Perform an analysis and persist its results in the database.
@@ -59,14 +309,18 @@ def analyze_topic(
         Optional SQLAlchemy session; if not provided, a temporary session is created.
     question_id : int | None
         Optional existing Question ID to link this analysis to.
+    previous_record : analysis model | None
+        Report being replaced; when its opinions prefix `opinions`, only the
+        new opinions are classified (stance, option comparison, priority ranking).
 
     Returns
     -------
     dict
         A structured summary of the stored record.
-    """
-    init_db()
 
+    The session calls block; the analysis queue uses `build_report` instead
+    and persists from a worker thread.
+    """
     close_session = False
     if session is None:
         session = SessionLocal()
@@ -84,84 +338,7 @@ def analyze_topic(
             session.commit()
             question_id = temp_question.id
 
-        # -----------------------------------------------------------------
-        # Dispatch by question type
-        # -----------------------------------------------------------------
-        if question_type == "stance_analysis":
-            distribution, total, summary, recommendation, thought = stance_pipeline(topic, opinions)
-            record = models.StanceAnalysis(
-                question_id=question_id,
-                topic=topic,
-                raw_inputs={"opinions": opinions},
-                distribution=distribution,
-                total_responses=total,
-                summary=summary,
-                recommendation=recommendation,
-                ai_thought=thought,
-            )
-
-        elif question_type == "option_comparison":
-            dist_opts, reasons, summary, recommendation, thought = option_comparison_pipeline(topic, opinions)
-            record = models.OptionComparison(
-                question_id=question_id,
-                topic=topic,
-                raw_inputs={"opinions": opinions},
-                distribution_and_options=dist_opts,
-                reasons=reasons,
-                summary=summary,
-                recommendation=recommendation,
-                ai_thought=thought,
-            )
-
-        elif question_type == "idea_generation":
-            themes, summary, recommendation, thought = idea_generation_pipeline(topic, opinions)
-            themes = _unwrap(themes, "themes")
-
-            record = models.IdeaGeneration(
-                question_id=question_id,
-                topic=topic,
-                raw_inputs={"ideas": opinions},
-                themes=themes,
-                summary=summary,
-                recommendation=recommendation,
-                ai_thought=thought,
-            )
-
-        elif question_type == "priority_ranking":
-            opts_means, top_reasons, summary, recommendation, thought = priority_ranking_pipeline(topic, opinions)
-            record = models.PriorityRanking(
-                question_id=question_id,
-                topic=topic,
-                raw_inputs={"opinions": opinions},
-                options_and_means=opts_means,
-                top_reasons=top_reasons,
-                summary=summary,
-                recommendation=recommendation,
-                ai_thought=thought,
-            )
-
-        elif question_type == "feedback_analysis":
-            sentiment, pos_themes, neg_themes, summary, recommendation, thought = feedback_analysis_pipeline(
-                topic, opinions
-            )
-
-            pos_themes = _unwrap(pos_themes, "themes")
-            neg_themes = _unwrap(neg_themes, "themes")
-
-            record = models.FeedbackAnalysis(
-                question_id=question_id,
-                topic=topic,
-                raw_inputs={"feedback": opinions},
-                sentiment=sentiment,
-                positive_themes=pos_themes,
-                negative_themes=neg_themes,
-                summary=summary,
-                recommendation=recommendation,
-                ai_thought=thought,
-            )
-
-        else:
-            raise ValueError(f"Unsupported question_type: {question_type}")
+        record = await build_report(question_type, topic, opinions, question_id, previous_record)
 
         # -----------------------------------------------------------------
         # Persist record
@@ -170,55 +347,7 @@ def analyze_topic(
         session.commit()
         session.refresh(record)
 
-        # -----------------------------------------------------------------
-        # Prepare structured result for API or CLI use
-        # -----------------------------------------------------------------
-        result = {
-            "id": record.id,
-            "question_type": question_type,
-            "topic": record.topic,
-            "created_at": record.created_at.isoformat() if record.created_at else None,
-            "updated_at": record.updated_at.isoformat() if record.updated_at else None,
-            "summary": getattr(record, "summary", None),
-            "recommendation": getattr(record, "recommendation", None),
-            "ai_thought": getattr(record, "ai_thought", None),
-        }
-
-        # Attach additional fields based on record type
-        if isinstance(record, models.StanceAnalysis):
-            result.update(
-                {
-                    "distribution": record.distribution,
-                    "total_responses": record.total_responses,
-                    "themes": record.themes,
-                }
-            )
-        elif isinstance(record, models.OptionComparison):
-            result.update(
-                {
-                    "distribution_and_options": record.distribution_and_options,
-                    "reasons": record.reasons,
-                }
-            )
-        elif isinstance(record, models.IdeaGeneration):
-            result.update({"themes": record.themes})
-        elif isinstance(record, models.PriorityRanking):
-            result.update(
-                {
-                    "options_and_means": record.options_and_means,
-                    "top_reasons": record.top_reasons,
-                }
-            )
-        elif isinstance(record, models.FeedbackAnalysis):
-            result.update(
-                {
-                    "sentiment": record.sentiment,
-                    "positive_themes": record.positive_themes,
-                    "negative_themes": record.negative_themes,
-                }
-            )
-
-        return result
+        return report_result(record, question_type)
 
     finally:
         if close_session:
@@ -278,7 +407,12 @@ if __name__ == "__main__":
         ),
     ]
 
-    for qtype, topic, data in examples:
-        print(f"\nRunning analysis for: {qtype} | {topic}")
-        result = analyze_topic(qtype, topic, data)
-        print(result)
+    init_db()
+
+    async def _run_examples():
+        for qtype, topic, data in examples:
+            print(f"\nRunning analysis for: {qtype} | {topic}")
+            result = await analyze_topic(qtype, topic, data)
+            print(result)
+
+    asyncio.run(_run_examples())
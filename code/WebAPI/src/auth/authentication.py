@@ -1,10 +1,16 @@
 import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, status
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
+from sqlalchemy import event
 from sqlalchemy.orm import Session
+from src.config import AUTH_CACHE_TTL_SECONDS, AUTH_CACHE_MAX_ENTRIES, AUTH_TRUST_TOKEN_LEAD_ID
 from src.db import models
 from src.db.session import get_db
 
@@ -64,18 +70,94 @@ def verify_refresh_token(refresh_token: str) -> str:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
 
+# === AUTHENTICATED LEAD CACHE ===
+@dataclass(frozen=True)
+class CurrentTeamLead:
+    """Identity of the authenticated team lead, safe to share across requests."""
+    id: int
+    email: str
+
+
+class _LeadCache:
+    """Bounded LRU of access token → resolved lead, with a short TTL."""
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, CurrentTeamLead]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> CurrentTeamLead | None:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires, lead = entry
+            if expires <= time.monotonic():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return lead
+
+    def put(self, token: str, lead: CurrentTeamLead, token_exp: float | None) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        expires = time.monotonic() + self.ttl_seconds
+        if token_exp is not None:
+            # Never outlive the JWT itself
+            expires = min(expires, time.monotonic() + (token_exp - time.time()))
+        with self._lock:
+            self._entries[token] = (expires, lead)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_lead(self, lead_id: int) -> None:
+        with self._lock:
+            for token in [t for t, (_, lead) in self._entries.items() if lead.id == lead_id]:
+                del self._entries[token]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_lead_cache = _LeadCache(AUTH_CACHE_TTL_SECONDS, AUTH_CACHE_MAX_ENTRIES)
+
+
+def invalidate_team_lead(lead_id: int) -> None:
+    """Drop cached identities of a lead (call whenever a lead is changed or removed)."""
+    _lead_cache.invalidate_lead(lead_id)
+
+
+@event.listens_for(models.TeamLead, "after_update")
+@event.listens_for(models.TeamLead, "after_delete")
+def _invalidate_on_change(mapper, connection, target):
+    invalidate_team_lead(target.id)
+
+
 # === CURRENT TEAM LEAD ===
-def get_current_team_lead(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def get_current_team_lead(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> CurrentTeamLead:
+    cached = _lead_cache.get(token)
+    if cached:
+        return cached
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
-        lead = db.query(models.TeamLead).filter(models.TeamLead.email == email).first()
-        if not lead:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="TeamLead not found")
+        lead_id = payload.get("lid")
+        if AUTH_TRUST_TOKEN_LEAD_ID and lead_id is not None:
+            lead = CurrentTeamLead(id=int(lead_id), email=email)
+        else:
+            row = db.query(models.TeamLead.id, models.TeamLead.email).filter(models.TeamLead.email == email).first()
+            if not row:
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="TeamLead not found")
+            lead = CurrentTeamLead(id=row.id, email=row.email)
 
+        _lead_cache.put(token, lead, payload.get("exp"))
         return lead
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
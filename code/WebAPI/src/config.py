@@ -10,4 +10,118 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 
 # Mistral API configuration
 MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
-MISTRAL_MODEL = os.getenv("MISTRAL_MODEL", "mistral-medium-latest")
\ No newline at end of file
+MISTRAL_MODEL = os.getenv("MISTRAL_MODEL", "mistral-medium-latest")
+
+# Mistral HTTP connection pool
+MISTRAL_MAX_CONNECTIONS = int(os.getenv("MISTRAL_MAX_CONNECTIONS", "50"))
+MISTRAL_MAX_KEEPALIVE = int(os.getenv("MISTRAL_MAX_KEEPALIVE", "20"))
+MISTRAL_KEEPALIVE_EXPIRY = float(os.getenv("MISTRAL_KEEPALIVE_EXPIRY", "30"))
+MISTRAL_MAX_CONCURRENCY = int(os.getenv("MISTRAL_MAX_CONCURRENCY", "32"))
+MISTRAL_TIMEOUT = float(os.getenv("MISTRAL_TIMEOUT", "120"))
+
+# Alternative API base URL (e.g. a local fake server for tests and load tests)
+MISTRAL_SERVER_URL = os.getenv("MISTRAL_SERVER_URL") or None
+
+# Mistral call resilience: total deadline per call including retries, retries
+# with jittered exponential backoff, a shared client-side rate limit
+# (requests/second, 0 = unlimited) and a circuit breaker
+MISTRAL_DEADLINE = float(os.getenv("MISTRAL_DEADLINE", "300"))
+MISTRAL_MAX_RETRIES = int(os.getenv("MISTRAL_MAX_RETRIES", "4"))
+MISTRAL_BACKOFF_BASE = float(os.getenv("MISTRAL_BACKOFF_BASE", "0.5"))
+MISTRAL_BACKOFF_MAX = float(os.getenv("MISTRAL_BACKOFF_MAX", "20"))
+MISTRAL_RATE_LIMIT = float(os.getenv("MISTRAL_RATE_LIMIT", "20"))
+MISTRAL_RATE_BURST = int(os.getenv("MISTRAL_RATE_BURST", "40"))
+MISTRAL_CIRCUIT_FAILURES = int(os.getenv("MISTRAL_CIRCUIT_FAILURES", "5"))
+MISTRAL_CIRCUIT_RESET_SECONDS = float(os.getenv("MISTRAL_CIRCUIT_RESET_SECONDS", "30"))
+
+# LLM response cache
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_PERSIST = os.getenv("LLM_CACHE_PERSIST", "false").lower() == "true"
+LLM_CACHE_PERSIST_MAX_ENTRIES = int(os.getenv("LLM_CACHE_PERSIST_MAX_ENTRIES", "20000"))
+
+# Background analysis jobs
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "4"))
+ANALYSIS_POLL_INTERVAL = float(os.getenv("ANALYSIS_POLL_INTERVAL", "2"))
+ANALYSIS_JOB_TIMEOUT = int(os.getenv("ANALYSIS_JOB_TIMEOUT", "900"))
+ANALYSIS_MAX_ATTEMPTS = int(os.getenv("ANALYSIS_MAX_ATTEMPTS", "3"))
+# Delay before retrying a failed job: doubles per attempt, capped, with jitter
+ANALYSIS_BACKOFF_BASE = float(os.getenv("ANALYSIS_BACKOFF_BASE", "30"))
+ANALYSIS_BACKOFF_MAX = float(os.getenv("ANALYSIS_BACKOFF_MAX", "600"))
+# Store each job's spans (step/LLM/DB timings and tokens) on its AnalysisJob row
+ANALYSIS_STORE_TRACE = os.getenv("ANALYSIS_STORE_TRACE", "true").lower() == "true"
+ANALYSIS_TRACE_MAX_SPANS = int(os.getenv("ANALYSIS_TRACE_MAX_SPANS", "500"))
+
+# Authenticated team lead cache
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "4096"))
+# Trust the lead id carried in access tokens and skip the DB lookup entirely
+AUTH_TRUST_TOKEN_LEAD_ID = os.getenv("AUTH_TRUST_TOKEN_LEAD_ID", "false").lower() == "true"
+
+# Question type classification: recent texts cached per process, local
+# keyword guesses trusted from this confidence (0-1, above 1 = always ask
+# Mistral), questions per Mistral call, and questions per bulk request
+QUESTION_TYPE_CACHE_SIZE = int(os.getenv("QUESTION_TYPE_CACHE_SIZE", "4096"))
+QUESTION_TYPE_LOCAL_CONFIDENCE = float(os.getenv("QUESTION_TYPE_LOCAL_CONFIDENCE", "0.75"))
+QUESTION_TYPE_BATCH_SIZE = int(os.getenv("QUESTION_TYPE_BATCH_SIZE", "50"))
+QUESTION_BULK_MAX = int(os.getenv("QUESTION_BULK_MAX", "200"))
+# Create questions without waiting for Mistral: uncertain types are stored as
+# provisional and classified in the background (false = classify inline)
+QUESTION_TYPE_DEFERRED = os.getenv("QUESTION_TYPE_DEFERRED", "true").lower() == "true"
+
+# Sanitizer memoization (distinct strings kept per process)
+SANITIZER_CACHE_SIZE = int(os.getenv("SANITIZER_CACHE_SIZE", "8192"))
+
+# Single-call structured analysis: comma-separated question types (or "all")
+# analyzed in one Mistral request, falling back to the multi-step pipeline
+# when the response does not validate
+ANALYSIS_COMPACT_TYPES = frozenset(
+    t.strip() for t in os.getenv("ANALYSIS_COMPACT_TYPES", "").split(",") if t.strip()
+)
+
+# Map-reduce analysis: opinions are split into chunks of roughly this many
+# prompt tokens, analyzed in parallel and merged
+ANALYSIS_CHUNK_TOKENS = int(os.getenv("ANALYSIS_CHUNK_TOKENS", "6000"))
+
+# Local pre-clustering for idea generation and feedback analysis: inputs with
+# at least this many answers are clustered on the CPU and only this many
+# representative answers per cluster are sent to Mistral
+ANALYSIS_CLUSTER_MIN_ITEMS = int(os.getenv("ANALYSIS_CLUSTER_MIN_ITEMS", "40"))
+ANALYSIS_CLUSTER_SAMPLES = int(os.getenv("ANALYSIS_CLUSTER_SAMPLES", "5"))
+
+# Near-duplicate answer collapsing before analysis (shingle Jaccard similarity)
+ANALYSIS_DEDUP_ENABLED = os.getenv("ANALYSIS_DEDUP_ENABLED", "true").lower() == "true"
+ANALYSIS_DEDUP_THRESHOLD = float(os.getenv("ANALYSIS_DEDUP_THRESHOLD", "0.85"))
+
+# Token budgets: prompts estimated above ANALYSIS_PROMPT_TOKENS are logged;
+# intermediate results embedded in follow-up prompts (themes with examples,
+# reasons lists) are compacted to ANALYSIS_EMBED_TOKENS
+ANALYSIS_PROMPT_TOKENS = int(os.getenv("ANALYSIS_PROMPT_TOKENS", "32000"))
+ANALYSIS_EMBED_TOKENS = int(os.getenv("ANALYSIS_EMBED_TOKENS", "3000"))
+
+# Token email outbox: emails are queued in the database and sent by
+# background workers in batches (EMAIL_TRANSPORT "resend" uses the batch
+# API, up to 100 messages per request; "smtp" sends a batch over one
+# connection), at most EMAIL_RATE_LIMIT provider requests per second
+# (0 = unlimited), retrying transient failures with exponential backoff
+EMAIL_TRANSPORT = os.getenv("EMAIL_TRANSPORT", "resend").lower()
+EMAIL_FROM = os.getenv("EMAIL_FROM", "inSintesi <onboarding@resend.dev>")
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "100"))
+EMAIL_WORKERS = int(os.getenv("EMAIL_WORKERS", "2"))
+EMAIL_POLL_INTERVAL = float(os.getenv("EMAIL_POLL_INTERVAL", "5"))
+# Just under Resend's default limit of 2 requests per second
+EMAIL_RATE_LIMIT = float(os.getenv("EMAIL_RATE_LIMIT", "1.8"))
+EMAIL_RATE_BURST = int(os.getenv("EMAIL_RATE_BURST", "1"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+EMAIL_BACKOFF_BASE = float(os.getenv("EMAIL_BACKOFF_BASE", "5"))
+EMAIL_BACKOFF_MAX = float(os.getenv("EMAIL_BACKOFF_MAX", "600"))
+# Batches left `sending` longer than this (e.g. after a crash) are retried
+EMAIL_SEND_TIMEOUT = int(os.getenv("EMAIL_SEND_TIMEOUT", "300"))
+# SMTP transport (local stand-in: python -m smtpd -n -c DebuggingServer 127.0.0.1:1025
+# on Python 3.11, or python -m aiosmtpd -n -l 127.0.0.1:1025)
+EMAIL_SMTP_HOST = os.getenv("EMAIL_SMTP_HOST", "127.0.0.1")
+EMAIL_SMTP_PORT = int(os.getenv("EMAIL_SMTP_PORT", "1025"))
+EMAIL_SMTP_USER = os.getenv("EMAIL_SMTP_USER") or None
+EMAIL_SMTP_PASSWORD = os.getenv("EMAIL_SMTP_PASSWORD") or None
+EMAIL_SMTP_STARTTLS = os.getenv("EMAIL_SMTP_STARTTLS", "false").lower() == "true"
@@ -1,5 +1,6 @@
 from http.client import HTTPException
 
+from sqlalchemy import insert, or_, select
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 import secrets
@@ -9,8 +10,10 @@ from src.db import models
 
 from fastapi import HTTPException, BackgroundTasks
 
-from src.utils.email import send_token_email
-from src.utils.question_type import get_question_type_by_content
+from src.utils.email import OutgoingEmail, render_token_email
+from src.jobs.email_outbox import enqueue_emails, email_dispatcher
+from src.config import QUESTION_TYPE_DEFERRED
+from src.utils.question_type import resolve_question_types, confirm_question_types
 
 
 def create_question(
@@ -21,25 +24,69 @@ def create_question(
 ):
     """
     Create a new question, automatically assign its type based on content,
-    generate tokens, and optionally send emails.
+    generate tokens, and queue the token emails.
     """
+    return create_questions(db, [question_data], lead_id, background_tasks)[0]
+
+
+def create_questions(
+    db: Session,
+    items: list[schemas.QuestionCreate],
+    lead_id: int,
+    background_tasks: BackgroundTasks,
+):
+    """
+    Create several questions at once (e.g. an imported questionnaire).
+    Their types are classified together, in at most one Mistral call per
+    batch, and all questions are committed in a single transaction.
+
+    With QUESTION_TYPE_DEFERRED the request does not wait for Mistral:
+    uncertain types are stored as provisional and confirmed by a background
+    task once the response is sent.
+    """
+    resolved = resolve_question_types(
+        db, [item.content for item in items], use_mistral=not QUESTION_TYPE_DEFERRED
+    )
+    created = [
+        _add_question(db, item, lead_id, type_id, provisional)
+        for item, (type_id, provisional) in zip(items, resolved)
+    ]
+
+    db.commit()
+    for question, _ in created:
+        db.refresh(question)
+    email_dispatcher.notify()
+
+    provisional_ids = [question.id for question, _ in created if question.type_provisional]
+    if provisional_ids:
+        background_tasks.add_task(confirm_question_types, provisional_ids)
+
+    return created
+
+
+def _add_question(
+    db: Session,
+    question_data: schemas.QuestionCreate,
+    lead_id: int,
+    question_type_id: int,
+    type_provisional: bool = False,
+):
+    """Add a question, its team links and its tokens to the session (no commit)."""
 
     # 1. Prepare base question data (exclude token-related fields)
     question_dict = question_data.dict(
         exclude={"token_type", "teams_ids", "users_ids", "expires_at"}
     )
     question_dict["team_lead_id"] = lead_id
-
-    # 2. Automatically determine the question type from content (returns numeric ID)
-    question_type_id = get_question_type_by_content(db, question_data.content)
     question_dict["question_type_id"] = question_type_id
+    question_dict["type_provisional"] = type_provisional
 
-    # 3. Create and add the question
+    # 2. Create and add the question
     question = models.Question(**question_dict)
     db.add(question)
     db.flush()  # flush to get the question ID before commit
 
-    # 4. Link teams if provided
+    # 3. Link teams if provided
     if question_data.teams_ids:
         teams = (
             db.query(models.Team)
@@ -56,7 +103,7 @@ def create_question(
 
         question.teams.extend(teams)
 
-    # 5. Token management
+    # 4. Token management
     token_expires_at = question_data.expires_at
     tokens = []
 
@@ -75,51 +122,64 @@ def create_question(
 
     # Individual tokens (one per user)
     elif question_data.token_type == "individual":
-        user_ids_set = set(question_data.users_ids or [])
-
-        # Include users from assigned teams
+        # Selected users plus members of the assigned teams; the team members
+        # come from a subquery, so large teams do not turn into huge IN lists
+        recipients = []
+        if question_data.users_ids:
+            recipients.append(models.User.id.in_(set(question_data.users_ids)))
         if question_data.teams_ids:
-            team_users = (
-                db.query(models.User.id)
-                .join(models.UserTeam, models.User.id == models.UserTeam.user_id)
-                .filter(models.UserTeam.team_id.in_(question_data.teams_ids))
-                .all()
-            )
-            team_user_ids = {u[0] for u in team_users}
-            user_ids_set.update(team_user_ids)
+            recipients.append(models.User.id.in_(
+                select(models.UserTeam.user_id).where(models.UserTeam.team_id.in_(question_data.teams_ids))
+            ))
 
-        # Retrieve all users to generate tokens for
+        # Only the columns needed for tokens and emails, in a stable order
         users = (
-            db.query(models.User)
-            .filter(models.User.id.in_(user_ids_set))
+            db.query(models.User.id, models.User.email)
+            .filter(or_(*recipients))
+            .order_by(models.User.id)
             .all()
-        )
-
-        for user in users:
-            token_value = secrets.token_urlsafe(16)
-            db.add(
-                models.Token(
-                    token_value=token_value,
-                    question_id=question.id,
-                    user_id=user.id,
-                    expires_at=token_expires_at,
-                    used=False,
-                )
-            )
-            tokens.append(token_value)
+        ) if recipients else []
 
-            # Send token email asynchronously
-            background_tasks.add_task(
-                send_token_email, user.email, token_value, question.content
-            )
+        tokens = issue_tokens(db, question.id, [user.id for user in users], token_expires_at)
 
-    # 6. Commit and refresh
-    db.commit()
-    db.refresh(question)
+        # Queued in this transaction; the email dispatcher sends them in batches
+        enqueue_emails(db, [
+            OutgoingEmail(user.email, *render_token_email(token_value, question.content))
+            for user, token_value in zip(users, tokens)
+        ], question_id=question.id)
 
     return question, tokens
 
 
+def issue_tokens(
+    db: Session,
+    question_id: int,
+    user_ids: list[int],
+    expires_at: datetime | None = None,
+) -> list[str]:
+    """
+    Create one individual token per user with a single bulk INSERT
+    (executemany, batched into multi-row VALUES by the driver) instead of one
+    ORM object per token. Returns the token values in the order of `user_ids`.
+    """
+    tokens = [secrets.token_urlsafe(16) for _ in user_ids]
+    if tokens:
+        db.execute(
+            insert(models.Token),
+            [
+                {
+                    "token_value": token_value,
+                    "question_id": question_id,
+                    "user_id": user_id,
+                    "expires_at": expires_at,
+                    "used": False,
+                }
+                for user_id, token_value in zip(user_ids, tokens)
+            ],
+        )
+    return tokens
+
+
 def get_questions_by_lead(db: Session, lead_id: int):
     """Return only questions created by the given team lead."""
     return db.query(models.Question).filter(models.Question.team_lead_id == lead_id).all()
@@ -0,0 +1,146 @@
+"""
+Minimal built-in schema migration runner.
+
+`Base.metadata.create_all` only creates missing tables, so changes to
+existing tables (such as new indexes) are shipped as numbered migrations.
+Each applied migration is recorded in the `schema_version` table; `init_db`
+runs the pending ones once at startup.
+
+Migrations must be idempotent: a fresh database gets the latest models from
+`create_all` and then has every migration applied on top.
+"""
+
+from dataclasses import dataclass
+from typing import Callable
+
+from sqlalchemy import Index, func, inspect, select, text
+from sqlalchemy.engine import Connection
+
+from src.db import models
+from src.db.models.analysis_job import ACTIVE_JOB_INDEX, MYSQL_ACTIVE_JOB_INDEX_DDL
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def _model_index(model, name: str) -> Index:
+    """Return the Index named `name` declared on a model's table."""
+    for index in model.__table__.indexes:
+        if index.name == name:
+            return index
+    raise LookupError(f"Index '{name}' is not declared on {model.__tablename__}")
+
+
+def _create_indexes(*targets: tuple) -> Callable[[Connection], None]:
+    """Build an upgrade step creating (model, index_name) pairs that do not exist yet."""
+    def upgrade(conn: Connection) -> None:
+        inspector = inspect(conn)
+        for model, name in targets:
+            existing = {ix["name"] for ix in inspector.get_indexes(model.__tablename__)}
+            if name not in existing:
+                _model_index(model, name).create(conn)
+    return upgrade
+
+
+def _add_columns(*targets: tuple) -> Callable[[Connection], None]:
+    """Build an upgrade step adding (model, column_name) pairs that do not exist yet."""
+    def upgrade(conn: Connection) -> None:
+        inspector = inspect(conn)
+        for model, name in targets:
+            table = model.__tablename__
+            existing = {col["name"] for col in inspector.get_columns(table)}
+            if name in existing:
+                continue
+            column = model.__table__.c[name]
+            preparer = conn.dialect.identifier_preparer
+            conn.execute(text(
+                f"ALTER TABLE {preparer.quote(table)} ADD COLUMN {preparer.quote(name)} "
+                f"{column.type.compile(dialect=conn.dialect)}"
+            ))
+    return upgrade
+
+
+def _create_active_job_index(conn: Connection) -> None:
+    """
+    One pending/running analysis job per question. Extra active jobs queued
+    before the index existed are failed first (the oldest one is kept).
+    """
+    existing = {ix["name"] for ix in inspect(conn).get_indexes(models.AnalysisJob.__tablename__)}
+    if ACTIVE_JOB_INDEX in existing:
+        return
+
+    job = models.AnalysisJob.__table__
+    active = job.c.status.in_(("pending", "running"))
+    # Wrapped in a derived table: MySQL cannot select from the table it updates
+    keep = select(func.min(job.c.id).label("id")).where(active).group_by(job.c.question_id).subquery()
+    conn.execute(
+        job.update()
+        .where(active, job.c.id.not_in(select(keep.c.id)))
+        .values(status="failed", error="Duplicate of another queued job.")
+    )
+
+    if conn.dialect.name == "mysql":
+        conn.execute(MYSQL_ACTIVE_JOB_INDEX_DDL)
+    elif conn.dialect.name in ("postgresql", "sqlite"):
+        _model_index(models.AnalysisJob, ACTIVE_JOB_INDEX).create(conn)
+
+
+# ---------------------------------------------------------------------
+# Migration list — append only, never renumber
+# ---------------------------------------------------------------------
+MIGRATIONS: list[Migration] = [
+    Migration(1, "baseline schema and question type seed", lambda conn: None),
+    Migration(
+        2,
+        "indexes on hot lookup columns",
+        _create_indexes(
+            (models.Answer, "ix_answer_question_id_created_at"),
+            (models.Token, "ix_token_question_id"),
+            (models.Question, "ix_question_team_lead_id"),
+            (models.Team, "ix_team_team_lead_id"),
+            (models.UserTeam, "ix_user_team_team_id"),
+            (models.StanceAnalysis, "ix_stance_analysis_question_id"),
+            (models.OptionComparison, "ix_option_comparison_question_id"),
+            (models.IdeaGeneration, "ix_idea_generation_question_id"),
+            (models.PriorityRanking, "ix_priority_ranking_question_id"),
+            (models.FeedbackAnalysis, "ix_feedback_analysis_question_id"),
+        ),
+    ),
+    Migration(
+        3,
+        "per-opinion intermediates for incremental re-analysis",
+        _add_columns(
+            (models.StanceAnalysis, "classifications"),
+            (models.OptionComparison, "mapping"),
+            (models.PriorityRanking, "parsed_opinions"),
+        ),
+    ),
+    Migration(4, "per-job latency and token trace", _add_columns((models.AnalysisJob, "trace"))),
+    Migration(5, "provisional question types", _add_columns((models.Question, "type_provisional"))),
+    # New table: created (with its indexes) by create_all before migrations run
+    Migration(6, "token email outbox", lambda conn: None),
+    Migration(7, "one active analysis job per question", _create_active_job_index),
+    Migration(8, "backoff between analysis job attempts", _add_columns((models.AnalysisJob, "next_attempt_at"))),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def run_migrations(engine, current_version: int) -> list[int]:
+    """Apply every migration newer than `current_version`; returns the versions applied."""
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version <= current_version:
+            continue
+        with engine.begin() as conn:
+            migration.upgrade(conn)
+            conn.execute(
+                models.SchemaVersion.__table__.insert().values(version=migration.version)
+            )
+        print(f"✅ Applied migration {migration.version}: {migration.description}")
+        applied.append(migration.version)
+    return applied
@@ -1,3 +1,7 @@
 from src.db.models.core import User, TeamLead, Team, UserTeam
 from src.db.models.question import QuestionType, Question, Answer, Token, TeamQuestion
 from src.db.models.ai_analysis import *
+from src.db.models.llm_cache import LLMCacheEntry
+from src.db.models.analysis_job import AnalysisJob
+from src.db.models.email_outbox import EmailOutbox
+from src.db.models.schema_version import SchemaVersion
@@ -4,11 +4,13 @@ from src.db.base import Base, BaseMixin
 
 class StanceAnalysis(Base, BaseMixin):
     __tablename__ = "stance_analysis"
-    question_id: Mapped[int] = mapped_column(ForeignKey("question.id"), nullable=False)
+    question_id: Mapped[int] = mapped_column(ForeignKey("question.id"), nullable=False, index=True)
     topic: Mapped[str] = mapped_column(Text)
     distribution: Mapped[dict] = mapped_column(JSON)
     total_responses: Mapped[int] = mapped_column(Integer)
     themes: Mapped[dict | None] = mapped_column(JSON)
+    # Per-opinion classification, kept so re-analysis only classifies new answers
+    classifications: Mapped[list | None] = mapped_column(JSON)
     summary: Mapped[str | None] = mapped_column(Text)
     recommendation: Mapped[str | None] = mapped_column(Text)
     ai_thought: Mapped[str | None] = mapped_column(Text)
@@ -17,10 +19,12 @@ class StanceAnalysis(Base, BaseMixin):
 
 class OptionComparison(Base, BaseMixin):
     __tablename__ = "option_comparison"
-    question_id: Mapped[int] = mapped_column(ForeignKey("question.id"), nullable=False)
+    question_id: Mapped[int] = mapped_column(ForeignKey("question.id"), nullable=False, index=True)
     topic: Mapped[str] = mapped_column(Text)
     distribution_and_options: Mapped[dict] = mapped_column(JSON)
     reasons: Mapped[dict | None] = mapped_column(JSON)
+    # Preferred option per opinion, kept so re-analysis only maps new answers
+    mapping: Mapped[list | None] = mapped_column(JSON)
     summary: Mapped[str | None] = mapped_column(Text)
     recommendation: Mapped[str | None] = mapped_column(Text)
     ai_thought: Mapped[str | None] = mapped_column(Text)
@@ -29,7 +33,7 @@ class OptionComparison(Base, BaseMixin):
 
 class IdeaGeneration(Base, BaseMixin):
     __tablename__ = "idea_generation"
-    question_id: Mapped[int] = mapped_column(ForeignKey("question.id"), nullable=False)
+    question_id: Mapped[int] = mapped_column(ForeignKey("question.id"), nullable=False, index=True)
     topic: Mapped[str] = mapped_column(Text)
     themes: Mapped[dict | None] = mapped_column(JSON)
     summary: Mapped[str | None] = mapped_column(Text)
@@ -40,10 +44,12 @@ class IdeaGeneration(Base, BaseMixin):
 
 class PriorityRanking(Base, BaseMixin):
     __tablename__ = "priority_ranking"
-    question_id: Mapped[int] = mapped_column(ForeignKey("question.id"), nullable=False)
+    question_id: Mapped[int] = mapped_column(ForeignKey("question.id"), nullable=False, index=True)
     topic: Mapped[str] = mapped_column(Text)
     options_and_means: Mapped[dict] = mapped_column(JSON)
     top_reasons: Mapped[dict | None] = mapped_column(JSON)
+    # Ranking per opinion, kept so re-analysis only parses new answers
+    parsed_opinions: Mapped[list | None] = mapped_column(JSON)
     summary: Mapped[str | None] = mapped_column(Text)
     recommendation: Mapped[str | None] = mapped_column(Text)
     ai_thought: Mapped[str | None] = mapped_column(Text)
@@ -52,7 +58,7 @@ class PriorityRanking(Base, BaseMixin):
 
 class FeedbackAnalysis(Base, BaseMixin):
     __tablename__ = "feedback_analysis"
-    question_id: Mapped[int] = mapped_column(ForeignKey("question.id"), nullable=False)
+    question_id: Mapped[int] = mapped_column(ForeignKey("question.id"), nullable=False, index=True)
     topic: Mapped[str] = mapped_column(Text)
     sentiment: Mapped[int] = mapped_column(Integer)
     positive_themes: Mapped[dict | None] = mapped_column(JSON)
@@ -0,0 +1,53 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, JSON, DDL, Index, event, func, text
+from sqlalchemy.orm import relationship
+from src.db.base import Base
+
+# At most one pending/running job per question, enforced by the database so
+# that concurrent POST/PUT requests cannot queue the same analysis twice
+ACTIVE_JOB_INDEX = "ix_analysis_job_active_question_id"
+_ACTIVE = "status IN ('pending', 'running')"
+# MySQL has no partial indexes: a functional unique index over an expression
+# that is NULL for finished jobs (NULLs never collide) does the same (8.0.13+)
+MYSQL_ACTIVE_JOB_INDEX_DDL = DDL(
+    f"CREATE UNIQUE INDEX {ACTIVE_JOB_INDEX} ON analysis_job "
+    f"((CASE WHEN {_ACTIVE} THEN question_id END))"
+)
+
+
+# ---------------------------------------------------------------------
+# AnalysisJob
+# ---------------------------------------------------------------------
+class AnalysisJob(Base):
+    """A queued AI analysis run for a question (pending → running → ready/failed)."""
+    __tablename__ = "analysis_job"
+    __table_args__ = (
+        Index(
+            ACTIVE_JOB_INDEX,
+            "question_id",
+            unique=True,
+            postgresql_where=text(_ACTIVE),
+            sqlite_where=text(_ACTIVE),
+        ).ddl_if(dialect=("postgresql", "sqlite")),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    question_id = Column(Integer, ForeignKey("question.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = Column(String(20), nullable=False, default="pending", index=True)
+    replace_existing = Column(Boolean, nullable=False, default=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    report_id = Column(String(36), nullable=True)
+    error = Column(Text, nullable=True)
+    # A retried job is not claimed before this time (backoff after a failure)
+    next_attempt_at = Column(DateTime, nullable=True)
+    # Where the run's time and tokens went (src.telemetry.Trace.summary)
+    trace = Column(JSON, nullable=True)
+
+    created_at = Column(DateTime, server_default=func.now())
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    question = relationship("Question", back_populates="analysis_jobs")
+
+
+event.listen(AnalysisJob.__table__, "after_create", MYSQL_ACTIVE_JOB_INDEX_DDL.execute_if(dialect="mysql"))
@@ -57,7 +57,7 @@ class Team(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String(100), nullable=False)
-    team_lead_id = Column(Integer, ForeignKey("team_lead.id"), nullable=False)
+    team_lead_id = Column(Integer, ForeignKey("team_lead.id"), nullable=False, index=True)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
@@ -88,7 +88,8 @@ class UserTeam(Base):
     __tablename__ = "user_team"
 
     user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
-    team_id = Column(Integer, ForeignKey("team.id"), primary_key=True)
+    # The composite PK leads with user_id, so team_id needs its own index
+    team_id = Column(Integer, ForeignKey("team.id"), primary_key=True, index=True)
 
     # Relationships to both sides
     user = relationship("User", back_populates="team_links")
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, func
+from src.db.base import Base
+
+
+# ---------------------------------------------------------------------
+# EmailOutbox
+# ---------------------------------------------------------------------
+class EmailOutbox(Base):
+    """An email waiting to be sent by the dispatch workers (pending → sending → sent/failed)."""
+    __tablename__ = "email_outbox"
+    # The dispatcher's claim query: due pending messages, oldest first
+    __table_args__ = (Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    question_id = Column(Integer, ForeignKey("question.id", ondelete="CASCADE"), nullable=True, index=True)
+    recipient = Column(String(255), nullable=False)
+    subject = Column(String(255), nullable=False)
+    html = Column(Text, nullable=False)
+
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    # Not before this time (retry backoff); NULL = as soon as possible
+    next_attempt_at = Column(DateTime, nullable=True)
+    # Identifies the batch a worker claimed
+    claim_id = Column(String(32), nullable=True, index=True)
+    claimed_at = Column(DateTime, nullable=True)
+    provider_id = Column(String(255), nullable=True)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, server_default=func.now())
+    sent_at = Column(DateTime, nullable=True)
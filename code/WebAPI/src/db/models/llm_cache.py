@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, Text, DateTime, func
+from src.db.base import Base
+
+
+# ---------------------------------------------------------------------
+# LLM response cache (persistent tier)
+# ---------------------------------------------------------------------
+class LLMCacheEntry(Base):
+    """Raw Mistral response keyed by a hash of the request."""
+    __tablename__ = "llm_cache"
+
+    key = Column(String(64), primary_key=True)
+    model = Column(String(100), nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, server_default=func.now(), index=True)
+    expires_at = Column(DateTime, nullable=False)
@@ -1,5 +1,5 @@
 from sqlalchemy import (
-    Column, Integer, String, Text, DateTime, ForeignKey, Boolean, func
+    Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index, func
 )
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.orm import relationship
@@ -30,8 +30,10 @@ class Question(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     content = Column(Text, nullable=False)
-    team_lead_id = Column(Integer, ForeignKey("team_lead.id"), nullable=False)
+    team_lead_id = Column(Integer, ForeignKey("team_lead.id"), nullable=False, index=True)
     question_type_id = Column(Integer, ForeignKey("question_type.id"), nullable=False)
+    # True while question_type_id is a local guess awaiting background classification
+    type_provisional = Column(Boolean, nullable=True, default=False)
     report_id = Column(String(36), nullable=True)
 
     created_at = Column(DateTime, server_default=func.now())
@@ -62,12 +64,17 @@ class Question(Base):
     priority_ranking = relationship("PriorityRanking", back_populates="question", cascade="all, delete-orphan")
     feedback_analysis = relationship("FeedbackAnalysis", back_populates="question", cascade="all, delete-orphan")
 
+    # --- Background analysis jobs ---
+    analysis_jobs = relationship("AnalysisJob", back_populates="question", cascade="all, delete-orphan")
+
 
 # ---------------------------------------------------------------------
 # Answer
 # ---------------------------------------------------------------------
 class Answer(Base):
     __tablename__ = "answer"
+    # Covers lookups by question_id alone as well as ordered/date-filtered ones
+    __table_args__ = (Index("ix_answer_question_id_created_at", "question_id", "created_at"),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     content = Column(Text, nullable=False)
@@ -86,7 +93,7 @@ class Token(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     token_value = Column(String(255), nullable=False, unique=True)
-    question_id = Column(Integer, ForeignKey("question.id"), nullable=False)
+    question_id = Column(Integer, ForeignKey("question.id"), nullable=False, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     expires_at = Column(DateTime, nullable=True)
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, DateTime, func
+from src.db.base import Base
+
+
+# ---------------------------------------------------------------------
+# SchemaVersion
+# ---------------------------------------------------------------------
+class SchemaVersion(Base):
+    """Marker row recording which schema/seed version the database is at."""
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True)
+    applied_at = Column(DateTime, server_default=func.now())
@@ -1,15 +1,19 @@
 import json
 from pathlib import Path
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, func
 from sqlalchemy.orm import sessionmaker
 from src.config import DATABASE_URL
+from src.telemetry import instrument_engine
 from .base import Base
-from .models import QuestionType
+from .models import QuestionType, SchemaVersion
+from .migrations import run_migrations, LATEST_VERSION
 
 # ---------------------------------------------------------------------
 # SQLAlchemy setup
 # ---------------------------------------------------------------------
 engine = create_engine(DATABASE_URL, echo=False, future=True)
+# Per-statement latency for GET /metrics and analysis traces
+instrument_engine(engine)
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
@@ -17,34 +21,49 @@ SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 # ---------------------------------------------------------------------
 # Database initialization
 # ---------------------------------------------------------------------
-def init_db() -> None:
-    """Create database tables if they do not exist and seed initial data."""
-    Base.metadata.create_all(engine)
+# Highest migration version; add a migration in migrations.py to bump it
+SCHEMA_VERSION = LATEST_VERSION
 
-    session = SessionLocal()
+_initialized = False
 
-    try:
-        # Locate the JSON seed file
-        json_path = Path(__file__).parent / "question_type.json"
 
-        if not json_path.exists():
-            print("⚠️  question_type.json not found — skipping default seeding.")
-            return
+def _current_schema_version() -> int:
+    """Return the highest recorded schema version (0 for a fresh database)."""
+    if not inspect(engine).has_table(SchemaVersion.__tablename__):
+        return 0
+    with SessionLocal() as session:
+        return session.query(func.max(SchemaVersion.version)).scalar() or 0
+
 
-        with open(json_path, "r", encoding="utf-8") as f:
-            question_types = json.load(f)
+def _seed_question_types(session) -> int:
+    """Insert missing default question types; returns how many were added."""
+    json_path = Path(__file__).parent / "question_type.json"
 
-        inserted = 0
-        for q in question_types:
-            # Check if the type already exists
-            existing = session.query(QuestionType).filter_by(type=q["type"]).first()
-            if not existing:
-                new_q = QuestionType(id=q["id"], type=q["type"])
-                session.add(new_q)
-                inserted += 1
+    if not json_path.exists():
+        print("⚠️  question_type.json not found — skipping default seeding.")
+        return 0
+
+    with open(json_path, "r", encoding="utf-8") as f:
+        question_types = json.load(f)
+
+    # One query for all existing types instead of one per seed entry
+    existing = {t for (t,) in session.query(QuestionType.type).all()}
+    missing = [q for q in question_types if q["type"] not in existing]
+    session.add_all(QuestionType(id=q["id"], type=q["type"]) for q in missing)
+    return len(missing)
+
+
+def create_schema_and_seed(current_version: int = 0) -> None:
+    """Create missing tables, apply pending migrations and seed default data."""
+    Base.metadata.create_all(engine)
+    run_migrations(engine, current_version)
+
+    session = SessionLocal()
+    try:
+        inserted = _seed_question_types(session)
+        session.commit()
 
         if inserted:
-            session.commit()
             print(f"✅ Added {inserted} new question types.")
         else:
             print("ℹ️  All default question types already exist. No changes made.")
@@ -52,10 +71,30 @@ def init_db() -> None:
     except Exception as e:
         session.rollback()
         print(f"❌ Error during database initialization: {e}")
+        raise
     finally:
         session.close()
 
 
+def init_db() -> None:
+    """
+    One-time, idempotent startup initialization.
+
+    Runs DDL and seeding only when the database is behind SCHEMA_VERSION;
+    afterwards (and on every later call in this process) it is a no-op.
+    Call it at startup, never from request handlers.
+    """
+    global _initialized
+    if _initialized:
+        return
+
+    current_version = _current_schema_version()
+    if current_version < SCHEMA_VERSION:
+        create_schema_and_seed(current_version)
+
+    _initialized = True
+
+
 # ---------------------------------------------------------------------
 # Dependency for getting a DB session
 # ---------------------------------------------------------------------
@@ -0,0 +1,393 @@
+"""
+Database-backed queue for AI analysis jobs.
+
+`POST`/`PUT /analyze/{question_id}` only insert an `AnalysisJob` row; a pool
+of worker tasks started with the application claims pending rows and runs
+the pipeline. Because the queue lives in the app database, queued work
+survives restarts and several API processes can share it without a broker:
+a job is claimed with a conditional UPDATE, so only one worker wins it.
+
+Job lifecycle: pending → running → ready | failed.
+A job failing transiently goes back to `pending` with exponential backoff
+(`next_attempt_at`) until ANALYSIS_MAX_ATTEMPTS is reached; jobs left
+`running` longer than ANALYSIS_JOB_TIMEOUT (e.g. after a crash) are put
+back to `pending` right away, within the same limit.
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from src import telemetry
+from src.ai import progress
+from src.analyzer import build_report, MODEL_MAP
+from src.config import (
+    ANALYSIS_WORKERS,
+    ANALYSIS_POLL_INTERVAL,
+    ANALYSIS_JOB_TIMEOUT,
+    ANALYSIS_MAX_ATTEMPTS,
+    ANALYSIS_BACKOFF_BASE,
+    ANALYSIS_BACKOFF_MAX,
+    ANALYSIS_STORE_TRACE,
+    ANALYSIS_TRACE_MAX_SPANS,
+)
+from src.db.session import SessionLocal
+from src.db.models import AnalysisJob, Answer, Question
+from src.utils.question_type import confirm_question_types
+
+ACTIVE_STATUSES = ("pending", "running")
+
+# Seconds between sweeps for jobs orphaned in `running`
+_REAP_INTERVAL = 60
+
+
+# ---------------------------------------------------------------------
+# Queue API (used by the routers)
+# ---------------------------------------------------------------------
+def get_active_job(db: Session, question_id: int) -> AnalysisJob | None:
+    """Return the pending/running job for a question, if any."""
+    return (
+        db.query(AnalysisJob)
+        .filter(AnalysisJob.question_id == question_id, AnalysisJob.status.in_(ACTIVE_STATUSES))
+        .order_by(AnalysisJob.id.desc())
+        .first()
+    )
+
+
+def get_latest_job(db: Session, question_id: int) -> AnalysisJob | None:
+    """Return the most recently queued job for a question, if any."""
+    return (
+        db.query(AnalysisJob)
+        .filter(AnalysisJob.question_id == question_id)
+        .order_by(AnalysisJob.id.desc())
+        .first()
+    )
+
+
+def enqueue_analysis(db: Session, question_id: int, replace_existing: bool = False) -> AnalysisJob:
+    """
+    Queue an analysis for a question and wake the local workers.
+    If a job is already pending or running for it, that job is returned instead.
+    """
+    job = get_active_job(db, question_id)
+    if job:
+        return job
+
+    job = AnalysisJob(question_id=question_id, status="pending", replace_existing=replace_existing)
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent request queued one first (one active job per question, see migration 7)
+        db.rollback()
+        job = get_active_job(db, question_id)
+        if job:
+            return job
+        raise
+    db.refresh(job)
+
+    analysis_workers.notify()
+    return job
+
+
+# ---------------------------------------------------------------------
+# Job state transitions (blocking DB calls, run via asyncio.to_thread)
+# ---------------------------------------------------------------------
+def _backoff(attempts: int) -> float:
+    """Delay before the next attempt of a job that failed `attempts` times."""
+    return min(ANALYSIS_BACKOFF_MAX, ANALYSIS_BACKOFF_BASE * 2 ** max(attempts - 1, 0)) * random.uniform(0.5, 1.0)
+
+
+def _claim_next_job() -> int | None:
+    """Atomically move the oldest due pending job to `running` and return its id."""
+    session = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        candidates = (
+            session.query(AnalysisJob.id)
+            .filter(
+                AnalysisJob.status == "pending",
+                or_(AnalysisJob.next_attempt_at.is_(None), AnalysisJob.next_attempt_at <= now),
+            )
+            .order_by(AnalysisJob.id.asc())
+            .limit(5)
+            .all()
+        )
+        for (job_id,) in candidates:
+            claimed = session.execute(
+                update(AnalysisJob)
+                .where(AnalysisJob.id == job_id, AnalysisJob.status == "pending")
+                .values(
+                    status="running",
+                    started_at=now,
+                    attempts=AnalysisJob.attempts + 1,
+                )
+            )
+            session.commit()
+            if claimed.rowcount == 1:
+                return job_id
+        return None
+    finally:
+        session.close()
+
+
+def _requeue_stale_jobs() -> None:
+    """Return jobs stuck in `running` to the queue, or fail them after too many attempts."""
+    session = SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - timedelta(seconds=ANALYSIS_JOB_TIMEOUT)
+        stale = (AnalysisJob.status == "running", AnalysisJob.started_at < cutoff)
+
+        session.execute(
+            update(AnalysisJob)
+            .where(*stale, AnalysisJob.attempts >= ANALYSIS_MAX_ATTEMPTS)
+            .values(status="failed", error="Job timed out.", finished_at=datetime.utcnow())
+        )
+        session.execute(
+            update(AnalysisJob)
+            .where(*stale, AnalysisJob.attempts < ANALYSIS_MAX_ATTEMPTS)
+            .values(status="pending", started_at=None, next_attempt_at=None)
+        )
+        session.commit()
+    finally:
+        session.close()
+
+
+def _fail_job(job_id: int, error: str, retryable: bool) -> None:
+    session = SessionLocal()
+    try:
+        job = session.get(AnalysisJob, job_id)
+        if not job:
+            return
+        if retryable and job.attempts < ANALYSIS_MAX_ATTEMPTS:
+            job.status = "pending"
+            job.started_at = None
+            job.next_attempt_at = datetime.utcnow() + timedelta(seconds=_backoff(job.attempts))
+        else:
+            job.status = "failed"
+            job.finished_at = datetime.utcnow()
+        job.error = error
+        session.commit()
+    finally:
+        session.close()
+
+
+@dataclass(frozen=True)
+class _JobInput:
+    """What a claimed job analyzes, loaded before the pipeline runs."""
+    job_id: int
+    question_id: int
+    question_type: str
+    topic: str
+    opinions: list[str]
+    replace_existing: bool
+    # Report being replaced (detached), which the analysis may resume from
+    previous_report: object | None
+
+
+def _load_job(job_id: int) -> _JobInput | None:
+    """
+    Load the question, its answers and the report being replaced for a claimed
+    job. Returns None when the job is already done (its question has a report).
+    """
+    session = SessionLocal()
+    try:
+        job = session.get(AnalysisJob, job_id)
+        question = session.get(Question, job.question_id) if job else None
+        if not question:
+            raise ValueError("Question not found.")
+        if question.report_id and not job.replace_existing:
+            # A report was stored since this job was queued: keep it instead of analyzing again
+            _finish_job(job, question.report_id, None)
+            session.commit()
+            return None
+        if question.type_provisional:
+            # Created without waiting for the classifier; the type must be final before analysis
+            confirm_question_types([question.id])
+            session.refresh(question)
+            if question.type_provisional:
+                raise RuntimeError("Question type is still provisional (classification failed).")
+        if not question.question_type or not question.question_type.type:
+            raise ValueError("Question type not defined.")
+        question_type = question.question_type.type
+
+        # Stable order, so a re-run sees earlier answers as a prefix of the new list
+        opinions = [
+            content
+            for (content,) in session.query(Answer.content)
+            .filter(Answer.question_id == question.id)
+            .order_by(Answer.created_at, Answer.id)
+        ]
+        if not opinions:
+            raise ValueError("No opinions/answers found for this question.")
+
+        # The report being replaced, if any, lets the analysis resume its work
+        previous_report = None
+        if question.report_id and job.replace_existing:
+            model_class = MODEL_MAP.get(question_type)
+            previous_report = session.get(model_class, question.report_id) if model_class else None
+
+        return _JobInput(
+            job_id=job.id,
+            question_id=question.id,
+            question_type=question_type,
+            topic=question.content,
+            opinions=opinions,
+            replace_existing=job.replace_existing,
+            previous_report=previous_report,
+        )
+    finally:
+        session.close()
+
+
+def _finish_job(job: AnalysisJob, report_id: str, trace: dict | None) -> None:
+    job.status = "ready"
+    job.report_id = report_id
+    job.error = None
+    job.finished_at = datetime.utcnow()
+    job.trace = trace
+
+
+def _store_report(task: _JobInput, record, trace: dict | None) -> None:
+    """
+    Save the new report, point the question at it and finish the job, in one
+    commit. A re-analysis deletes the report it replaces (and any report
+    stored meanwhile); a first analysis keeps a report stored meanwhile and
+    discards its own, so no report row is ever left orphaned.
+    """
+    session = SessionLocal()
+    try:
+        job = session.get(AnalysisJob, task.job_id)
+        question = session.get(Question, task.question_id)
+        if not job or not question:
+            raise ValueError("Question not found.")
+
+        if question.report_id and not task.replace_existing:
+            _finish_job(job, question.report_id, trace)
+            session.commit()
+            return
+
+        replaced = {question.report_id} if question.report_id else set()
+        if task.previous_report is not None:
+            replaced.add(task.previous_report.id)
+
+        session.add(record)
+        session.flush()
+        question.report_id = record.id
+        model_class = MODEL_MAP.get(task.question_type)
+        for report_id in replaced - {record.id}:
+            old_report = session.get(model_class, report_id) if model_class else None
+            if old_report:
+                session.delete(old_report)
+
+        _finish_job(job, record.id, trace)
+        session.commit()
+    finally:
+        session.close()
+
+
+async def _run_job(job_id: int) -> None:
+    """
+    Run the analysis for one claimed job and record its outcome. Loading and
+    storing are blocking DB work and run in threads, each with its own
+    session; only the pipeline (awaiting Mistral) runs on the event loop.
+    """
+    reporting = None
+    try:
+        task = await asyncio.to_thread(_load_job, job_id)
+        if task is None:
+            return
+        # Live progress for GET /analyze/stream/{question_id}
+        reporting = (task.question_id, progress.begin(task.question_id, job_id))
+
+        # Spans of the run (steps, Mistral calls, queries), see src.telemetry
+        with telemetry.trace("analysis", task.question_type, ANALYSIS_TRACE_MAX_SPANS) as trace:
+            record = await build_report(
+                task.question_type, task.topic, task.opinions, task.question_id, task.previous_report
+            )
+
+        await asyncio.to_thread(_store_report, task, record, trace.summary() if ANALYSIS_STORE_TRACE else None)
+
+    except ValueError as exc:
+        await asyncio.to_thread(_fail_job, job_id, f"Invalid analysis parameters: {exc}", False)
+    except Exception as exc:
+        await asyncio.to_thread(_fail_job, job_id, f"Analysis failed: {exc}", True)
+    finally:
+        if reporting:
+            # After the outcome is committed, so stream clients read the final state
+            progress.end(*reporting)
+
+
+# ---------------------------------------------------------------------
+# Worker pool
+# ---------------------------------------------------------------------
+class AnalysisWorkerPool:
+    """
+    Asyncio worker tasks that drain the analysis queue.
+
+    Workers run on the application event loop: the pipelines are async, so a
+    job only occupies a worker slot while it awaits Mistral, not a thread.
+    Their database work (claiming, loading, storing) runs in threads, so it
+    never blocks requests or the other workers.
+    """
+
+    def __init__(self, workers: int, poll_interval: float):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._last_reap = 0.0
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        await asyncio.to_thread(_requeue_stale_jobs)
+        self._last_reap = time.monotonic()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake idle workers (called after a job is enqueued in this process, from any thread)."""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                if time.monotonic() - self._last_reap > _REAP_INTERVAL:
+                    self._last_reap = time.monotonic()
+                    await asyncio.to_thread(_requeue_stale_jobs)
+
+                job_id = await asyncio.to_thread(_claim_next_job)
+                if job_id is not None:
+                    await _run_job(job_id)
+                    continue
+
+                # Idle: sleep until notified or the next poll
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Analysis worker error: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+
+analysis_workers = AnalysisWorkerPool(ANALYSIS_WORKERS, ANALYSIS_POLL_INTERVAL)
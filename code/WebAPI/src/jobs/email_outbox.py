@@ -0,0 +1,314 @@
+"""
+Database-backed outbox for token emails.
+
+`create_question` inserts one `EmailOutbox` row per recipient in the same
+transaction as the tokens, so an email is queued exactly when its token is
+created, and queued mail survives restarts. Dispatch workers started with
+the application claim due rows in batches and send each batch in a single
+provider request (see src.utils.email for the transports). A batch is
+claimed with a conditional UPDATE that tags the rows with a claim id, so
+several API processes can share the outbox.
+
+Delivery rules:
+- provider requests go through a token bucket shared by the workers of the
+  process (EMAIL_RATE_LIMIT requests per second);
+- when a request fails transiently, its batch goes back to `pending` with
+  exponential backoff, or the provider's Retry-After when that is longer;
+- a rate-limited response (429) pauses all workers of the process for the
+  provider's Retry-After and puts the batch back without using an attempt;
+- messages rejected one by one (e.g. an invalid address) fail alone;
+- after EMAIL_MAX_ATTEMPTS a message is `failed`, with the last error kept.
+Batches left `sending` longer than EMAIL_SEND_TIMEOUT (a crash mid-send)
+are retried, so delivery is at least once.
+
+Message lifecycle: pending → sending → sent | failed.
+"""
+
+import asyncio
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, or_, update
+from sqlalchemy.orm import Session
+
+from src import telemetry
+from src.ai.resilience import TokenBucket
+from src.config import (
+    EMAIL_TRANSPORT,
+    EMAIL_BATCH_SIZE,
+    EMAIL_WORKERS,
+    EMAIL_POLL_INTERVAL,
+    EMAIL_RATE_LIMIT,
+    EMAIL_RATE_BURST,
+    EMAIL_MAX_ATTEMPTS,
+    EMAIL_BACKOFF_BASE,
+    EMAIL_BACKOFF_MAX,
+    EMAIL_SEND_TIMEOUT,
+)
+from src.db.session import SessionLocal
+from src.db.models import EmailOutbox
+from src.utils.email import (
+    OutgoingEmail, Delivery, send_batch, max_batch_size, is_retryable, is_rate_limited, retry_after,
+)
+
+# Seconds between sweeps for batches orphaned in `sending`
+_REAP_INTERVAL = 60
+
+
+# ---------------------------------------------------------------------
+# Queue API
+# ---------------------------------------------------------------------
+def enqueue_emails(db: Session, messages: list[OutgoingEmail], question_id: int | None = None) -> None:
+    """
+    Queue messages with one bulk INSERT in the caller's transaction (no commit).
+    Call `email_dispatcher.notify()` after committing to wake the local workers.
+    """
+    if not messages:
+        return
+    db.execute(
+        insert(EmailOutbox),
+        [
+            {
+                "question_id": question_id,
+                "recipient": m.recipient,
+                "subject": m.subject,
+                "html": m.html,
+                "status": "pending",
+                "attempts": 0,
+            }
+            for m in messages
+        ],
+    )
+
+
+# ---------------------------------------------------------------------
+# Message state transitions (blocking DB calls, run via asyncio.to_thread)
+# ---------------------------------------------------------------------
+def _backoff(attempts: int, exc: BaseException | None = None) -> float:
+    """Delay before the next attempt of a message that failed `attempts` times."""
+    delay = min(EMAIL_BACKOFF_MAX, EMAIL_BACKOFF_BASE * 2 ** max(attempts - 1, 0)) * random.uniform(0.5, 1.0)
+    hinted = retry_after(exc) if exc is not None else None
+    return max(delay, min(hinted, EMAIL_BACKOFF_MAX)) if hinted is not None else delay
+
+
+def _claim_batch(size: int) -> list:
+    """Move up to `size` due pending messages to `sending`; returns the claimed rows."""
+    session = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        ids = [
+            message_id
+            for (message_id,) in session.query(EmailOutbox.id)
+            .filter(
+                EmailOutbox.status == "pending",
+                or_(EmailOutbox.next_attempt_at.is_(None), EmailOutbox.next_attempt_at <= now),
+            )
+            .order_by(EmailOutbox.id.asc())
+            .limit(size)
+        ]
+        if not ids:
+            return []
+
+        claim_id = uuid.uuid4().hex
+        session.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(ids), EmailOutbox.status == "pending")
+            .values(status="sending", claim_id=claim_id, claimed_at=now, attempts=EmailOutbox.attempts + 1)
+        )
+        session.commit()
+        # Rows another worker claimed in between are simply not ours
+        return (
+            session.query(
+                EmailOutbox.id, EmailOutbox.recipient, EmailOutbox.subject, EmailOutbox.html, EmailOutbox.attempts
+            )
+            .filter(EmailOutbox.claim_id == claim_id)
+            .order_by(EmailOutbox.id.asc())
+            .all()
+        )
+    finally:
+        session.close()
+
+
+def _retry_or_fail(row, error: str, retryable: bool, delay: float | None = None) -> dict:
+    """Update values putting a message back to `pending` (with backoff) or failing it."""
+    if retryable and row.attempts < EMAIL_MAX_ATTEMPTS:
+        delay = delay if delay is not None else _backoff(row.attempts)
+        return {
+            "id": row.id,
+            "status": "pending",
+            "error": error,
+            "next_attempt_at": datetime.utcnow() + timedelta(seconds=delay),
+        }
+    return {"id": row.id, "status": "failed", "error": error}
+
+
+def _postpone(row, error: str, delay: float) -> dict:
+    """Update values putting a message back to `pending` without counting the attempt."""
+    return {
+        "id": row.id,
+        "status": "pending",
+        "attempts": row.attempts - 1,
+        "error": error,
+        "next_attempt_at": datetime.utcnow() + timedelta(seconds=delay),
+    }
+
+
+def _record_outcomes(updates: list[dict]) -> dict[str, int]:
+    """Apply per-message updates (bulk UPDATE by primary key); returns counts per new status."""
+    session = SessionLocal()
+    try:
+        session.execute(update(EmailOutbox), updates)
+        session.commit()
+    finally:
+        session.close()
+
+    counts: dict[str, int] = {}
+    for values in updates:
+        status = "retry" if values["status"] == "pending" else values["status"]
+        counts[status] = counts.get(status, 0) + 1
+    for status, count in counts.items():
+        telemetry.metrics.inc("insintesi_emails_total", {"transport": EMAIL_TRANSPORT, "status": status}, count)
+    return counts
+
+
+def _record_deliveries(rows: list, deliveries: list[Delivery]) -> dict[str, int]:
+    now = datetime.utcnow()
+    updates = []
+    for row, delivery in zip(rows, deliveries):
+        if delivery.error is None:
+            updates.append({"id": row.id, "status": "sent", "provider_id": delivery.provider_id, "sent_at": now, "error": None})
+        else:
+            updates.append(_retry_or_fail(row, delivery.error, delivery.retryable))
+    # A transport answering for fewer messages than it was given: retry the rest
+    updates += [_retry_or_fail(row, "No delivery result.", True) for row in rows[len(deliveries):]]
+    return _record_outcomes(updates)
+
+
+def _requeue_stale_batches() -> None:
+    """Return messages stuck in `sending` to the queue, or fail them after too many attempts."""
+    session = SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - timedelta(seconds=EMAIL_SEND_TIMEOUT)
+        stale = (EmailOutbox.status == "sending", EmailOutbox.claimed_at < cutoff)
+
+        session.execute(
+            update(EmailOutbox)
+            .where(*stale, EmailOutbox.attempts >= EMAIL_MAX_ATTEMPTS)
+            .values(status="failed", error="Send timed out.")
+        )
+        session.execute(
+            update(EmailOutbox)
+            .where(*stale, EmailOutbox.attempts < EMAIL_MAX_ATTEMPTS)
+            .values(status="pending", claim_id=None, next_attempt_at=None)
+        )
+        session.commit()
+    finally:
+        session.close()
+
+
+# ---------------------------------------------------------------------
+# Dispatch workers
+# ---------------------------------------------------------------------
+class EmailDispatcher:
+    """
+    Asyncio worker tasks that drain the outbox. The blocking provider calls
+    run in threads; the event loop only waits on them.
+    """
+
+    def __init__(self, workers: int, poll_interval: float, limiter: TokenBucket, batch_size: int):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.limiter = limiter
+        self.batch_size = max(batch_size, 1)
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._last_reap = 0.0
+        # Monotonic time until which workers hold off (provider rate limit)
+        self._paused_until = 0.0
+
+    async def start(self) -> None:
+        if self._tasks or self.workers <= 0:
+            return
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        await asyncio.to_thread(_requeue_stale_batches)
+        self._last_reap = time.monotonic()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake idle workers (called after emails are queued in this process, from any thread)."""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _dispatch(self, rows: list) -> None:
+        """Send one claimed batch and record the outcome of each message."""
+        messages = [OutgoingEmail(row.recipient, row.subject, row.html) for row in rows]
+        await self.limiter.acquire_async()
+        try:
+            with telemetry.span("email", EMAIL_TRANSPORT, messages=len(messages)):
+                deliveries = await asyncio.to_thread(send_batch, messages)
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            if is_rate_limited(exc):
+                # Not a delivery failure: pause the workers for as long as the
+                # provider asks and put the batch back without using an attempt
+                delay = retry_after(exc) or EMAIL_BACKOFF_BASE
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                await asyncio.to_thread(_record_outcomes, [_postpone(row, error, delay) for row in rows])
+                print(f"⚠️  Email provider rate limit hit; pausing dispatch for {delay:.1f}s.")
+                return
+            delay = _backoff(max(row.attempts for row in rows), exc)
+            counts = await asyncio.to_thread(
+                _record_outcomes, [_retry_or_fail(row, error, is_retryable(exc), delay) for row in rows]
+            )
+            print(f"⚠️  Email batch of {len(rows)} failed ({error}); {counts}.")
+            return
+
+        counts = await asyncio.to_thread(_record_deliveries, rows, deliveries)
+        if set(counts) - {"sent"}:
+            print(f"⚠️  Email batch of {len(rows)} partly failed: {counts}.")
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                if time.monotonic() - self._last_reap > _REAP_INTERVAL:
+                    self._last_reap = time.monotonic()
+                    await asyncio.to_thread(_requeue_stale_batches)
+
+                paused = self._paused_until - time.monotonic()
+                if paused > 0:
+                    await asyncio.sleep(paused)
+
+                rows = await asyncio.to_thread(_claim_batch, self.batch_size)
+                if rows:
+                    await self._dispatch(rows)
+                    continue
+
+                # Idle: sleep until notified or the next poll (retries become due over time)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Email dispatcher error: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+
+email_dispatcher = EmailDispatcher(
+    EMAIL_WORKERS,
+    EMAIL_POLL_INTERVAL,
+    TokenBucket(EMAIL_RATE_LIMIT, EMAIL_RATE_BURST),
+    min(EMAIL_BATCH_SIZE, max_batch_size() or EMAIL_BATCH_SIZE),
+)
@@ -1,11 +1,33 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from src.routers import question, auth, team, user, answer, analyze
 from src.db.session import init_db
 from src.sanitizer.sanitizer import SanitizerMiddleware
+from src.ai.mistral_client import aclose_mistral
+from src.jobs.analysis_queue import analysis_workers
+from src.jobs.email_outbox import email_dispatcher
+from src.telemetry import TelemetryMiddleware, metrics
 
-app = FastAPI(title="inSintesi API", version="1.0")
-init_db()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema creation and seeding happen once here, never per request
+    init_db()
+    await analysis_workers.start()
+    await email_dispatcher.start()
+    yield
+    await email_dispatcher.stop()
+    await analysis_workers.stop()
+    # Release pooled Mistral connections on shutdown
+    await aclose_mistral()
+
+
+app = FastAPI(title="inSintesi API", version="1.0", lifespan=lifespan)
+
+# Innermost, so it sees the route the router matched
+app.add_middleware(TelemetryMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,6 +51,12 @@ app.include_router(user.router, prefix="/user", tags=["user"])
 app.include_router(answer.router, prefix="/answer", tags=["answer"])
 app.include_router(analyze.router, prefix="/analyze", tags=["analyze"])
 
+
+# Prometheus scrape endpoint (span latencies, token counters)
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     
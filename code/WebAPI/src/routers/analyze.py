@@ -2,29 +2,40 @@
 FastAPI router exposing the consensus analysis endpoints.
 
 Endpoints:
-- POST /analyze/{question_id} → runs an AI analysis if not yet generated.
-- PUT /analyze/{question_id} → re-runs AI analysis and overwrites existing report.
-- GET /analyze/report/{question_id} → retrieves the report for a question if available.
-
-This module integrates the AI analyzer with FastAPI,
-handles validation, persistence, and structured responses.
+- POST /analyze/{question_id} → queues an AI analysis if not yet generated (202 + job id).
+- PUT /analyze/{question_id} → queues a re-analysis that replaces the existing report (202 + job id).
+- GET /analyze/report/{question_id} → retrieves the report, or the pending/running/failed job state.
+- GET /analyze/stream/{question_id} → Server-Sent Events with each stage of a running analysis.
+- GET /analyze/cache/stats → LLM response cache hit/miss counters.
+- GET /analyze/tokens/stats → estimated vs actual prompt tokens per pipeline step.
+
+Reports include the `trace` of the job that produced them (step, Mistral and
+query timings, tokens) when ANALYSIS_STORE_TRACE is on; aggregated metrics
+are served at GET /metrics (src.telemetry).
+
+Analyses run in the background workers of `src.jobs.analysis_queue`;
+this module handles validation, queueing and structured responses.
 """
 
+import asyncio
+import json
+
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from typing import Optional, Any, Dict
-
-from src.analyzer import analyze_topic
-from src.db.session import get_db, init_db
-from src.db.models.question import Question, Answer
-from src.db.models.ai_analysis import (
-    StanceAnalysis,
-    OptionComparison,
-    IdeaGeneration,
-    PriorityRanking,
-    FeedbackAnalysis,
-)
+from typing import AsyncIterator, Optional, Any, Dict
+from datetime import datetime
+
+from src.analyzer import MODEL_MAP
+from src.ai.llm_cache import llm_cache
+from src.ai.tokens import token_usage
+from src.ai.progress import progress_bus
+from src.config import ANALYSIS_POLL_INTERVAL
+from src.db.session import SessionLocal, get_db
+from src.db.models.question import Question
+from src.jobs.analysis_queue import enqueue_analysis, get_latest_job, ACTIVE_STATUSES
 from src.auth.authentication import get_current_team_lead
 
 
@@ -39,175 +50,82 @@ router = APIRouter()
 # ---------------------------------------------------------------------
 # Response schema
 # ---------------------------------------------------------------------
-class AnalyzeResponse(BaseModel):
-    """Schema for returning analysis results."""
-    id: str
-    question_type: str
-    topic: str
-    summary: Optional[str] = None
-    recommendation: Optional[str] = None
-    ai_thought: Optional[str] = None
-    created_at: Optional[str] = None
-    updated_at: Optional[str] = None
-    extra: Optional[dict] = None
-
-
-# ---------------------------------------------------------------------
-# Helper — Run the analysis pipeline
-# ---------------------------------------------------------------------
-def _run_ai_analysis(db: Session, question: Question) -> Dict[str, Any]:
-    """Internal helper that executes AI analysis and persists results."""
+class AnalysisJobResponse(BaseModel):
+    """Schema for returning a queued analysis job."""
+    job_id: int
+    question_id: int
+    status: str
+    created_at: Optional[datetime] = None
 
-    question_type = question.question_type.type
-    topic = question.content
 
-    # Fetch all associated answers (as opinions)
-    answers = db.query(Answer).filter(Answer.question_id == question.id).all()
-    opinions = [a.content for a in answers]
-
-    if not opinions:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="No opinions/answers found for this question."
-        )
-
-    try:
-        # Run the appropriate AI pipeline
-        result = analyze_topic(
-            question_type=question_type,
-            topic=topic,
-            opinions=opinions,
-            session=db,
-            question_id=question.id,
-        )
-
-        # Link the analysis record back to the question
-        question.report_id = result["id"]
-        db.commit()
-
-        # Separate common fields and extras
-        generic_keys = {
-            "id", "question_type", "topic", "summary",
-            "recommendation", "ai_thought", "created_at", "updated_at"
-        }
-        extra = {k: v for k, v in result.items() if k not in generic_keys}
-
-        return {
-            "id": result["id"],
-            "question_type": result["question_type"],
-            "topic": result["topic"],
-            "summary": result.get("summary"),
-            "recommendation": result.get("recommendation"),
-            "ai_thought": result.get("ai_thought"),
-            "created_at": result.get("created_at"),
-            "updated_at": result.get("updated_at"),
-            "extra": extra or None,
-        }
-
-    except ValueError as exc:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid analysis parameters: {exc}"
-        )
-    except Exception as exc:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Analysis failed: {exc}"
-        )
+def _job_response(job) -> Dict[str, Any]:
+    return {
+        "job_id": job.id,
+        "question_id": job.question_id,
+        "status": job.status,
+        "created_at": job.created_at,
+    }
 
 
 # ---------------------------------------------------------------------
-# POST /analyze/{question_id} — Run analysis if not exists
+# Helper — Load and authorize the question
 # ---------------------------------------------------------------------
-@router.post("/{question_id}", response_model=AnalyzeResponse, status_code=status.HTTP_201_CREATED)
-def run_analysis(question_id: int, db: Session = Depends(get_db),current_lead=Depends(get_current_team_lead)):
-    """Run AI analysis for an existing question (if not already generated)."""
-    init_db()
-
+def _get_owned_question(db: Session, question_id: int, lead_id: int, action: str) -> Question:
     question = db.query(Question).filter(Question.id == question_id).first()
     if not question:
         raise HTTPException(status_code=404, detail="Question not found.")
 
-    if question.team_lead_id != current_lead.id:
+    if question.team_lead_id != lead_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not authorized to analyze this question."
+            detail=f"You are not authorized to {action} this question."
         )
 
     if not question.question_type or not question.question_type.type:
         raise HTTPException(status_code=400, detail="Question type not defined.")
 
+    return question
+
+
+# ---------------------------------------------------------------------
+# POST /analyze/{question_id} — Queue analysis if not exists
+# ---------------------------------------------------------------------
+@router.post("/{question_id}", response_model=AnalysisJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def run_analysis(question_id: int, db: Session = Depends(get_db),current_lead=Depends(get_current_team_lead)):
+    """Queue AI analysis for an existing question (if not already generated)."""
+    question = _get_owned_question(db, question_id, current_lead.id, "analyze")
+
     if question.report_id:
         raise HTTPException(
             status_code=409,
             detail=f"Report already exists for question {question_id}. Use PUT to update."
         )
 
-    return _run_ai_analysis(db, question)
+    return _job_response(enqueue_analysis(db, question.id))
 
 
 # ---------------------------------------------------------------------
 # PUT /analyze/{question_id} — Force re-analysis (overwrite)
 # ---------------------------------------------------------------------
-@router.put("/{question_id}", response_model=AnalyzeResponse)
+@router.put("/{question_id}", response_model=AnalysisJobResponse, status_code=status.HTTP_202_ACCEPTED)
 def update_analysis(
     question_id: int,
     db: Session = Depends(get_db),
     current_lead=Depends(get_current_team_lead)
 ):
     """
-    Re-run the AI analysis for an existing question.
+    Queue a re-run of the AI analysis for an existing question.
 
-    This will overwrite the current report with a new one.
+    The current report stays readable until the new one is ready, then it is replaced.
     """
-    init_db()
-
-    question = db.query(Question).filter(Question.id == question_id).first()
-    if not question:
-        raise HTTPException(status_code=404, detail="Question not found.")
-
-    if question.team_lead_id != current_lead.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not authorized to update this question."
-        )
-
-    if not question.question_type or not question.question_type.type:
-        raise HTTPException(status_code=400, detail="Question type not defined.")
-
-    # ------------------------------------------------------
-    # DELETE OLD REPORT if it exists
-    # ------------------------------------------------------
-    if question.report_id:
-        model_class = MODEL_MAP.get(question.question_type.type)
-        if model_class:
-            old_report = db.query(model_class).filter(model_class.id == question.report_id).first()
-            if old_report:
-                db.delete(old_report)
-                db.commit()
-
-        question.report_id = None
-        db.commit()
-
-    # ------------------------------------------------------
-    # RE-RUN AI ANALYSIS
-    # ------------------------------------------------------
-    return _run_ai_analysis(db, question)
+    question = _get_owned_question(db, question_id, current_lead.id, "update")
 
+    return _job_response(enqueue_analysis(db, question.id, replace_existing=True))
 
 
 # ---------------------------------------------------------------------
 # GET /analyze/report/{question_id} — Retrieve report
 # ---------------------------------------------------------------------
-MODEL_MAP = {
-    "stance_analysis": StanceAnalysis,
-    "option_comparison": OptionComparison,
-    "idea_generation": IdeaGeneration,
-    "priority_ranking": PriorityRanking,
-    "feedback_analysis": FeedbackAnalysis,
-}
-
-
 @router.get("/report/{question_id}")
 def get_report(question_id: int, db: Session = Depends(get_db),current_lead=Depends(get_current_team_lead)) -> Dict[str, Any]:
     """Retrieve the AI analysis report for a specific question."""
@@ -231,11 +149,29 @@ def get_report(question_id: int, db: Session = Depends(get_db),current_lead=Depe
             detail=f"Unsupported analysis type '{question.question_type.type}' for this question."
         )
 
+    job = get_latest_job(db, question.id)
+    if job and job.status in ACTIVE_STATUSES:
+        return {
+            "question_id": question.id,
+            "type": question.question_type.type,
+            "status": job.status,
+            "job_id": job.id,
+            "message": "Analysis is queued." if job.status == "pending" else "Analysis is running."
+        }
+
     if not question.report_id:
+        if job and job.status == "failed":
+            return {
+                "question_id": question.id,
+                "type": question.question_type.type,
+                "status": "failed",
+                "job_id": job.id,
+                "message": job.error,
+            }
         return {
             "question_id": question.id,
             "type": question.question_type.type,
-            "status": "pending",
+            "status": "not_started",
             "message": "Analysis report not yet generated for this question."
         }
 
@@ -248,10 +184,137 @@ def get_report(question_id: int, db: Session = Depends(get_db),current_lead=Depe
             "message": f"Report ID {question.report_id} not found."
         }
 
+    return _report_payload(question, report, job)
+
+
+def _report_payload(question: Question, report, job) -> Dict[str, Any]:
     data = report.__dict__.copy()
     data.pop("_sa_instance_state", None)
     data["question_id"] = question.id
     data["type"] = question.question_type.type
     data["status"] = "ready"
+    if job and job.status == "failed":
+        # A re-analysis failed; the previous report is still served
+        data["last_job"] = {"job_id": job.id, "status": job.status, "message": job.error}
+    if job and job.report_id == report.id and job.trace:
+        data["trace"] = job.trace
 
     return data
+
+
+# ---------------------------------------------------------------------
+# GET /analyze/stream/{question_id} — Live analysis progress (SSE)
+# ---------------------------------------------------------------------
+# Seconds between job-state checks (and keep-alive comments) while streaming
+_STREAM_POLL_INTERVAL = max(ANALYSIS_POLL_INTERVAL, 1.0)
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data), ensure_ascii=False)}\n\n"
+
+
+def _stream_state(question_id: int) -> Dict[str, Any]:
+    """Latest job state of a question, with its report once no job is active (blocking DB read)."""
+    db = SessionLocal()
+    try:
+        question = db.query(Question).filter(Question.id == question_id).first()
+        if not question:
+            # Deleted while a client was streaming: end the stream with an `error` event
+            return {"status": "failed", "message": "Question not found."}
+        job = get_latest_job(db, question_id)
+        if job and job.status in ACTIVE_STATUSES:
+            return {"status": job.status, "job_id": job.id}
+        model_class = MODEL_MAP.get(question.question_type.type)
+        report = (
+            db.query(model_class).filter(model_class.id == question.report_id).first()
+            if question.report_id else None
+        )
+        if report:
+            return {"status": "ready", "report": _report_payload(question, report, job)}
+        if job and job.status == "failed":
+            return {"status": "failed", "job_id": job.id, "message": job.error}
+        return {"status": "not_started", "message": "Analysis report not yet generated for this question."}
+    finally:
+        db.close()
+
+
+async def _analysis_events(question_id: int) -> AsyncIterator[str]:
+    """
+    Relay progress events of the question's running analysis, then its outcome.
+
+    Events: `status` (pending/running), `stage` (a finished stage and its data),
+    `delta` (streamed text of a narrative stage), and finally `done` (with
+    the report) or `error`. The job state is re-read from the database every
+    ANALYSIS_POLL_INTERVAL seconds, so jobs run by another process also end
+    the stream.
+    """
+    # Subscribe before reading the job state, so no event falls in between
+    queue = progress_bus.subscribe(question_id)
+    try:
+        state = await asyncio.to_thread(_stream_state, question_id)
+        announced = None
+        while state["status"] in ACTIVE_STATUSES:
+            if state != announced:
+                yield _sse("status", state)
+                announced = state
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=_STREAM_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                message = None
+            if message is not None and message["event"] != "finished":
+                if message["event"] == "status":
+                    if message["data"] == announced:
+                        continue
+                    announced = message["data"]
+                yield _sse(message["event"], message["data"])
+                continue
+            state = await asyncio.to_thread(_stream_state, question_id)
+            if message is None and state == announced:
+                yield ": keep-alive\n\n"
+
+        if state["status"] == "ready":
+            yield _sse("done", state["report"])
+        else:
+            yield _sse("error", state)
+    finally:
+        progress_bus.unsubscribe(question_id, queue)
+
+
+@router.get("/stream/{question_id}")
+def stream_analysis(question_id: int, db: Session = Depends(get_db), current_lead=Depends(get_current_team_lead)):
+    """
+    Stream the analysis of a question as Server-Sent Events.
+
+    Queue the analysis with POST/PUT first; without a running job the stream
+    sends the current report (or the reason there is none) and closes.
+    """
+    question = _get_owned_question(db, question_id, current_lead.id, "view")
+    if question.question_type.type not in MODEL_MAP:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported analysis type '{question.question_type.type}' for this question."
+        )
+
+    return StreamingResponse(
+        _analysis_events(question.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ---------------------------------------------------------------------
+# GET /analyze/cache/stats — LLM cache counters (monitoring)
+# ---------------------------------------------------------------------
+@router.get("/cache/stats")
+def get_cache_stats(current_lead=Depends(get_current_team_lead)) -> Dict[str, Any]:
+    """Return hit/miss counters and sizes of the Mistral response cache."""
+    return llm_cache.stats()
+
+
+# ---------------------------------------------------------------------
+# GET /analyze/tokens/stats — token usage per pipeline step (capacity planning)
+# ---------------------------------------------------------------------
+@router.get("/tokens/stats")
+def get_token_stats(current_lead=Depends(get_current_team_lead)) -> Dict[str, Any]:
+    """Return estimated vs Mistral-reported prompt tokens per question type and step."""
+    return token_usage.stats()
@@ -50,7 +50,7 @@ def login_team_lead(form_data: OAuth2PasswordRequestForm = Depends(), db: Sessio
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    access_token = create_access_token(data={"sub": lead.email})
+    access_token = create_access_token(data={"sub": lead.email, "lid": lead.id})
     refresh_token = create_refresh_token(data={"sub": lead.email})
 
     return {
@@ -67,5 +67,5 @@ def refresh_token(request: schemas.RefreshTokenRequest, db: Session = Depends(ge
     if not lead:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="TeamLead non trovato")
 
-    access_token = create_access_token(data={"sub": lead.email})
+    access_token = create_access_token(data={"sub": lead.email, "lid": lead.id})
     return {"access_token": access_token, "token_type": "bearer"}
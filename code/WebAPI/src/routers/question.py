@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from sqlalchemy.orm import Session
 
+from src.config import QUESTION_BULK_MAX
 from src.crud.question import get_question_type_by_question_id
 from src.db.session import get_db
 from src.auth.authentication import get_current_team_lead
@@ -19,6 +20,28 @@ def create_question_endpoint(
     return {"question": question, "tokens": tokens}
 
 
+@router.post("/bulk", response_model=schemas.QuestionBulkCreateResponse)
+def create_questions_bulk_endpoint(
+    bulk_data: schemas.QuestionBulkCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_lead=Depends(get_current_team_lead),
+):
+    """
+    Create many questions in one request; their types are classified
+    together (cache, local classifier, then one Mistral call per batch).
+    """
+    if not bulk_data.questions:
+        raise HTTPException(status_code=400, detail="No questions provided.")
+    if len(bulk_data.questions) > QUESTION_BULK_MAX:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {QUESTION_BULK_MAX} questions per request.",
+        )
+    created = crud.question.create_questions(db, bulk_data.questions, current_lead.id, background_tasks)
+    return {"items": [{"question": question, "tokens": tokens} for question, tokens in created]}
+
+
 @router.get("/")
 def get_all_questions(db: Session = Depends(get_db), current_lead=Depends(get_current_team_lead)):
     return crud.question.get_questions_by_lead(db, current_lead.id)
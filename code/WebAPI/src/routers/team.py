@@ -3,8 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from src.db.session import get_db
-from src.db import models
-from src.auth.authentication import get_current_team_lead
+from src.auth.authentication import get_current_team_lead, CurrentTeamLead
 from src import schemas
 from src.crud import team as crud
 
@@ -15,7 +14,7 @@ router = APIRouter()
 def create_team_endpoint(
     team_data: schemas.TeamCreate,
     db: Session = Depends(get_db),
-    lead: models.TeamLead = Depends(get_current_team_lead)
+    lead: CurrentTeamLead = Depends(get_current_team_lead)
 ):
     """Create a new team owned by the logged-in team lead."""
     team = crud.create_team(db, team_data, lead.id)
@@ -30,7 +29,7 @@ def create_team_endpoint(
 @router.get("/", response_model=List[schemas.TeamOut])
 def list_my_teams(
     db: Session = Depends(get_db),
-    lead: models.TeamLead = Depends(get_current_team_lead)
+    lead: CurrentTeamLead = Depends(get_current_team_lead)
 ):
     """List all teams owned by the logged-in team lead."""
     teams = crud.list_teams(db, lead.id)
@@ -44,7 +43,7 @@ def list_my_teams(
 def get_team_endpoint(
     team_id: int,
     db: Session = Depends(get_db),
-    lead: models.TeamLead = Depends(get_current_team_lead)
+    lead: CurrentTeamLead = Depends(get_current_team_lead)
 ):
     """Get a team only if it belongs to the logged-in team lead."""
     team = crud.get_team(db, team_id, lead.id)
@@ -56,7 +55,7 @@ def update_team_endpoint(
     team_id: int,
     team_data: schemas.TeamUpdate,
     db: Session = Depends(get_db),
-    lead: models.TeamLead = Depends(get_current_team_lead)
+    lead: CurrentTeamLead = Depends(get_current_team_lead)
 ):
     """Update a team only if it belongs to the logged-in team lead."""
     team = crud.update_team(db, team_id, team_data, lead.id)
@@ -67,7 +66,7 @@ def update_team_endpoint(
 def delete_team_endpoint(
     team_id: int,
     db: Session = Depends(get_db),
-    lead: models.TeamLead = Depends(get_current_team_lead)
+    lead: CurrentTeamLead = Depends(get_current_team_lead)
 ):
     """Delete a team only if it belongs to the logged-in team lead."""
     crud.delete_team(db, team_id, lead.id)
@@ -3,8 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from src.db.session import get_db
-from src.db import models
-from src.auth.authentication import get_current_team_lead
+from src.auth.authentication import get_current_team_lead, CurrentTeamLead
 from src import schemas
 from src.crud import user as crud
 
@@ -15,7 +14,7 @@ router = APIRouter()
 def create_user_endpoint(
     user_data: schemas.UserCreate,
     db: Session = Depends(get_db),
-    lead: models.TeamLead = Depends(get_current_team_lead)
+    lead: CurrentTeamLead = Depends(get_current_team_lead)
 ):
     """Create a new user in one of the lead's teams."""
     user = crud.create_user(db, user_data, lead.id)
@@ -30,7 +29,7 @@ def create_user_endpoint(
 @router.get("/", response_model=List[schemas.UserOut])
 def list_my_users(
     db: Session = Depends(get_db),
-    lead: models.TeamLead = Depends(get_current_team_lead)
+    lead: CurrentTeamLead = Depends(get_current_team_lead)
 ):
     """List all users from all teams owned by the logged-in team lead."""
     users = crud.list_users(db, lead.id)
@@ -48,7 +47,7 @@ def list_my_users(
 def list_users_from_team(
     team_id: int,
     db: Session = Depends(get_db),
-    lead: models.TeamLead = Depends(get_current_team_lead)
+    lead: CurrentTeamLead = Depends(get_current_team_lead)
 ):
     """List all users from a specific team owned by the logged-in team lead."""
     users = crud.list_users_by_team(db, team_id, lead.id)
@@ -67,7 +66,7 @@ def list_users_from_team(
 def get_user_endpoint(
     user_id: int,
     db: Session = Depends(get_db),
-    lead: models.TeamLead = Depends(get_current_team_lead)
+    lead: CurrentTeamLead = Depends(get_current_team_lead)
 ):
     """Get user info only if they belong to one of the lead's teams."""
     user = crud.get_user(db, user_id, lead.id)
@@ -84,7 +83,7 @@ def update_user_endpoint(
     user_id: int,
     user_data: schemas.UserUpdate,
     db: Session = Depends(get_db),
-    lead: models.TeamLead = Depends(get_current_team_lead)
+    lead: CurrentTeamLead = Depends(get_current_team_lead)
 ):
     """Update user info only if they belong to one of the lead's teams."""
     user = crud.update_user(db, user_id, user_data, lead.id)
@@ -100,7 +99,7 @@ def update_user_endpoint(
 def delete_user_endpoint(
     user_id: int,
     db: Session = Depends(get_db),
-    lead: models.TeamLead = Depends(get_current_team_lead)
+    lead: CurrentTeamLead = Depends(get_current_team_lead)
 ):
     """Delete a user only if they belong to one of the lead's teams."""
     crud.delete_user(db, user_id, lead.id)
@@ -1,15 +1,59 @@
 import json
+import re
+import threading
+from functools import lru_cache
 from typing import Any
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-import bleach
+from bleach.sanitizer import Cleaner
+from src.config import SANITIZER_CACHE_SIZE
+from src import telemetry
+
+
+# JSON fields that carry free text shown back to users (answers, questions,
+# names). Everything else (ids, emails, passwords, token values) is left
+# alone: it is either validated by its schema or must not be altered.
+TEXT_FIELDS = frozenset({"content", "name", "lastname"})
+
+# Bodies without any of these bytes cannot contain markup, not even as a
+# JSON \u escape, so they are forwarded without being parsed.
+_MARKUP_BYTES = re.compile(rb"[<>&]|\\u")
+
+_SANITIZED_METHODS = frozenset({"POST", "PUT", "PATCH"})
+
+# Strings without these characters come out of bleach unchanged
+_NEEDS_CLEANING = re.compile(r"[<>&\"']").search
+
+# Longer strings are cleaned but not memoized, to bound cache memory
+_MAX_MEMO_LENGTH = 4096
+
+# bleach Cleaners are not thread-safe: one configured instance per thread
+_local = threading.local()
+
+
+def _cleaner() -> Cleaner:
+    cleaner = getattr(_local, "cleaner", None)
+    if cleaner is None:
+        cleaner = _local.cleaner = Cleaner(strip=True)
+    return cleaner
+
+
+@lru_cache(maxsize=SANITIZER_CACHE_SIZE)
+def _clean_memoized(text: str) -> str:
+    return _cleaner().clean(text)
+
+
+def clean_text(text: str) -> str:
+    """Remove dangerous tags, attributes and JS code from a single string."""
+    if not _NEEDS_CLEANING(text):
+        return text
+    if len(text) > _MAX_MEMO_LENGTH:
+        return _cleaner().clean(text)
+    return _clean_memoized(text)
 
 
 def sanitize_value(value: Any) -> Any:
     """Recursively sanitize strings and nested structures."""
     if isinstance(value, str):
-        # Remove dangerous tags, attributes, and JS code
-        return bleach.clean(value, strip=True)
+        return clean_text(value)
     elif isinstance(value, dict):
         return {k: sanitize_value(v) for k, v in value.items()}
     elif isinstance(value, list):
@@ -18,31 +62,101 @@ def sanitize_value(value: Any) -> Any:
         return value
 
 
-class SanitizerMiddleware(BaseHTTPMiddleware):
-    """Middleware that sanitizes incoming request data (body, query, and path)."""
-
-    async def dispatch(self, request: Request, call_next):
-        # --- Sanitize query parameters ---
-        query_params = {k: sanitize_value(v) for k, v in request.query_params.items()}
-        request._query_params = query_params  # type: ignore
-
-        # --- Sanitize path parameters (e.g. token in URL) ---
-        if "path_params" in request.scope:
-            request.scope["path_params"] = {
-                k: sanitize_value(v) for k, v in request.scope["path_params"].items()
-            }
-
-        # --- Sanitize JSON body (POST, PUT, PATCH) ---
-        if request.method in ["POST", "PUT", "PATCH"]:
-            try:
-                body_bytes = await request.body()
-                if body_bytes:
-                    body_data = json.loads(body_bytes)
-                    sanitized_data = sanitize_value(body_data)
-                    request._body = json.dumps(sanitized_data).encode("utf-8")  # type: ignore
-            except (json.JSONDecodeError, UnicodeDecodeError):
-                # skip non-JSON bodies (e.g. form-data or files)
-                pass
-
-        response = await call_next(request)
-        return response
+def sanitize_fields(value: Any, fields: frozenset = TEXT_FIELDS) -> tuple[Any, bool]:
+    """
+    Sanitize only the declared text fields, at any nesting depth.
+    Returns (value, changed) so unchanged bodies can be forwarded as-is.
+    """
+    if isinstance(value, dict):
+        changed = False
+        out = {}
+        for k, v in value.items():
+            if k in fields and isinstance(v, (str, list)):
+                clean = sanitize_value(v)
+            else:
+                clean, _ = sanitize_fields(v, fields)
+            changed = changed or clean != v
+            out[k] = clean
+        return (out, True) if changed else (value, False)
+    if isinstance(value, list):
+        items = [sanitize_fields(v, fields) for v in value]
+        if any(c for _, c in items):
+            return [v for v, _ in items], True
+        return value, False
+    return value, False
+
+
+def _is_json(headers: list[tuple[bytes, bytes]]) -> bool:
+    """FastAPI parses bodies without a content type as JSON too."""
+    for name, value in headers:
+        if name == b"content-type":
+            return b"json" in value
+    return True
+
+
+class SanitizerMiddleware:
+    """
+    Pure ASGI middleware that strips markup from declared text fields in JSON bodies.
+
+    - Requests other than POST/PUT/PATCH with a JSON body are passed through untouched.
+    - JSON bodies without markup characters are forwarded as the original bytes.
+    - Only bodies that actually change are re-serialized.
+    """
+
+    def __init__(self, app, fields: frozenset = TEXT_FIELDS):
+        self.app = app
+        self.fields = fields
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in _SANITIZED_METHODS
+            or not _is_json(scope["headers"])
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        # --- Buffer the body ---
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                # Client went away before sending the body
+                await self.app(scope, _replay(message, receive), send)
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+        # --- Sanitize only when markup could be present ---
+        if body and _MARKUP_BYTES.search(body):
+            with telemetry.span("middleware", "sanitizer"):
+                try:
+                    data, changed = sanitize_fields(json.loads(body), self.fields)
+                    if changed:
+                        body = json.dumps(data).encode("utf-8")
+                        scope = dict(scope)
+                        scope["headers"] = [
+                            (k, str(len(body)).encode("latin-1") if k == b"content-length" else v)
+                            for k, v in scope["headers"]
+                        ]
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    # Malformed JSON is left for the endpoint to reject
+                    pass
+
+        await self.app(scope, _replay({"type": "http.request", "body": body, "more_body": False}, receive), send)
+
+
+def _replay(first_message: dict, receive):
+    """Return a receive callable that yields `first_message` once, then defers to `receive`."""
+    sent = False
+
+    async def wrapped():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return first_message
+        return await receive()
+
+    return wrapped
@@ -113,6 +113,7 @@ class Question(QuestionBase):
     created_at: datetime
     updated_at: datetime
     question_type_id: int
+    type_provisional: Optional[bool] = False
 
     class Config:
         from_attributes = True
@@ -143,6 +144,12 @@ class QuestionCreateResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class QuestionBulkCreate(BaseModel):
+    questions: List[QuestionCreate]
+
+class QuestionBulkCreateResponse(BaseModel):
+    items: List[QuestionCreateResponse]
+
 class QuestionResponse(BaseModel):
     id: int
     content: str
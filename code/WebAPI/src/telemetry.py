@@ -0,0 +1,317 @@
+"""
+Latency and token instrumentation (spans) with a Prometheus endpoint.
+
+A span times one unit of work and is labelled with a kind and a name:
+- http        one request, by route template (`TelemetryMiddleware`)
+- middleware  request preprocessing, e.g. the sanitizer
+- db          one SQL statement, by operation and table (`instrument_engine`)
+- step        one prompt-graph step, by its step label ("stance_analysis/summary")
+- llm         one Mistral call, by step label, with token counts and cache status
+- analysis    a whole analysis job, by question type
+- email       one email provider request, by transport, with the batch size
+
+Every span feeds the in-process `metrics` registry, rendered in the
+Prometheus text format at GET /metrics. Spans that happen inside a `trace`
+(the analysis jobs) are also collected, so a job can store where its time
+and tokens went next to its report (`AnalysisJob.trace`).
+
+No client library is needed: histograms and counters are kept here and
+rendered by hand. Counters are per process; with several API processes,
+scrape each of them.
+"""
+
+import contextvars
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+# Histogram buckets in seconds: from single DB queries to long Mistral calls
+_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_HELP = {
+    "insintesi_span_duration_seconds": ("histogram", "Duration of instrumented spans by kind and name."),
+    "insintesi_span_errors_total": ("counter", "Spans that ended with an exception."),
+    "insintesi_http_requests_total": ("counter", "HTTP requests by method, route and status code."),
+    "insintesi_llm_calls_total": ("counter", "Mistral calls by pipeline step and cache result."),
+    "insintesi_llm_tokens_total": ("counter", "Mistral tokens by pipeline step (prompt or completion)."),
+    "insintesi_analysis_tokens_total": ("counter", "Mistral tokens spent by analyses, by question type."),
+    "insintesi_emails_total": ("counter", "Outbox emails by transport and outcome (sent, retry, failed)."),
+}
+
+
+# ---------------------------------------------------------------------
+# Metrics registry
+# ---------------------------------------------------------------------
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: tuple, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(str(v))}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _le(bound) -> str:
+    return f'le="{bound}"'
+
+
+class Metrics:
+    """Thread-safe labelled counters and histograms, rendered in Prometheus text format."""
+
+    def __init__(self, buckets: tuple = _BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[tuple, float]] = {}
+        # name → labels → [count per bucket..., sum, count]
+        self._histograms: dict[str, dict[tuple, list[float]]] = {}
+
+    def inc(self, name: str, labels: dict, amount: float = 1) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, labels: dict, value: float) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            data = series.get(key)
+            if data is None:
+                data = series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self) -> str:
+        lines: list[str] = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                lines += self._header(name)
+                for key, data in sorted(series.items()):
+                    for bound, count in zip(self.buckets, data):
+                        lines.append(f"{name}_bucket{_labels(key, _le(bound))} {int(count)}")
+                    lines.append(f"{name}_bucket{_labels(key, _le('+Inf'))} {int(data[-1])}")
+                    lines.append(f"{name}_sum{_labels(key)} {data[-2]:.6f}")
+                    lines.append(f"{name}_count{_labels(key)} {int(data[-1])}")
+            for name, series in sorted(self._counters.items()):
+                lines += self._header(name)
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_labels(key)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _header(name: str) -> list[str]:
+        kind, text = _HELP.get(name, ("untyped", name))
+        return [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+
+
+metrics = Metrics()
+
+
+# ---------------------------------------------------------------------
+# Traces (spans collected for one analysis job)
+# ---------------------------------------------------------------------
+class Trace:
+    """
+    Spans of one unit of work. DB queries are aggregated per operation and
+    table; other spans are kept individually, up to `max_spans`.
+    """
+
+    def __init__(self, kind: str, name: str, max_spans: int = 500):
+        self.kind = kind
+        self.name = name
+        self.max_spans = max_spans
+        self.started = time.perf_counter()
+        self.duration: float | None = None
+        self.error: str | None = None
+        self.spans: list[dict] = []
+        self.dropped = 0
+        self.db: dict[str, dict[str, float]] = {}
+        self.tokens = {"prompt": 0, "completion": 0}
+        self.llm_calls = {"hit": 0, "miss": 0}
+        self._lock = threading.Lock()
+
+    def add(self, kind: str, name: str, start: float, duration: float, attributes: dict) -> None:
+        with self._lock:
+            if kind == "db":
+                entry = self.db.setdefault(name, {"queries": 0, "seconds": 0.0})
+                entry["queries"] += 1
+                entry["seconds"] += duration
+                return
+            if kind == "llm":
+                self.tokens["prompt"] += attributes.get("prompt_tokens") or 0
+                self.tokens["completion"] += attributes.get("completion_tokens") or 0
+                self.llm_calls["hit" if attributes.get("cached") else "miss"] += 1
+            if len(self.spans) >= self.max_spans:
+                self.dropped += 1
+                return
+            self.spans.append({
+                "kind": kind,
+                "name": name,
+                "start_ms": round((start - self.started) * 1000, 1),
+                "duration_ms": round(duration * 1000, 1),
+                **attributes,
+            })
+
+    def summary(self) -> dict:
+        """JSON-serializable record of the trace."""
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "name": self.name,
+                "duration_ms": round((self.duration or 0.0) * 1000, 1),
+                "error": self.error,
+                "tokens": dict(self.tokens),
+                "llm_calls": dict(self.llm_calls),
+                "db": {
+                    name: {"queries": int(e["queries"]), "duration_ms": round(e["seconds"] * 1000, 1)}
+                    for name, e in sorted(self.db.items())
+                },
+                "spans": sorted(self.spans, key=lambda s: s["start_ms"]),
+                "dropped_spans": self.dropped,
+            }
+
+
+# Trace collecting the spans of the current task, if any
+_trace: contextvars.ContextVar[Trace | None] = contextvars.ContextVar("telemetry_trace", default=None)
+
+
+def _finish(kind: str, name: str, start: float, attributes: dict, error: BaseException | None) -> float:
+    duration = time.perf_counter() - start
+    labels = {"kind": kind, "name": name}
+    metrics.observe("insintesi_span_duration_seconds", labels, duration)
+    if error is not None:
+        attributes["error"] = type(error).__name__
+        metrics.inc("insintesi_span_errors_total", labels)
+    if kind == "llm":
+        cache = "hit" if attributes.get("cached") else "miss"
+        metrics.inc("insintesi_llm_calls_total", {"step": name, "cache": cache})
+        for token_type in ("prompt", "completion"):
+            count = attributes.get(f"{token_type}_tokens")
+            if count:
+                metrics.inc("insintesi_llm_tokens_total", {"step": name, "type": token_type}, count)
+    trace = _trace.get()
+    if trace is not None:
+        trace.add(kind, name, start, duration, attributes)
+    return duration
+
+
+@contextmanager
+def span(kind: str, name: str, **attributes: Any) -> Iterator[dict]:
+    """
+    Time the block as a span. Yields the span's attribute dict, which the
+    block may extend (e.g. token counts); exceptions are recorded and re-raised.
+    """
+    start = time.perf_counter()
+    try:
+        yield attributes
+    except BaseException as exc:
+        _finish(kind, name, start, attributes, exc)
+        raise
+    _finish(kind, name, start, attributes, None)
+
+
+@contextmanager
+def trace(kind: str, name: str, max_spans: int = 500) -> Iterator[Trace]:
+    """Time the block as a span and collect every span started inside it (same task or copied context)."""
+    collected = Trace(kind, name, max_spans)
+    token = _trace.set(collected)
+    error = None
+    try:
+        yield collected
+    except BaseException as exc:
+        error = exc
+        collected.error = type(exc).__name__
+        raise
+    finally:
+        _trace.reset(token)
+        collected.duration = _finish(kind, name, collected.started, {}, error)
+        if kind == "analysis":
+            for token_type, count in collected.tokens.items():
+                if count:
+                    metrics.inc("insintesi_analysis_tokens_total", {"question_type": name, "type": token_type}, count)
+
+
+# ---------------------------------------------------------------------
+# Integrations
+# ---------------------------------------------------------------------
+_SQL_TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE|TABLE)\s+[`"\[]?(\w+)', re.IGNORECASE)
+_SQL_OPERATIONS = frozenset({"SELECT", "INSERT", "UPDATE", "DELETE"})
+
+
+def _statement_name(statement: str) -> str:
+    """Low-cardinality label for a SQL statement: operation and first table."""
+    words = statement.lstrip().split(None, 1)
+    operation = words[0].upper() if words else ""
+    operation = operation if operation in _SQL_OPERATIONS else "OTHER"
+    table = _SQL_TABLE.search(statement)
+    return f"{operation} {table.group(1)}" if table else operation
+
+
+def instrument_engine(engine) -> None:
+    """Record a `db` span for every statement executed through `engine`."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("telemetry_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["telemetry_started"].pop()
+        _finish("db", _statement_name(statement), started, {}, None)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        stack = context.connection.info.get("telemetry_started") if context.connection is not None else None
+        if stack:
+            _finish("db", _statement_name(context.statement or ""), stack.pop(), {}, context.original_exception)
+
+
+class TelemetryMiddleware:
+    """
+    Pure ASGI middleware recording an `http` span per request, labelled with
+    the route template ("GET /analyze/report/{question_id}") so that ids do
+    not create new series. Add it first (innermost), so the route resolved by
+    the router is visible in the scope it passes on.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        error = None
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            name = f"{scope['method']} {route}"
+            _finish("http", name, start, {"status": status}, error)
+            metrics.inc("insintesi_http_requests_total", {"method": scope["method"], "route": route, "status": status})
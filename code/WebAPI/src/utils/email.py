@@ -1,12 +1,63 @@
+"""
+Token emails: rendering and delivery transports.
+
+Emails are not sent from request handlers. `create_question` queues them in
+the outbox (src.jobs.email_outbox) and the dispatch workers hand batches to
+the transport selected by EMAIL_TRANSPORT:
+- resend  the Resend batch API, up to RESEND_BATCH_LIMIT messages per
+          request; RESEND_API_URL points the SDK at a local stand-in
+          (benchmarks.fake_email)
+- smtp    one SMTP connection per batch, one message per recipient
+A transport returns one `Delivery` per message and raises when the whole
+request failed; `is_retryable` tells transient failures apart.
+"""
+
 import os
+import smtplib
+from dataclasses import dataclass
+from email.message import EmailMessage
+from email.utils import make_msgid
+
 import resend
+from resend.exceptions import ResendError
+
+from src.config import (
+    EMAIL_TRANSPORT,
+    EMAIL_FROM,
+    EMAIL_SMTP_HOST,
+    EMAIL_SMTP_PORT,
+    EMAIL_SMTP_USER,
+    EMAIL_SMTP_PASSWORD,
+    EMAIL_SMTP_STARTTLS,
+)
 
 resend.api_key = os.getenv("RESEND_API_KEY")
 BASE_URL = os.getenv("FRONTEND_BASE_URL")
 
+# Maximum number of emails per Resend batch request
+RESEND_BATCH_LIMIT = 100
+
+_RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+_SMTP_TIMEOUT = 30
+
+
+@dataclass(frozen=True)
+class OutgoingEmail:
+    recipient: str
+    subject: str
+    html: str
 
-def send_token_email(user_email: str, token_value: str, question_content: str):
-    """Send an email with a direct link to answer the question."""
+
+@dataclass(frozen=True)
+class Delivery:
+    """Outcome of one message of a batch: a provider id, or an error."""
+    provider_id: str | None = None
+    error: str | None = None
+    retryable: bool = False
+
+
+def render_token_email(token_value: str, question_content: str) -> tuple[str, str]:
+    """Subject and HTML body of the email with a direct link to answer the question."""
     answer_link = f"{BASE_URL}/answer/{token_value}"
 
     subject = "New Question Assigned"
@@ -19,16 +70,109 @@ def send_token_email(user_email: str, token_value: str, question_content: str):
         <p>If the link does not work, you can use this token manually:</p>
         <p><strong>{token_value}</strong></p>
     """
+    return subject, html_body
+
+
+# ---------------------------------------------------------------------
+# Transports
+# ---------------------------------------------------------------------
+def _send_resend(messages: list[OutgoingEmail]) -> list[Delivery]:
+    """One batch API request. Permissive validation: an invalid address fails only its own message."""
+    params: list[resend.Emails.SendParams] = [
+        {"from": EMAIL_FROM, "to": [m.recipient], "subject": m.subject, "html": m.html}
+        for m in messages
+    ]
+    response = resend.Batch.send(params, {"batch_validation": "permissive"})
+
+    # `data` lists the accepted emails in request order; `errors` the rejected ones by index
+    errors = {e.get("index"): e.get("message") or "rejected" for e in response.get("errors") or []}
+    accepted = iter(response.get("data") or [])
+    deliveries = []
+    for index in range(len(messages)):
+        if index in errors:
+            deliveries.append(Delivery(error=errors[index]))
+        else:
+            entry = next(accepted, None)
+            deliveries.append(Delivery(provider_id=entry.get("id") if entry else None))
+    return deliveries
+
+
+def _send_smtp(messages: list[OutgoingEmail]) -> list[Delivery]:
+    """All messages of the batch over one SMTP connection."""
+    deliveries: list[Delivery] = []
+    with smtplib.SMTP(EMAIL_SMTP_HOST, EMAIL_SMTP_PORT, timeout=_SMTP_TIMEOUT) as smtp:
+        if EMAIL_SMTP_STARTTLS:
+            smtp.starttls()
+        if EMAIL_SMTP_USER:
+            smtp.login(EMAIL_SMTP_USER, EMAIL_SMTP_PASSWORD or "")
+
+        for index, m in enumerate(messages):
+            msg = EmailMessage()
+            msg["From"] = EMAIL_FROM
+            msg["To"] = m.recipient
+            msg["Subject"] = m.subject
+            msg["Message-ID"] = make_msgid()
+            msg.set_content(m.html, subtype="html")
+            try:
+                smtp.send_message(msg)
+            except smtplib.SMTPRecipientsRefused as e:
+                code = next(iter(e.recipients.values()), (550, b""))[0]
+                deliveries.append(Delivery(error=f"Recipient refused ({code})", retryable=code < 500))
+            except smtplib.SMTPResponseException as e:
+                deliveries.append(Delivery(error=f"SMTP {e.smtp_code}: {e.smtp_error!r}", retryable=e.smtp_code < 500))
+            except (smtplib.SMTPServerDisconnected, OSError) as e:
+                # Connection lost: this and the remaining messages were not sent
+                error = f"Connection lost: {e}"
+                deliveries += [Delivery(error=error, retryable=True)] * (len(messages) - index)
+                break
+            else:
+                deliveries.append(Delivery(provider_id=msg["Message-ID"]))
+    return deliveries
+
+
+_TRANSPORTS = {
+    "resend": (_send_resend, RESEND_BATCH_LIMIT),
+    "smtp": (_send_smtp, None),
+}
+
+
+def max_batch_size() -> int | None:
+    """Largest batch the configured transport accepts per request (None = no limit)."""
+    return _TRANSPORTS.get(EMAIL_TRANSPORT, (None, None))[1]
+
+
+def send_batch(messages: list[OutgoingEmail]) -> list[Delivery]:
+    """Send messages with the configured transport (blocking); one `Delivery` per message."""
+    if EMAIL_TRANSPORT not in _TRANSPORTS:
+        raise ValueError(f"Unknown EMAIL_TRANSPORT '{EMAIL_TRANSPORT}'.")
+    send, _ = _TRANSPORTS[EMAIL_TRANSPORT]
+    return send(messages)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Transient delivery failures worth another attempt (rate limits, 5xx, network errors)."""
+    if isinstance(exc, ResendError):
+        try:
+            return int(exc.code) in _RETRYABLE_STATUS
+        except (TypeError, ValueError):
+            return False
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return exc.smtp_code < 500
+    # smtplib errors are OSErrors too: disconnects, refused connections, timeouts
+    return isinstance(exc, (OSError, TimeoutError))
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    """The provider asked us to slow down (HTTP 429, SMTP 421)."""
+    if isinstance(exc, ResendError):
+        return str(exc.code) == "429"
+    return isinstance(exc, smtplib.SMTPResponseException) and exc.smtp_code == 421
 
-    params: resend.Emails.SendParams = {
-        "from": "inSintesi <onboarding@resend.dev>",
-        "to": [user_email],
-        "subject": subject,
-        "html": html_body,
-    }
 
+def retry_after(exc: BaseException) -> float | None:
+    """Seconds from the provider's Retry-After header, if it sent one."""
+    headers = {k.lower(): v for k, v in (getattr(exc, "headers", None) or {}).items()}
     try:
-        response = resend.Emails.send(params)
-        print("Resend response:", response)
-    except Exception as e:
-        print("Error sending email:", e)
+        return max(float(headers["retry-after"]), 0.0) if "retry-after" in headers else None
+    except ValueError:
+        return None
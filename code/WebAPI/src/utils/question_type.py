@@ -1,28 +1,176 @@
+"""
+Question type classification.
+
+Question texts are resolved in tiers, cheapest first:
+1. an in-process LRU of recently classified texts;
+2. existing questions with the same text (their stored type);
+3. a local keyword classifier, trusted when its confidence reaches
+   QUESTION_TYPE_LOCAL_CONFIDENCE;
+4. Mistral, with every remaining text of the batch in one structured call
+   (up to QUESTION_TYPE_BATCH_SIZE questions per request).
+Texts Mistral leaves out or labels with an unknown type get the local
+classifier's best guess, so a batch never fails on one bad item.
+
+With QUESTION_TYPE_DEFERRED, question creation skips tier 4: texts that
+would need Mistral are stored with the local guess as a provisional type
+(`Question.type_provisional`) and `confirm_question_types` classifies them
+after the response is sent. The analysis worker confirms any type still
+provisional before it analyzes a question.
+"""
+
+import json
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from src.db import models
+from src.db.session import SessionLocal
 from src.ai.mistral_client import ask_mistral
+from src.ai.tokens import step_label
+from src.config import (
+    QUESTION_TYPE_CACHE_SIZE,
+    QUESTION_TYPE_LOCAL_CONFIDENCE,
+    QUESTION_TYPE_BATCH_SIZE,
+)
 
+# These are the allowed types present in your DB
+QUESTION_TYPES = (
+    "stance_analysis",
+    "option_comparison",
+    "idea_generation",
+    "priority_ranking",
+    "feedback_analysis",
+)
 
-def get_question_type_by_content(db: Session, content: str) -> int:
+_DEFAULT_TYPE = "stance_analysis"
+
+
+# ---------------------------------------------------------------------
+# Local keyword classifier
+# ---------------------------------------------------------------------
+# (pattern, weight) per type; 2 = strong cue, 1 = weak cue. English and Italian.
+_RULES: dict[str, list[tuple[re.Pattern, int]]] = {
+    question_type: [(re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in rules]
+    for question_type, rules in {
+        "stance_analysis": [
+            (r"\b(should|shall) (we|i|the)\b", 2),
+            (r"\bdo you (agree|support|think we should)\b", 2),
+            (r"\b(are|would) you (in favou?r|for or against|ok with)\b", 2),
+            (r"\bsei d'accordo\b|\bdovremmo\b|\bsei favorevole\b", 2),
+            (r"\bagree\b|\bin favou?r\b", 1),
+        ],
+        "option_comparison": [
+            (r"\bwhich (one|option|of (these|the))\b|\bquale (tra|fra|opzione)\b", 2),
+            (r"\b(vs\.?|versus)\b|\bcompare\b|\bconfronta", 2),
+            (r"\bprefer|\bpreferisci\b|\bbetter\b|\bmeglio\b", 1),
+            (r"\bwhich\b|\bquale\b|\boppure\b", 1),
+            (r"\w+ (or|o) [\w ]{1,30}\?", 1),
+        ],
+        "idea_generation": [
+            (r"\bideas?\b|\bidee\b|\bsuggestions?\b|\bsuggerimenti\b|\bproposte\b", 2),
+            (r"\bhow (could|can|might) we\b|\bcome (potremmo|possiamo)\b", 2),
+            (r"\bwhat would you (suggest|propose|change)\b", 2),
+            (r"\bimprove\b|\bmigliorare\b|\bpropose\b", 1),
+        ],
+        "priority_ranking": [
+            (r"\brank\b|\branking\b|\bprioriti[sz]e\b|\bin order of\b|\bclassifica\b|\bordina\b", 2),
+            (r"\bpriorit(y|ies)\b|\bpriorità\b|\bmost important\b|\bpiù important[ei]\b", 1),
+        ],
+        "feedback_analysis": [
+            (r"\bfeedback\b|\bhow (was|did|is going)\b|\bcom'è (andat[oa]|stat[oa])\b", 2),
+            (r"\b(your )?experience\b|\besperienza\b|\bsatisf|\bsoddisf", 1),
+            (r"\brate\b|\bvaluta\b|\breview\b", 1),
+        ],
+    }.items()
+}
+
+
+@dataclass(frozen=True)
+class LocalGuess:
+    type: str
+    confidence: float
+
+
+@dataclass(frozen=True)
+class ClassifiedType:
+    """Type name of a question text; provisional when Mistral was skipped for an uncertain guess."""
+    type: str
+    provisional: bool = False
+
+
+def classify_locally(content: str) -> LocalGuess:
     """
-    Determines the question type using the Mistral API based on the question content.
-    Returns the numeric ID of the corresponding QuestionType record in the database.
+    Keyword-based guess. Confidence is the winning type's share of all matched
+    cue weight (with a small prior), so one strong unambiguous cue scores 0.8
+    and conflicting cues score low. Without any cue: the default type, 0.
     """
+    scores = {
+        question_type: sum(weight for pattern, weight in rules if pattern.search(content))
+        for question_type, rules in _RULES.items()
+    }
+    best = max(QUESTION_TYPES, key=lambda t: scores[t])
+    total = sum(scores.values())
+    if not total:
+        return LocalGuess(_DEFAULT_TYPE, 0.0)
+    return LocalGuess(best, scores[best] / (total + 0.5))
 
-    # These are the allowed types present in your DB
-    allowed_types = [
-        "stance_analysis",
-        "option_comparison",
-        "idea_generation",
-        "priority_ranking",
-        "feedback_analysis",
-    ]
 
-    # Build the prompt for Mistral
+# ---------------------------------------------------------------------
+# Cache of recent classifications
+# ---------------------------------------------------------------------
+def _normalize(content: str) -> str:
+    return " ".join(content.split()).casefold()
+
+
+class _TypeCache:
+    """Thread-safe LRU: normalized question text → type name."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, content: str) -> str | None:
+        key = _normalize(content)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, content: str, question_type: str) -> None:
+        if self.max_entries <= 0:
+            return
+        key = _normalize(content)
+        with self._lock:
+            self._entries[key] = question_type
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+type_cache = _TypeCache(QUESTION_TYPE_CACHE_SIZE)
+
+
+# ---------------------------------------------------------------------
+# Mistral batch classification
+# ---------------------------------------------------------------------
+def _classify_with_mistral(contents: list[str]) -> dict[int, str]:
+    """Classify numbered questions in one call; returns {position: type} for valid answers."""
+    # JSON-quoted, so quotes and line breaks inside a question cannot break the list
+    numbered = "\n    ".join(
+        f"{i}. {json.dumps(content, ensure_ascii=False)}" for i, content in enumerate(contents, start=1)
+    )
     prompt = f"""
     You are an assistant that classifies questions into analytical categories.
-    Analyze the question below and return its most appropriate type.
+    For each numbered question below, return its most appropriate type.
 
     Available types:
     - stance_analysis: analyzes opinions or attitudes
@@ -31,37 +179,138 @@ def get_question_type_by_content(db: Session, content: str) -> int:
     - priority_ranking: ranks or prioritizes items
     - feedback_analysis: analyzes feedback or reviews
 
-    Question: "{content}"
+    Questions:
+    {numbered}
 
-    Respond ONLY in this JSON format:
+    Respond ONLY in this JSON format, with one entry per question:
     {{
-        "type": "<one_of: stance_analysis | option_comparison | idea_generation | priority_ranking | feedback_analysis>"
+        "types": [
+            {{"index": 1, "type": "<one_of: stance_analysis | option_comparison | idea_generation | priority_ranking | feedback_analysis>"}}
+        ]
     }}
     """
 
-    # Ask Mistral for classification
-    response = ask_mistral(prompt, format_json=True)
-    detected_type = response.get("type") if isinstance(response, dict) else None
+    with step_label("question_type"):
+        response = ask_mistral(prompt, format_json=True)
+    entries = response.get("types") if isinstance(response, dict) else None
+
+    detected: dict[int, str] = {}
+    for position, entry in enumerate(entries if isinstance(entries, list) else []):
+        if not isinstance(entry, dict) or entry.get("type") not in QUESTION_TYPES:
+            continue
+        index = entry.get("index")
+        index = index - 1 if isinstance(index, int) and 1 <= index <= len(contents) else position
+        if index < len(contents):
+            detected.setdefault(index, entry["type"])
+    return detected
 
-    # Validate the detected type
-    if detected_type not in allowed_types:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid or missing question type '{detected_type}'."
-        )
 
-    # Find the corresponding record in the DB
-    question_type = (
-        db.query(models.QuestionType)
-        .filter(models.QuestionType.type == detected_type)
-        .first()
+def _stored_types(db: Session, contents: list[str]) -> dict[str, str]:
+    """Confirmed types already assigned to questions with exactly these texts."""
+    rows = (
+        db.query(models.Question.content, models.QuestionType.type)
+        .join(models.QuestionType, models.Question.question_type_id == models.QuestionType.id)
+        .filter(models.Question.content.in_(contents), models.Question.type_provisional.isnot(True))
+        .all()
     )
+    return {content: question_type for content, question_type in rows}
+
+
+def classify_question_types(db: Session, contents: list[str], use_mistral: bool = True) -> list[ClassifiedType]:
+    """
+    Return the question type of each text (same order), calling Mistral at
+    most once per batch. Without `use_mistral`, texts that would need it get
+    the local guess, marked provisional (and not cached).
+    """
+    types: list[str | None] = [type_cache.get(c) for c in contents]
+
+    unresolved = list(dict.fromkeys(c for c, t in zip(contents, types) if t is None))
+    stored = _stored_types(db, unresolved) if unresolved else {}
+
+    guesses: dict[str, LocalGuess] = {}
+    pending: list[str] = []
+    for content in unresolved:
+        if content in stored:
+            continue
+        guess = guesses[content] = classify_locally(content)
+        if guess.confidence < QUESTION_TYPE_LOCAL_CONFIDENCE:
+            pending.append(content)
+
+    detected: dict[str, str] = dict(stored)
+    provisional = set() if use_mistral else set(pending)
+    for start in range(0, len(pending) if use_mistral else 0, max(QUESTION_TYPE_BATCH_SIZE, 1)):
+        batch = pending[start:start + QUESTION_TYPE_BATCH_SIZE]
+        for index, question_type in _classify_with_mistral(batch).items():
+            detected[batch[index]] = question_type
+    for content, guess in guesses.items():
+        detected.setdefault(content, guess.type)
+
+    for content in unresolved:
+        if content not in provisional:
+            type_cache.put(content, detected[content])
+    if len(contents) > 1:
+        print(
+            f"ℹ️  Classified {len(contents)} question(s): {len(contents) - len(unresolved)} cached, "
+            f"{len(stored)} stored, {len(guesses) - len(pending)} local, "
+            f"{len(pending)} {'via Mistral' if use_mistral else 'provisional'}."
+        )
+    return [
+        ClassifiedType(t) if t is not None else ClassifiedType(detected[c], c in provisional)
+        for c, t in zip(contents, types)
+    ]
+
 
-    if not question_type:
+def resolve_question_types(db: Session, contents: list[str], use_mistral: bool = True) -> list[tuple[int, bool]]:
+    """(QuestionType id, provisional) for the given question texts (same order)."""
+    classified = classify_question_types(db, contents, use_mistral)
+    names = {c.type for c in classified}
+    ids = dict(
+        db.query(models.QuestionType.type, models.QuestionType.id)
+        .filter(models.QuestionType.type.in_(names))
+        .all()
+    )
+    missing = sorted(names - set(ids))
+    if missing:
         raise HTTPException(
             status_code=400,
-            detail=f"Question type '{detected_type}' not found in database.",
+            detail=f"Question type '{missing[0]}' not found in database.",
         )
+    return [(ids[c.type], c.provisional) for c in classified]
+
 
-    # Return the numeric ID (not the object)
-    return question_type.id
+def get_question_type_by_content(db: Session, content: str) -> int:
+    """
+    Determines the question type of a single question text.
+    Returns the numeric ID of the corresponding QuestionType record in the database.
+    """
+    return resolve_question_types(db, [content])[0][0]
+
+
+def confirm_question_types(question_ids: list[int]) -> int:
+    """
+    Classify questions whose type is still provisional (one Mistral call per
+    batch) and store the result. Runs after the creating request, and from the
+    analysis worker; failures leave the types provisional for a later attempt.
+    Returns how many questions were confirmed.
+    """
+    db = SessionLocal()
+    try:
+        questions = (
+            db.query(models.Question)
+            .filter(models.Question.id.in_(question_ids), models.Question.type_provisional.is_(True))
+            .all()
+        )
+        if not questions:
+            return 0
+        resolved = resolve_question_types(db, [q.content for q in questions])
+        for question, (question_type_id, _) in zip(questions, resolved):
+            question.question_type_id = question_type_id
+            question.type_provisional = False
+        db.commit()
+        return len(questions)
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️  Question type classification failed, types stay provisional: {e}")
+        return 0
+    finally:
+        db.close()
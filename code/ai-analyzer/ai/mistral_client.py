@@ -1,20 +1,55 @@
+import asyncio
 import json
+import httpx
 from mistralai import Mistral
-from config import MISTRAL_API_KEY, MISTRAL_MODEL
+from config import (
+    MISTRAL_API_KEY,
+    MISTRAL_MODEL,
+    MISTRAL_MAX_CONNECTIONS,
+    MISTRAL_MAX_KEEPALIVE,
+    MISTRAL_KEEPALIVE_EXPIRY,
+    MISTRAL_MAX_CONCURRENCY,
+    MISTRAL_TIMEOUT,
+)
 
-client = Mistral(api_key=MISTRAL_API_KEY)
+# ---------------------------------------------------------------------
+# Shared, pooled HTTP clients (one per process)
+# ---------------------------------------------------------------------
+_limits = httpx.Limits(
+    max_connections=MISTRAL_MAX_CONNECTIONS,
+    max_keepalive_connections=MISTRAL_MAX_KEEPALIVE,
+    keepalive_expiry=MISTRAL_KEEPALIVE_EXPIRY,
+)
+_http_client = httpx.Client(limits=_limits, timeout=MISTRAL_TIMEOUT)
+_async_http_client = httpx.AsyncClient(limits=_limits, timeout=MISTRAL_TIMEOUT)
 
-def ask_mistral(prompt: str, format_json: bool = True, temperature: float = 0.3):
-    """
-    Send a prompt to the Mistral API and optionally parse a JSON response.
-    Returns either a dictionary or a plain string.
-    """
-    response = client.chat.complete(
-        model=MISTRAL_MODEL,
-        temperature=temperature,
-        response_format={"type": "json_object"} if format_json else None,
-        messages=[{"role": "user", "content": prompt}],
-    )
+client = Mistral(
+    api_key=MISTRAL_API_KEY,
+    client=_http_client,
+    async_client=_async_http_client,
+)
+
+# Caps in-flight async calls; created lazily so it binds to the serving loop
+_semaphore: asyncio.Semaphore | None = None
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(MISTRAL_MAX_CONCURRENCY)
+    return _semaphore
+
+
+def _request_kwargs(prompt: str, format_json: bool, temperature: float) -> dict:
+    return {
+        "model": MISTRAL_MODEL,
+        "temperature": temperature,
+        "response_format": {"type": "json_object"} if format_json else None,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+
+
+def _parse_response(response, format_json: bool):
     text = response.choices[0].message.content
     if format_json:
         try:
@@ -22,3 +57,28 @@ def ask_mistral(prompt: str, format_json: bool = True, temperature: float = 0.3)
         except json.JSONDecodeError:
             return {"raw": text}
     return text.strip()
+
+
+def ask_mistral(prompt: str, format_json: bool = True, temperature: float = 0.3):
+    """
+    Send a prompt to the Mistral API and optionally parse a JSON response.
+    Returns either a dictionary or a plain string.
+    """
+    response = client.chat.complete(**_request_kwargs(prompt, format_json, temperature))
+    return _parse_response(response, format_json)
+
+
+async def ask_mistral_async(prompt: str, format_json: bool = True, temperature: float = 0.3):
+    """
+    Async variant of `ask_mistral` backed by the shared pooled HTTP client.
+    At most MISTRAL_MAX_CONCURRENCY calls are in flight per process.
+    """
+    async with _get_semaphore():
+        response = await client.chat.complete_async(**_request_kwargs(prompt, format_json, temperature))
+    return _parse_response(response, format_json)
+
+
+async def aclose_mistral() -> None:
+    """Release pooled connections (call on application shutdown)."""
+    await _async_http_client.aclose()
+    _http_client.close()
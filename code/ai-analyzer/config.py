@@ -13,3 +13,10 @@ MISTRAL_MODEL = os.getenv("MISTRAL_MODEL", "mistral-medium-latest")
 
 if not MISTRAL_API_KEY:
     raise ValueError("Missing MISTRAL_API_KEY in environment variables.")
+
+# Mistral HTTP connection pool
+MISTRAL_MAX_CONNECTIONS = int(os.getenv("MISTRAL_MAX_CONNECTIONS", "50"))
+MISTRAL_MAX_KEEPALIVE = int(os.getenv("MISTRAL_MAX_KEEPALIVE", "20"))
+MISTRAL_KEEPALIVE_EXPIRY = float(os.getenv("MISTRAL_KEEPALIVE_EXPIRY", "30"))
+MISTRAL_MAX_CONCURRENCY = int(os.getenv("MISTRAL_MAX_CONCURRENCY", "32"))
+MISTRAL_TIMEOUT = float(os.getenv("MISTRAL_TIMEOUT", "120"))
@@ -1,13 +1,13 @@
 import apiClient from "./client";
-import type { AnalyzeResponse } from "./types";
+import type { AnalysisJobResponse } from "./types";
 
-export async function runAnalysis(questionId: number): Promise<AnalyzeResponse> {
-  const { data } = await apiClient.post<AnalyzeResponse>(`/analyze/${questionId}`);
+export async function runAnalysis(questionId: number): Promise<AnalysisJobResponse> {
+  const { data } = await apiClient.post<AnalysisJobResponse>(`/analyze/${questionId}`);
   return data;
 }
 
-export async function updateAnalysis(questionId: number): Promise<AnalyzeResponse> {
-  const { data } = await apiClient.put<AnalyzeResponse>(`/analyze/${questionId}`);
+export async function updateAnalysis(questionId: number): Promise<AnalysisJobResponse> {
+  const { data } = await apiClient.put<AnalysisJobResponse>(`/analyze/${questionId}`);
   return data;
 }
 
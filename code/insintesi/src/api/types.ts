@@ -10,6 +10,13 @@ export interface AnalyzeResponse {
   extra?: Record<string, any> | null;
 }
 
+export interface AnalysisJobResponse {
+  job_id: number;
+  question_id: number;
+  status: "pending" | "running" | "ready" | "failed";
+  created_at?: string | null;
+}
+
 export interface AuthResponse {
   access_token: string;
   refresh_token: string;